@@ -7,6 +7,7 @@ from modules.fetch_company_data import run_fetch_company_data
 from modules.analyse_data import run_analyse_data
 from modules.client_management import get_client_and_date
 from modules.utils import load_config
+from modules.article_store import article_store
 import pandas as pd
 import logging
 
@@ -56,6 +57,7 @@ def main():
             return
 
         config = load_config(config_path)
+        article_store.configure(config.get('article_store'))
 
         input_file = os.path.join('results', client_name, search_date_str, config['input_file'])
         if not os.path.exists(input_file):
@@ -101,6 +103,8 @@ def main():
         logging.error(f"Произошла ошибка: {str(e)}")
         import traceback
         traceback.print_exc()
+    finally:
+        article_store.close()
 
 if __name__ == "__main__":
     main()
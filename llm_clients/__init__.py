@@ -1,9 +1,40 @@
 # llm_clients/__init__.py
 
-from .openai_client import OpenAIClient
+import importlib
+
+from .completion_cache import CachedLLMClient, CompletionCache, completion_cache
+
+# Реестр провайдеров: имя -> (модуль, класс). Модули импортируются лениво,
+# чтобы отсутствие SDK одного провайдера не мешало остальным.
+PROVIDERS = {
+    'openai': ('.openai_client', 'OpenAIClient'),
+    'openrouter': ('.openrouter_client', 'OpenRouterClient'),
+    'aimlapi': ('.aimlapi_client', 'AIMLAPIClient'),
+    'groq': ('.groq_client', 'GroqClient'),
+    'gemini': ('.gemini_client', 'GeminiClient'),
+    'cohere': ('.cohere_client', 'CohereClient'),
+    'gpt4free': ('.gpt4free_client', 'GPT4FreeClient'),
+    'balanced': ('.balanced_client', 'BalancedLLMClient'),
+}
+
+def provider_config(provider, config):
+    """
+    Параметры клиента провайдера: общие параметры конфигурации,
+    переопределённые разделом providers.<provider>.
+    """
+    merged = dict(config)
+    merged.update(config.get('providers', {}).get(provider.lower(), {}))
+    return merged
 
 def get_llm_client(provider, config):
-    if provider.lower() == 'openai':
-        return OpenAIClient(config)
-    else:
+    if provider.lower() not in PROVIDERS:
         raise ValueError(f"Провайдер {provider} не поддерживается.")
+    module_name, class_name = PROVIDERS[provider.lower()]
+    client_class = getattr(importlib.import_module(module_name, __name__), class_name)
+    return client_class(provider_config(provider, config))
+
+def get_cached_llm_client(provider, config, namespace=''):
+    """
+    Возвращает клиента провайдера, обёрнутого общим кэшем ответов completion_cache.
+    """
+    return CachedLLMClient(get_llm_client(provider, config), provider, completion_cache, namespace)
@@ -0,0 +1,194 @@
+# llm_clients/balanced_client.py
+
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, Callable, AsyncGenerator, Optional, Tuple
+
+from modules.rate_limiter import RateLimiter, TokenEstimator
+from .base_client import BaseLLMClient
+from .errors import LLMError, RateLimitError, QuotaExceededError, InvalidRequestError
+
+# Параметры балансировщика по умолчанию
+DEFAULT_BALANCER_CONFIG = {
+    "members": [],             # Провайдеры: имена или словари {"provider": ..., параметры провайдера}
+    "member_max_retries": 1,   # Повторы внутри провайдера: при ошибке быстрее перейти к другому
+    "max_failovers": None,     # Сколько раз переключаться при ошибках (по умолчанию 2 * число провайдеров)
+    "cooldown": 30,            # Пауза провайдера после 429 без Retry-After, в секундах
+    "error_cooldown": 5,       # Пауза провайдера после таймаута или ошибки сервера
+    "smoothing": 0.2           # Вес нового наблюдения в скользящих средних задержки и ошибок
+}
+
+# Запрос переходит к другому провайдеру при любой ошибке, кроме ошибки в самом запросе:
+# клиенты на SDK (Gemini, Cohere) пробрасывают собственные исключения, например
+# ResourceExhausted при 429
+FAILOVER_ERRORS = (Exception,)
+
+
+class BalancedMember:
+    """
+    Провайдер в составе балансировщика и наблюдаемые показатели его работы.
+    """
+
+    def __init__(self, name: str, client: BaseLLMClient, rate_limit: float, rate_limit_period: float, smoothing: float):
+        self.name = name
+        self.client = client
+        self.rate_limit = rate_limit
+        self.rate_limit_period = rate_limit_period
+        self.quota = RateLimiter(rate_limit, rate_limit_period)
+        self.smoothing = smoothing
+        self.latency = 1.0       # Скользящее среднее задержки ответа, секунды
+        self.error_rate = 0.0    # Скользящее среднее доли ошибок
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+
+    def ready_in(self) -> float:
+        """
+        Через сколько секунд провайдер сможет принять запрос.
+        """
+        return max(self.cooldown_until - time.monotonic(), self.quota.wait_time(), 0.0)
+
+    def score(self) -> float:
+        """
+        Приоритет провайдера: чем больше оставшейся квоты, меньше ошибок,
+        задержка и число выполняющихся запросов, тем выше.
+        """
+        return self.quota.available() * (1.0 - self.error_rate) / (self.latency * (self.in_flight + 1))
+
+    def record_success(self, latency: float):
+        self.latency += self.smoothing * (latency - self.latency)
+        self.error_rate += self.smoothing * (0.0 - self.error_rate)
+
+    def record_error(self, cooldown: float):
+        self.error_rate += self.smoothing * (1.0 - self.error_rate)
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + cooldown)
+
+
+class BalancedLLMClient(BaseLLMClient):
+    """
+    Составной клиент, распределяющий запросы между несколькими провайдерами.
+
+    Каждый запрос получает провайдер с наибольшим приоритетом (см.
+    BalancedMember.score) среди тех, у кого есть квота и нет паузы.
+    При 429, таймауте или ошибке сервера провайдер ставится на паузу,
+    а запрос повторяется у другого. Суммарная квота балансировщика равна
+    сумме квот провайдеров.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        from . import get_llm_client
+
+        balancer_config = dict(DEFAULT_BALANCER_CONFIG, **config.get('balancer', {}))
+        if not balancer_config['members']:
+            raise ValueError("Не заданы провайдеры балансировщика (balancer.members).")
+        self.cooldown = balancer_config['cooldown']
+        self.error_cooldown = balancer_config['error_cooldown']
+
+        self.members = []
+        token_rate_limits = []
+        for position, member in enumerate(balancer_config['members']):
+            member = {'provider': member} if isinstance(member, str) else dict(member)
+            provider = member.pop('provider')
+            member_config = dict(config)
+            member_config['max_retries'] = balancer_config['member_max_retries']
+            member_config['providers'] = dict(config.get('providers', {}))
+            member_config['providers'][provider] = dict(member_config['providers'].get(provider, {}), **member)
+            client = get_llm_client(provider, member_config)
+            settings = dict(config, **member_config['providers'][provider])
+            self.members.append(BalancedMember(f"{provider}#{position}", client, settings.get('rate_limit', 20),
+                                               settings.get('rate_limit_period', 60), balancer_config['smoothing']))
+            token_rate_limits.append(settings.get('token_rate_limit'))
+
+        # Провайдеры с собственными лимитами токенов оценивают запросы общей оценкой балансировщика
+        self.token_estimator = TokenEstimator(config.get('max_tokens', 1500))
+        for member in self.members:
+            if hasattr(member.client, 'token_estimator'):
+                member.client.token_estimator = self.token_estimator
+
+        self.max_failovers = balancer_config['max_failovers'] or 2 * len(self.members)
+        self.model = "+".join(getattr(member.client, 'model', member.name) for member in self.members)
+        # Суммарная квота в пересчёте на минуту (целое число: по ней задаётся и число обработчиков)
+        self.rate_limit = max(1, int(sum(member.rate_limit * 60 / member.rate_limit_period for member in self.members)))
+        self.rate_limit_period = 60
+        # Суммарный лимит токенов известен, только если он задан у всех провайдеров
+        self.token_rate_limit = None
+        if all(token_rate_limits):
+            self.token_rate_limit = sum(limit * 60 / member.rate_limit_period
+                                        for limit, member in zip(token_rate_limits, self.members))
+
+    async def _acquire_member(self) -> BalancedMember:
+        while True:
+            candidates = [member for member in self.members if member.cooldown_until <= time.monotonic()]
+            for member in sorted(candidates, key=lambda member: member.score(), reverse=True):
+                if member.quota.try_acquire():
+                    member.in_flight += 1
+                    return member
+            await asyncio.sleep(min(member.ready_in() for member in self.members) or 0.01)
+
+    def _record_failure(self, member: BalancedMember, error: Exception):
+        if isinstance(error, QuotaExceededError):
+            cooldown = self.cooldown
+        elif isinstance(error, RateLimitError):
+            cooldown = error.retry_after if error.retry_after is not None else self.cooldown
+        else:
+            cooldown = self.error_cooldown
+        member.record_error(cooldown)
+        logging.warning(f"Провайдер {member.name}: {error}. Пауза {cooldown} с, запрос передаётся другому провайдеру.")
+
+    async def _call(self, api_call: Callable):
+        last_error = None
+        for _ in range(self.max_failovers):
+            member = await self._acquire_member()
+            started_at = time.monotonic()
+            try:
+                result = await api_call(member.client)
+            except InvalidRequestError:
+                raise
+            except FAILOVER_ERRORS as e:
+                last_error = e
+                self._record_failure(member, e)
+                continue
+            finally:
+                member.in_flight -= 1
+            member.record_success(time.monotonic() - started_at)
+            return result
+        raise LLMError(f"Ни один провайдер не ответил за {self.max_failovers} попыток: {last_error}")
+
+    async def get_completion(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None) -> str:
+        return await self._call(lambda client: client.get_completion(messages))
+
+    async def get_completion_with_usage(self, messages: List[Dict[str, str]],
+                                        max_tokens: Optional[int] = None) -> Tuple[str, Optional[Dict[str, int]]]:
+        return await self._call(lambda client: client.get_completion_with_usage(messages, max_tokens=max_tokens))
+
+    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None,
+                                    max_tokens: Optional[int] = None) -> AsyncGenerator[str, None]:
+        # Переключение на другого провайдера возможно только до первой части ответа
+        async def first_part(client):
+            stream = client.get_completion_stream(messages, max_tokens=max_tokens)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
+
+        stream, part = await self._call(first_part)
+        try:
+            if part is None:
+                return
+            yield part
+            async for part in stream:
+                yield part
+        finally:
+            # При досрочной остановке потока запрос к провайдеру прерывается сразу
+            await stream.aclose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Текущие показатели провайдеров (для журнала).
+        """
+        return [{'name': member.name, 'latency': round(member.latency, 3), 'error_rate': round(member.error_rate, 3),
+                 'quota': round(member.quota.available(), 3), 'in_flight': member.in_flight} for member in self.members]
+
+    async def close(self):
+        for member in self.members:
+            await member.client.close()
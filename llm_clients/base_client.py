@@ -1,7 +1,19 @@
 # quantum_rpg_bot/llm_clients/base_client.py
 
+import os
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Callable, AsyncGenerator
+from typing import List, Dict, Any, Callable, AsyncGenerator, Optional, Tuple
+
+
+def api_keys_from_env(env_name: str) -> List[str]:
+    """
+    Возвращает ключи API из переменной окружения (через запятую).
+    """
+    keys = [key.strip() for key in os.getenv(env_name, "").split(",") if key.strip()]
+    if not keys:
+        raise ValueError(f"Переменная окружения {env_name} не установлена или не содержит ни одного ключа.")
+    return keys
+
 
 class BaseLLMClient(ABC):
     """
@@ -23,15 +35,32 @@ class BaseLLMClient(ABC):
         pass
 
     @abstractmethod
-    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None) -> AsyncGenerator[str, None]:
+    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None,
+                                    max_tokens: Optional[int] = None) -> AsyncGenerator[str, None]:
         """
         Получает потоковое завершение от языковой модели.
 
         Args:
             messages (List[Dict[str, str]]): Список сообщений для отправки модели.
             update_callback (Callable[[], Any], optional): Функция обратного вызова для обновления статуса.
+            max_tokens (int, optional): Лимит длины ответа для этого запроса вместо заданного в конфигурации.
 
         Yields:
             str: Части ответа от языковой модели.
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def get_completion_with_usage(self, messages: List[Dict[str, str]],
+                                        max_tokens: Optional[int] = None) -> Tuple[str, Optional[Dict[str, int]]]:
+        """
+        Получает завершение и фактический расход токенов (prompt_tokens,
+        completion_tokens, total_tokens), если провайдер его сообщает.
+        max_tokens задаёт лимит длины ответа для этого запроса.
+        """
+        return await self.get_completion(messages, max_tokens=max_tokens), None
+
+    async def close(self):
+        """
+        Освобождает ресурсы клиента (соединения и т.п.).
+        """
+        pass
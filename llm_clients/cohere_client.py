@@ -1,9 +1,8 @@
 # Файл: llm_clients/cohere_client.py
 
 import asyncio
-import os
 from typing import List, Dict, Any, Callable, AsyncGenerator, Optional
-from .base_client import BaseLLMClient
+from .base_client import BaseLLMClient, api_keys_from_env
 import cohere
 from itertools import cycle
 import logging
@@ -15,23 +14,14 @@ class CohereClient(BaseLLMClient):
     Клиент для работы с Cohere API с балансировкой ключей.
     """
 
-    def __init__(self, config):
-        self.config = config
-        self.api_keys = self._load_api_keys()
+    def __init__(self, config: Dict[str, Any]):
+        self.api_keys = cycle(api_keys_from_env('COHERE_API_KEYS'))
         self.current_key = next(self.api_keys)
-        self.model = config.get('COHERE_MODEL', 'default-model')
-        self.max_retries = config.get('MAX_RETRIES', 3)
-        self.retry_delay = config.get('RETRY_DELAY', 1)  # В секундах
-
-    def _load_api_keys(self):
-        """
-        Загружает ключи API из переменной окружения COHERE_API_KEYS.
-        """
-        keys = os.getenv("COHERE_API_KEYS", "").split(",")
-        keys = [key.strip() for key in keys if key.strip()]
-        if not keys:
-            raise ValueError("Не найдены ключи API для Cohere в переменных окружения.")
-        return cycle(keys)
+        self.model = config.get('model', 'command-r')
+        self.max_retries = config.get('max_retries', 3)
+        self.retry_delay = config.get('retry_delay', 1)  # В секундах
+        self.max_tokens = config.get('max_tokens', 2000)
+        self.temperature = config.get('temperature', 0.6)
 
     def _get_client(self):
         return cohere.Client(api_key=self.current_key)
@@ -52,7 +42,8 @@ class CohereClient(BaseLLMClient):
                     raise
                 await asyncio.sleep(self.retry_delay * (attempt + 1))
 
-    async def get_completion(self, messages: List[Dict[str, str]], update_callback: Optional[Callable[[], Any]] = None) -> str:
+    async def get_completion(self, messages: List[Dict[str, str]], update_callback: Optional[Callable[[], Any]] = None,
+                             max_tokens: Optional[int] = None) -> str:
         async def api_call():
             client = self._get_client()
             # Форматирование сообщений для Cohere
@@ -65,19 +56,20 @@ class CohereClient(BaseLLMClient):
                 client.generate,
                 prompt=prompt,
                 model=self.model,
-                max_tokens=self.config.get('MAX_TOKENS', 2000),
-                temperature=self.config.get('TEMPERATURE', 0.6),
+                max_tokens=max_tokens or self.max_tokens,
+                temperature=self.temperature,
             )
             logger.debug(f"Получен ответ от Cohere API: {response.generations[0].text}")
             return response.generations[0].text.strip()
 
         return await self._handle_api_call(api_call)
 
-    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Optional[Callable[[], Any]] = None) -> AsyncGenerator[str, None]:
+    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Optional[Callable[[], Any]] = None,
+                                    max_tokens: Optional[int] = None) -> AsyncGenerator[str, None]:
         """
         Cohere не поддерживает стриминг ответов, поэтому возвращаем полный ответ.
         """
-        completion = await self.get_completion(messages, update_callback)
+        completion = await self.get_completion(messages, update_callback, max_tokens)
         yield completion
 
     def _format_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
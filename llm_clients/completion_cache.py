@@ -0,0 +1,261 @@
+# llm_clients/completion_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import List, Dict, Any, Callable, AsyncGenerator, Optional, Tuple
+
+from .base_client import BaseLLMClient
+from .streaming import read_until_answer
+
+# Параметры кэша ответов по умолчанию
+DEFAULT_COMPLETION_CACHE_CONFIG = {
+    "enabled": False,
+    "path": "cache/completions.sqlite",
+    "max_size_mb": 512       # Предельный размер ответов в кэше
+}
+
+# Параметры генерации, от которых зависит ответ модели
+SAMPLING_PARAMS = ('max_tokens', 'temperature', 'top_p', 'top_k', 'repetition_penalty')
+
+
+def completion_key(provider: str, model: str, params: Dict[str, Any], messages: List[Dict[str, str]]) -> str:
+    """
+    Ключ кэша: хэш провайдера, модели, параметров генерации и сообщений.
+    """
+    payload = json.dumps([provider.lower(), model, params, messages], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class CompletionCache:
+    """
+    Постоянный кэш ответов языковых моделей в SQLite.
+
+    Ответы сгруппированы по пространствам имён (обычно — клиент). Для
+    каждого пространства запоминается хэш системного промпта; если промпт
+    изменился, старые ответы пространства удаляются. При превышении
+    max_size_mb удаляются давно не использованные ответы.
+    """
+
+    def __init__(self, cache_config=None):
+        self.cache_config = dict(DEFAULT_COMPLETION_CACHE_CONFIG)
+        self._connection = None
+        self.configure(cache_config)
+
+    def configure(self, cache_config=None):
+        """
+        Обновляет параметры кэша. Закрывает открытое соединение.
+        """
+        if cache_config:
+            self.close()
+            self.cache_config.update(cache_config)
+
+    @property
+    def enabled(self):
+        return bool(self.cache_config.get('enabled'))
+
+    def _connect(self):
+        if self._connection is None:
+            path = self.cache_config['path']
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._connection = sqlite3.connect(path)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT,
+                    response TEXT,
+                    used_at REAL,
+                    size INTEGER
+                )
+            """)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS namespaces (
+                    namespace TEXT PRIMARY KEY,
+                    prompt_key TEXT
+                )
+            """)
+            self._connection.execute("CREATE INDEX IF NOT EXISTS idx_completions_used_at ON completions (used_at)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS idx_completions_namespace ON completions (namespace)")
+            self._connection.commit()
+            self.evict()
+        return self._connection
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        connection = self._connect()
+        row = connection.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE completions SET used_at = ? WHERE key = ?", (time.time(), key))
+        connection.commit()
+        return row[0]
+
+    def put(self, key: str, namespace: str, response: str):
+        if not self.enabled or not isinstance(response, str):
+            return
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+            (key, namespace, response, time.time(), len(response.encode('utf-8')))
+        )
+        connection.commit()
+
+    def delete(self, key: str):
+        if not self.enabled:
+            return
+        connection = self._connect()
+        connection.execute("DELETE FROM completions WHERE key = ?", (key,))
+        connection.commit()
+
+    def invalidate(self, namespace: str, prompt: str) -> int:
+        """
+        Удаляет ответы пространства имён, если его системный промпт изменился.
+
+        Returns:
+            int: Число удалённых ответов.
+        """
+        if not self.enabled:
+            return 0
+        connection = self._connect()
+        current_key = prompt_key(prompt)
+        row = connection.execute("SELECT prompt_key FROM namespaces WHERE namespace = ?", (namespace,)).fetchone()
+        removed = 0
+        if row is not None and row[0] != current_key:
+            removed = connection.execute("DELETE FROM completions WHERE namespace = ?", (namespace,)).rowcount
+        connection.execute("INSERT OR REPLACE INTO namespaces VALUES (?, ?)", (namespace, current_key))
+        connection.commit()
+        return removed
+
+    def evict(self):
+        """
+        Если кэш превышает max_size_mb, удаляет давно не использованные ответы.
+        """
+        connection = self._connection
+        if connection is None:
+            return
+        max_size = self.cache_config['max_size_mb'] * 1024 * 1024
+        total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if total_size > max_size:
+            excess = total_size - max_size
+            removed = 0
+            stale_keys = []
+            for key, size in connection.execute("SELECT key, size FROM completions ORDER BY used_at"):
+                if removed >= excess:
+                    break
+                stale_keys.append((key,))
+                removed += size
+            connection.executemany("DELETE FROM completions WHERE key = ?", stale_keys)
+        connection.commit()
+
+    def close(self):
+        if self._connection is not None:
+            self.evict()
+            self._connection.close()
+            self._connection = None
+
+
+class CachedLLMClient(BaseLLMClient):
+    """
+    Обёртка над клиентом языковой модели, возвращающая сохранённый ответ
+    на уже встречавшийся запрос без обращения к API.
+    """
+
+    def __init__(self, client: BaseLLMClient, provider: str, cache: CompletionCache, namespace: str = ''):
+        self.client = client
+        self.provider = provider
+        self.cache = cache
+        self.namespace = namespace
+        self.model = getattr(client, 'model', '')
+        self.params = {name: getattr(client, name) for name in SAMPLING_PARAMS if hasattr(client, name)}
+
+    def key(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None,
+            answer_pattern: Optional[str] = None) -> str:
+        """
+        Ключ запроса. Ответ, оборванный по шаблону answer_pattern (см.
+        get_completion_until), хранится отдельно от полного ответа.
+        """
+        params = dict(self.params)
+        if max_tokens:
+            params['max_tokens'] = max_tokens
+        if answer_pattern:
+            params['answer_pattern'] = answer_pattern
+        return completion_key(self.provider, self.model, params, messages)
+
+    def lookup(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None,
+               answer_pattern: Optional[str] = None) -> Optional[str]:
+        """
+        Возвращает сохранённый ответ на запрос или None.
+        """
+        return self.cache.get(self.key(messages, max_tokens, answer_pattern))
+
+    def forget(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None):
+        """
+        Удаляет сохранённый ответ на запрос (например, ответ в неверном формате).
+        """
+        self.cache.delete(self.key(messages, max_tokens))
+
+    async def get_completion(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None) -> str:
+        response, _ = await self.get_completion_with_usage(messages)
+        return response
+
+    async def get_completion_with_usage(self, messages: List[Dict[str, str]],
+                                        max_tokens: Optional[int] = None) -> Tuple[str, Optional[Dict[str, int]]]:
+        key = self.key(messages, max_tokens)
+        response = self.cache.get(key)
+        if response is not None:
+            # Ответ из кэша не расходует токенов
+            return response, {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        # Лимит ответа передаётся клиенту, только если он переопределён
+        overrides = {'max_tokens': max_tokens} if max_tokens else {}
+        if hasattr(self.client, 'get_completion_with_usage'):
+            response, usage = await self.client.get_completion_with_usage(messages, **overrides)
+        else:
+            response, usage = await self.client.get_completion(messages, **overrides), None
+        self.cache.put(key, self.namespace, response)
+        return response, usage
+
+    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None,
+                                    max_tokens: Optional[int] = None) -> AsyncGenerator[str, None]:
+        key = self.key(messages, max_tokens)
+        response = self.cache.get(key)
+        if response is not None:
+            yield response
+            return
+        overrides = {'max_tokens': max_tokens} if max_tokens else {}
+        parts = []
+        async for part in self.client.get_completion_stream(messages, **overrides):
+            parts.append(part)
+            yield part
+        # Сохраняется только полностью прочитанный поток
+        self.cache.put(key, self.namespace, "".join(parts))
+
+    async def get_completion_until(self, messages: List[Dict[str, str]], answer_pattern: str,
+                                   max_tokens: Optional[int] = None) -> str:
+        """
+        Получает ответ потоком и прерывает его, как только пришёл полный
+        ответ по шаблону answer_pattern (см. read_until_answer). max_tokens
+        ограничивает длину ответа только для этого запроса.
+        """
+        key = self.key(messages, max_tokens, answer_pattern)
+        response = self.cache.get(key)
+        if response is None:
+            overrides = {'max_tokens': max_tokens} if max_tokens else {}
+            stream = self.client.get_completion_stream(messages, **overrides)
+            response, _ = await read_until_answer(stream, answer_pattern)
+            self.cache.put(key, self.namespace, response)
+        return response
+
+    async def close(self):
+        await self.client.close()
+
+
+# Общий кэш ответов
+completion_cache = CompletionCache()
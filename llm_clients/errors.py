@@ -0,0 +1,44 @@
+# llm_clients/errors.py
+
+from typing import Optional
+
+
+class LLMError(Exception):
+    """
+    Ошибка обращения к API языковой модели.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, code: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class RateLimitError(LLMError):
+    """
+    Превышен лимит запросов (HTTP 429). retry_after — рекомендованная
+    сервером пауза в секундах, если он её сообщил.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = 429, code: Optional[str] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message, status, code)
+        self.retry_after = retry_after
+
+
+class QuotaExceededError(RateLimitError):
+    """
+    Квота ключа исчерпана (insufficient_quota): ключ бесполезно повторять.
+    """
+
+
+class APIError(LLMError):
+    """
+    Ошибка сервера или сети, которую имеет смысл повторить.
+    """
+
+
+class InvalidRequestError(LLMError):
+    """
+    Ошибка запроса (HTTP 4xx, кроме 429): повтор не поможет.
+    """
@@ -1,47 +1,51 @@
-# quantum_rpg_bot/llm_clients/gemini_client.py
+# llm_clients/gemini_client.py
 
 import asyncio
+import logging
 import google.generativeai as genai
-from typing import List, Dict, Any, Callable
-# from config import Config
-from .base_client import BaseLLMClient
+from typing import List, Dict, Any, Callable, Optional
+from .base_client import BaseLLMClient, api_keys_from_env
 from itertools import cycle
 
 class GeminiClient(BaseLLMClient):
     """
-    Клиент для работы с Gemini Pro с поддержкой нескольких API ключей.
-    Обеспечивает балансировку нагрузки и обратную совместимость с существующим кодом.
+    Клиент для работы с Gemini с поддержкой нескольких API ключей
+    (переменная окружения GEMINI_API_KEYS).
     """
 
-    def __init__(self, config: Config):
-        self.api_keys = config.GEMINI_API_KEYS
+    def __init__(self, config: Dict[str, Any]):
+        self.api_keys = api_keys_from_env('GEMINI_API_KEYS')
         self.key_cycle = cycle(self.api_keys)
-        self.max_retries = config.MAX_RETRIES
-        self.retry_delay = config.RETRY_DELAY
-        self.timeout = config.GPT_TIMEOUT
+        self.model = config.get('model', 'gemini-pro')
+        self.max_retries = config.get('max_retries', 5)
+        self.retry_delay = config.get('retry_delay', 1)  # в секундах
+        self.timeout = config.get('timeout', 60)  # в секундах
+        self.max_tokens = config.get('max_tokens', 1500)
+        self.temperature = config.get('temperature', 0.7)
+        self.top_p = config.get('top_p', 0.9)
 
-    def _get_model(self):
+    def _get_model(self, max_tokens: Optional[int] = None):
         """
         Создает и возвращает новую модель с следующим API ключом из цикла.
         """
         key = next(self.key_cycle)
-        print(f"Использован ключ {key}")
+        logging.debug(f"Использован ключ ...{key[-4:]}")
         genai.configure(api_key=key)
-        return genai.GenerativeModel('gemini-pro')
+        return genai.GenerativeModel(
+            self.model,
+            generation_config=genai.GenerationConfig(
+                max_output_tokens=max_tokens or self.max_tokens,
+                temperature=self.temperature,
+                top_p=self.top_p
+            )
+        )
 
-    @property
-    def model(self):
-        """
-        Свойство для обеспечения обратной совместимости.
-        Возвращает новую модель при каждом обращении.
-        """
-        return self._get_model()
-
-    async def get_completion(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None) -> str:
+    async def get_completion(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None,
+                             max_tokens: Optional[int] = None) -> str:
         prompt = self._format_messages(messages)
         for attempt in range(self.max_retries):
             try:
-                model = self._get_model()
+                model = self._get_model(max_tokens)
                 response = await asyncio.wait_for(
                     model.generate_content_async(prompt),
                     timeout=self.timeout
@@ -54,11 +58,12 @@ class GeminiClient(BaseLLMClient):
                     await update_callback()
                 await asyncio.sleep(self.retry_delay * (attempt + 1))
 
-    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None):
+    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None,
+                                    max_tokens: Optional[int] = None):
         prompt = self._format_messages(messages)
         for attempt in range(self.max_retries):
             try:
-                model = self._get_model()
+                model = self._get_model(max_tokens)
                 response = await model.generate_content_async(prompt, stream=True)
                 async for chunk in response:
                     yield chunk.text
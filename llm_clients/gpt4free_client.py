@@ -1,8 +1,9 @@
+# llm_clients/gpt4free_client.py
+
 import g4f
 import asyncio
 import logging
-from typing import List, Dict, Any, AsyncGenerator, Callable
-from config import Config
+from typing import List, Dict, Any, AsyncGenerator, Callable, Optional
 from .base_client import BaseLLMClient
 
 class GPT4FreeClient(BaseLLMClient):
@@ -10,15 +11,17 @@ class GPT4FreeClient(BaseLLMClient):
     Клиент для работы с GPT4Free.
     """
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Dict[str, Any]):
         self.logger = logging.getLogger(__name__)
-        self.provider = getattr(g4f.Provider, config.GPT4FREE_PROVIDER)
-        self.model = config.GPT4FREE_MODEL
-        self.max_retries = config.MAX_RETRIES
-        self.retry_delay = config.RETRY_DELAY
-        self.timeout = config.GPT_TIMEOUT
+        self.provider = getattr(g4f.Provider, config.get('g4f_provider', 'Bing'))
+        self.model = config.get('model', 'gpt-4')
+        self.max_retries = config.get('max_retries', 5)
+        self.retry_delay = config.get('retry_delay', 1)  # в секундах
+        self.timeout = config.get('timeout', 60)  # в секундах
 
-    async def get_completion(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None) -> str:
+    # GPT4Free не принимает лимит длины ответа, max_tokens игнорируется
+    async def get_completion(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None,
+                             max_tokens: Optional[int] = None) -> str:
         for attempt in range(self.max_retries):
             try:
                 response = await asyncio.wait_for(
@@ -38,7 +41,8 @@ class GPT4FreeClient(BaseLLMClient):
                     raise
                 await asyncio.sleep(self.retry_delay * (attempt + 1))
 
-    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None) -> AsyncGenerator[str, None]:
+    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None,
+                                    max_tokens: Optional[int] = None) -> AsyncGenerator[str, None]:
         for attempt in range(self.max_retries):
             self.logger.info("Начало получения потокового ответа от языковой модели")
             try:
@@ -0,0 +1,114 @@
+# llm_clients/key_pool.py
+
+import asyncio
+import time
+from typing import List, Dict, Any, Optional
+
+from modules.rate_limiter import RateLimiter
+from .errors import QuotaExceededError
+
+
+class ApiKeyState:
+    """
+    Ключ API с собственными корзинами запросов и токенов и паузой после 429.
+    """
+
+    def __init__(self, key: str, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.key = key
+        self.requests = RateLimiter(requests_per_minute, 60) if requests_per_minute else None
+        self.tokens = RateLimiter(tokens_per_minute, 60) if tokens_per_minute else None
+        self.cooldown_until = 0.0
+        self.quota_until = 0.0   # Пауза из-за исчерпанной квоты (insufficient_quota)
+
+    def ready_in(self, tokens: int = 0) -> float:
+        """
+        Через сколько секунд ключ сможет выполнить запрос на tokens токенов.
+        """
+        waits = [self.cooldown_until - time.monotonic(), 0.0]
+        if self.requests:
+            waits.append(self.requests.wait_time())
+        if self.tokens and tokens:
+            waits.append(self.tokens.wait_time(tokens))
+        return max(waits)
+
+    def take(self, tokens: int = 0):
+        if self.requests:
+            self.requests.try_acquire()
+        if self.tokens and tokens:
+            self.tokens.try_acquire(tokens)
+
+    def settle(self, reserved: int, actual: Optional[int]):
+        if self.tokens and reserved and actual is not None:
+            self.tokens.refund(reserved - actual)
+
+
+class KeyPool:
+    """
+    Набор ключей API одного провайдера.
+
+    acquire() выдаёт ключ, который сможет выполнить запрос раньше
+    остальных, и при необходимости ждёт его. После 429 ключ ставится на
+    паузу (Retry-After) и затем возвращается в ротацию. При равной
+    готовности ключи выдаются по кругу. Если квота исчерпана у всех ключей,
+    acquire() не ждёт, а выбрасывает QuotaExceededError. После ответа
+    settle() исправляет списание токенов ключа по фактическому расходу.
+    """
+
+    def __init__(self, keys: List[str], requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        if not keys:
+            raise ValueError("Не задано ни одного ключа API.")
+        self.states = [ApiKeyState(key, requests_per_minute, tokens_per_minute) for key in keys]
+        self._by_key = {state.key: state for state in self.states}
+        self._next = 0
+
+    def __len__(self):
+        return len(self.states)
+
+    @property
+    def keys(self) -> List[str]:
+        return [state.key for state in self.states]
+
+    def _soonest(self, tokens: int) -> ApiKeyState:
+        count = len(self.states)
+        ordered = [self.states[(self._next + offset) % count] for offset in range(count)]
+        return min(ordered, key=lambda state: state.ready_in(tokens))
+
+    async def acquire(self, tokens: int = 0) -> str:
+        """
+        Возвращает ключ для запроса примерно на tokens токенов.
+        """
+        while True:
+            if all(state.quota_until > time.monotonic() for state in self.states):
+                raise QuotaExceededError("Все API ключи исчерпаны.", code='insufficient_quota')
+            state = self._soonest(tokens)
+            wait = state.ready_in(tokens)
+            if wait <= 0:
+                state.take(tokens)
+                self._next = (self.states.index(state) + 1) % len(self.states)
+                return state.key
+            # Просыпаемся не реже раза в секунду, чтобы заметить исчерпание квоты всех ключей
+            await asyncio.sleep(min(wait, 1.0))
+
+    def settle(self, key: str, reserved: int, actual: Optional[int]):
+        """
+        Возвращает в корзину ключа разницу между оценкой reserved, списанной
+        в acquire(), и фактическим расходом actual (None — расход неизвестен).
+        """
+        state = self._by_key.get(key)
+        if state is not None:
+            state.settle(reserved, actual)
+
+    def cooldown(self, key: str, seconds: float, quota: bool = False):
+        """
+        Временно исключает ключ из ротации. quota=True — пауза из-за
+        исчерпанной квоты, а не ограничения скорости.
+        """
+        state = self._by_key.get(key)
+        if state is not None:
+            state.cooldown_until = max(state.cooldown_until, time.monotonic() + seconds)
+            if quota:
+                state.quota_until = max(state.quota_until, time.monotonic() + seconds)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [{'key': f"...{state.key[-4:]}", 'ready_in': round(state.ready_in(), 3)} for state in self.states]
@@ -1,20 +1,67 @@
 # llm_clients/openai_client.py
 
 import asyncio
+import json
 import os
-from typing import List, Dict, Any, Callable, AsyncGenerator
-from itertools import cycle
+from typing import List, Dict, Any, Callable, AsyncGenerator, Optional, Tuple
 import logging
-import openai
+import aiohttp
 
+from modules.http_session import SessionManager
+from modules.rate_limiter import TokenEstimator
 from .base_client import BaseLLMClient
+from .errors import LLMError, RateLimitError, QuotaExceededError, APIError, InvalidRequestError
+from .key_pool import KeyPool
+
+# Пул соединений к API: без ограничения на хост, число одновременных запросов задаёт вызывающий код
+OPENAI_HTTP_CONFIG = {
+    "limit": 100,
+    "limit_per_host": 0
+}
+
+
+def parse_retry_after(value):
+    """
+    Значение заголовка Retry-After в секундах или None.
+    """
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+async def raise_for_status(response: aiohttp.ClientResponse):
+    """
+    Преобразует ответ API с ошибкой в исключение из llm_clients.errors.
+    """
+    if response.status < 400:
+        return
+    try:
+        error = (await response.json(content_type=None)).get('error') or {}
+    except (ValueError, aiohttp.ContentTypeError):
+        error = {}
+    message = error.get('message') or response.reason or f"HTTP {response.status}"
+    code = error.get('code') or error.get('type')
+    if response.status == 429:
+        error_class = QuotaExceededError if code == 'insufficient_quota' else RateLimitError
+        raise error_class(message, response.status, code, parse_retry_after(response.headers.get('Retry-After')))
+    if response.status >= 500 or response.status in (408, 409):
+        raise APIError(message, response.status, code)
+    raise InvalidRequestError(message, response.status, code)
+
 
 class OpenAIClient(BaseLLMClient):
     """
-    Клиент для работы с OpenAI API с балансировкой ключей и обработкой исчерпанных ключей.
+    Асинхронный клиент OpenAI Chat Completions API на aiohttp с пулом ключей.
+
+    Ключ выбирается для каждого запроса отдельно (тот, что освободится
+    раньше других, см. KeyPool) и передаётся в заголовке, поэтому
+    одновременные запросы с разными ключами не мешают друг другу.
+    Ключ, получивший 429, ставится на паузу и затем возвращается в ротацию.
     """
 
-    EXHAUSTED_MARKER = "#EXHAUSTED#"
+    DEFAULT_BASE_URL = "https://api.openai.com/v1"
+    API_KEYS_ENV = 'OPENAI_API_KEYS'
 
     def __init__(self, config: Dict[str, Any]):
         self.model = config.get('model', 'gpt-4o-mini')  # По умолчанию gpt-4o-mini
@@ -26,80 +73,128 @@ class OpenAIClient(BaseLLMClient):
         self.top_p = config.get('top_p', 0.9)
         self.rate_limit = config.get('rate_limit', 20)  # Запросов в минуту
         self.rate_limit_period = config.get('rate_limit_period', 60)  # Период в секундах
+        self.base_url = config.get('base_url', self.DEFAULT_BASE_URL).rstrip('/')
+        self.key_rpm = config.get('key_rpm')  # Лимит запросов в минуту на ключ
+        self.key_tpm = config.get('key_tpm')  # Лимит токенов в минуту на ключ
+        self.quota_cooldown = config.get('quota_cooldown', 3600)  # Пауза ключа с исчерпанной квотой, в секундах
 
         # Установка ключей API из переменных окружения
-        self.api_keys_env = os.getenv('OPENAI_API_KEYS')
+        self.api_keys_env = os.getenv(self.API_KEYS_ENV)
         if not self.api_keys_env:
-            raise ValueError("Переменная окружения OPENAI_API_KEYS не установлена.")
+            raise ValueError(f"Переменная окружения {self.API_KEYS_ENV} не установлена.")
 
         # Ожидаем, что ключи передаются через запятую
         self.api_keys_list = [key.strip() for key in self.api_keys_env.split(',') if key.strip()]
         if not self.api_keys_list:
-            raise ValueError("Переменная окружения OPENAI_API_KEYS не содержит ни одного ключа.")
+            raise ValueError(f"Переменная окружения {self.API_KEYS_ENV} не содержит ни одного ключа.")
 
-        self.api_keys = cycle(self.api_keys_list)
-        self.current_key = next(self.api_keys)
+        self.key_pool = KeyPool(self.api_keys_list, self.key_rpm, self.key_tpm)
+        # Оценка запроса для корзин ключей; analyse_data использует её же для общего лимита
+        self.token_estimator = TokenEstimator(self.max_tokens)
+        self.session_manager = SessionManager(OPENAI_HTTP_CONFIG)
 
-        openai.api_key = self.current_key
+    def _headers(self, key: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
 
-    def _mark_key_as_exhausted(self, key: str):
-        logging.warning(f"Помечен ключ как исчерпанный: {key}")
-        self.api_keys_list = [k for k in self.api_keys_list if k != key]
-        if not self.api_keys_list:
-            raise ValueError("Все API ключи исчерпаны.")
-        self.api_keys = cycle(self.api_keys_list)
-        self.current_key = next(self.api_keys)
-        openai.api_key = self.current_key
+    def _payload(self, messages: List[Dict[str, str]], **overrides) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p
+        }
+        payload.update(overrides)
+        return payload
 
-    async def _handle_api_call(self, api_call: Callable):
+    async def _handle_api_call(self, api_call: Callable, tokens: int = 0):
         for attempt in range(self.max_retries):
+            key = await self.key_pool.acquire(tokens)
             try:
-                return await api_call()
-            except openai.error.RateLimitError as e:
-                logging.error(f"Rate limit error: {e}. Переход на следующий ключ.")
-                self._mark_key_as_exhausted(self.current_key)
-                self.current_key = next(self.api_keys)
-                openai.api_key = self.current_key
-            except openai.error.APIError as e:
+                return await api_call(key)
+            except QuotaExceededError as e:
+                logging.error(f"Квота ключа ...{key[-4:]} исчерпана: {e}. Ключ на паузе {self.quota_cooldown} с.")
+                self.key_pool.cooldown(key, self.quota_cooldown, quota=True)
+            except RateLimitError as e:
+                cooldown = e.retry_after if e.retry_after is not None else self.retry_delay * (attempt + 1)
+                logging.error(f"Rate limit error: {e}. Ключ ...{key[-4:]} на паузе {cooldown} с.")
+                self.key_pool.cooldown(key, cooldown)
+            except InvalidRequestError:
+                raise
+            except (APIError, aiohttp.ClientError, asyncio.TimeoutError) as e:
                 logging.error(f"Ошибка API: {e}")
                 if attempt == self.max_retries - 1:
                     raise
                 logging.info(f"Повторная попытка {attempt + 1} через {self.retry_delay} секунд.")
                 await asyncio.sleep(self.retry_delay * (attempt + 1))
-            except Exception as e:
-                logging.error(f"Общая ошибка: {e}")
-                if attempt == self.max_retries - 1:
-                    raise
-                logging.info(f"Повторная попытка {attempt + 1} через {self.retry_delay} секунд.")
-                await asyncio.sleep(self.retry_delay * (attempt + 1))
+        raise LLMError(f"Не удалось получить ответ за {self.max_retries} попыток.")
 
     async def get_completion(self, messages: List[Dict[str, str]]) -> str:
-        async def api_call():
-            # Используем asyncio.to_thread для выполнения синхронного вызова OpenAI в асинхронной функции
-            return await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=self.top_p
-            )
-
-        response = await self._handle_api_call(api_call)
-        return response.choices[0].message['content']
-
-    async def get_completion_stream(self, messages: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
-        async def api_call():
-            return await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=self.top_p,
-                stream=True
-            )
-
-        async for chunk in await self._handle_api_call(api_call):
-            if chunk.choices[0].delta.content is not None:
-                yield chunk.choices[0].delta.content
+        content, _ = await self.get_completion_with_usage(messages)
+        return content
+
+    async def get_completion_with_usage(self, messages: List[Dict[str, str]],
+                                        max_tokens: Optional[int] = None) -> Tuple[str, Optional[Dict[str, int]]]:
+        max_tokens = max_tokens or self.max_tokens
+        tokens = self.token_estimator.estimate(messages, max_tokens)
+
+        async def api_call(key):
+            session = await self.session_manager.get_session()
+            async with session.post(f"{self.base_url}/chat/completions",
+                                    json=self._payload(messages, max_tokens=max_tokens),
+                                    headers=self._headers(key),
+                                    timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                await raise_for_status(response)
+                data = await response.json()
+            # Корзина токенов ключа исправляется по фактическому расходу
+            self.key_pool.settle(key, tokens, (data.get('usage') or {}).get('total_tokens'))
+            return data
+
+        response = await self._handle_api_call(api_call, tokens)
+        return response['choices'][0]['message']['content'], response.get('usage')
+
+    async def get_completion_stream(self, messages: List[Dict[str, str]], update_callback: Callable[[], Any] = None,
+                                    max_tokens: Optional[int] = None) -> AsyncGenerator[str, None]:
+        max_tokens = max_tokens or self.max_tokens
+        tokens = self.token_estimator.estimate(messages, max_tokens)
+        stream_key = None
+
+        async def api_call(key):
+            nonlocal stream_key
+            session = await self.session_manager.get_session()
+            response = await session.post(f"{self.base_url}/chat/completions",
+                                          json=self._payload(messages, stream=True, max_tokens=max_tokens),
+                                          headers=self._headers(key),
+                                          timeout=aiohttp.ClientTimeout(total=None, sock_read=self.timeout))
+            try:
+                await raise_for_status(response)
+            except Exception:
+                response.release()
+                raise
+            stream_key = key
+            return response
+
+        # Повторы возможны только до начала потока
+        response = await self._handle_api_call(api_call, tokens)
+        streamed = []
+        try:
+            # Ответ приходит как server-sent events: строки "data: {...}", в конце "data: [DONE]"
+            async for line in response.content:
+                line = line.decode('utf-8').strip()
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                choices = json.loads(data).get('choices') or []
+                content = choices[0].get('delta', {}).get('content') if choices else None
+                if content:
+                    streamed.append(content)
+                    yield content
+        finally:
+            response.release()
+            # Поток не сообщает расход: оценка по промпту и полученному тексту
+            self.key_pool.settle(stream_key, tokens, self.token_estimator.count(messages, "".join(streamed)))
+
+    async def close(self):
+        await self.session_manager.close()
@@ -0,0 +1,30 @@
+# llm_clients/streaming.py
+
+import re
+from typing import AsyncGenerator, Pattern, Tuple, Union
+
+
+async def read_until_answer(stream: AsyncGenerator[str, None], answer_pattern: Union[str, Pattern]) -> Tuple[str, bool]:
+    """
+    Читает потоковый ответ, пока в нём не появится полный ответ по шаблону.
+
+    Ответ считается полным, когда шаблон найден и после совпадения пришёл
+    хотя бы ещё один символ (совпадение уже не может удлиниться). Тогда
+    поток закрывается, что прерывает запрос к API.
+
+    Returns:
+        tuple: (ответ, был ли поток прерван досрочно). Если шаблон так и не
+        совпал, возвращается весь текст.
+    """
+    pattern = re.compile(answer_pattern, re.DOTALL) if isinstance(answer_pattern, str) else answer_pattern
+    text = ""
+    try:
+        async for part in stream:
+            text += part
+            match = pattern.search(text)
+            if match and match.end() < len(text):
+                return match.group(0).strip(), True
+    finally:
+        await stream.aclose()
+    match = pattern.search(text)
+    return (match.group(0) if match else text).strip(), False
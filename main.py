@@ -5,11 +5,18 @@ import asyncio
 from datetime import datetime
 import pandas as pd
 import ast
-from modules.fetch_data import fetch_and_save_articles
+from modules.fetch_data import fetch_and_save_queries
 from modules.clean_data import clean_data
-from modules.analyse_data import run_analyse_data  # Используем run_analyse_data для анализа
+from modules.prefilter import prefilter_data
+from modules.analyse_data import run_analyse_data, ANALYSIS_MODES  # Используем run_analyse_data для анализа
 from modules.client_management import get_client_and_date
 from modules.utils import load_config
+from modules.http_session import session_manager
+from modules.article_extractor import article_extractor
+from modules.article_cache import article_cache
+from modules.article_store import article_store
+from modules.serp_cache import serp_cache, SERP_CACHE_MODES
+from llm_clients import completion_cache
 
 def load_search_queries(roles_dir):
     """Загрузка поисковых запросов из search_query.json."""
@@ -57,10 +64,7 @@ async def fetch_data(client_name, config, queries, include, exclude, verbose, co
         start_index = queries.index(continue_from)
         print(f"Продолжаем с запроса: {continue_from}")
 
-    for query in queries[start_index:]:
-        print(f"Получаем данные для запроса: {query}")
-        await fetch_and_save_articles(query, include, exclude, config, results_file, verbose)
-        await asyncio.sleep(2)  # Небольшая задержка между запросами
+    await fetch_and_save_queries(queries[start_index:], include, exclude, config, results_file, verbose)
 
     if os.path.exists(results_file) and os.path.getsize(results_file) > 0:
         df = pd.read_csv(results_file)
@@ -75,8 +79,13 @@ async def main_async():
     parser = argparse.ArgumentParser(description="Signal Enricher")
     parser.add_argument('--fetch', action='store_true', help="Только получение данных")
     parser.add_argument('--clean', action='store_true', help="Только очистка данных")
+    parser.add_argument('--prefilter', action='store_true', help="Только предварительный отбор статей перед анализом")
     parser.add_argument('--analyze', action='store_true', help="Только анализ данных")
     parser.add_argument('--continue_from', action='store_true', help="Продолжить с последнего обработанного запроса")
+    parser.add_argument('--serp_cache', choices=SERP_CACHE_MODES, default='use',
+                        help="Кэш выдачи xmlstock: use — использовать, refresh — перезапросить и обновить, off — не использовать")
+    parser.add_argument('--analysis_mode', choices=ANALYSIS_MODES,
+                        help="Режим анализа: realtime — запросы по мере обработки, batch — офлайн-задание Batch API")
     args = parser.parse_args()
 
     try:
@@ -92,7 +101,15 @@ async def main_async():
         queries, include, exclude = load_search_queries(roles_dir)
 
         config = load_config('config/search_config.json')
+        if args.analysis_mode:
+            config['analysis_mode'] = args.analysis_mode
         verbose = config.get('verbose', False)
+        session_manager.configure(config.get('http'))
+        article_extractor.configure(config.get('extraction_workers'))
+        article_cache.configure(config.get('article_cache'))
+        article_store.configure(config.get('article_store'))
+        serp_cache.configure(config.get('serp_cache'), mode=args.serp_cache)
+        completion_cache.configure(config.get('llm_cache'))
         
         if config.get('exclude_pdf', False):
             exclude += " -filetype:pdf"
@@ -107,17 +124,19 @@ async def main_async():
                 print("Запрос не найден. Начинаем с начала.")
 
         data_fetched = False
-        if args.fetch or not (args.clean or args.analyze):
+        if args.fetch or not (args.clean or args.prefilter or args.analyze):
             data_fetched = await fetch_data(client_name, config, queries, include, exclude, verbose, continue_from)
         
         file_path = os.path.join('results', client_name, search_date_str, 'search_results.csv')
-        if (args.clean or not (args.fetch or args.analyze)) and (data_fetched or os.path.exists(file_path)):
+        if (args.clean or not (args.fetch or args.prefilter or args.analyze)) and (data_fetched or os.path.exists(file_path)):
             print("Начинаем очистку данных...")
             output_file = os.path.join('results', client_name, search_date_str, 'search_results_cleaned.csv')
             
             if os.path.getsize(file_path) > 0:
                 try:
-                    rows_before, rows_after = clean_data(file_path, output_file, verbose=True)
+                    rows_before, rows_after = clean_data(file_path, output_file, verbose=True,
+                                                         method=config.get('clean_method', 'cdist'),
+                                                         incremental=config.get('clean_incremental', False))
                     print(f"Очистка данных завершена. Было строк: {rows_before}, стало строк: {rows_after}")
                     print(f"Удалено дубликатов: {rows_before - rows_after}")
                 except Exception as e:
@@ -131,9 +150,23 @@ async def main_async():
         
         cleaned_file = os.path.join('results', client_name, search_date_str, 'search_results_cleaned.csv')
         analysed_file = os.path.join('results', client_name, search_date_str, 'search_results_analysed.csv')
-        if (args.analyze or not (args.fetch or args.clean)) and (data_fetched or os.path.exists(cleaned_file)):
+        run_analysis = (args.analyze or not (args.fetch or args.clean or args.prefilter)) and (data_fetched or os.path.exists(cleaned_file))
+
+        # Предварительный отбор: явные нерелевантные статьи не отправляются в LLM
+        analysis_input = cleaned_file
+        if (args.prefilter or (run_analysis and config.get('prefilter', {}).get('enabled'))) and \
+                os.path.exists(cleaned_file) and os.path.getsize(cleaned_file) > 0:
+            print("Начинаем предварительный отбор статей...")
+            filtered_file = os.path.join('results', client_name, search_date_str, 'search_results_filtered.csv')
+            rejected_file = os.path.join('results', client_name, search_date_str, 'search_results_rejected.csv')
+            rows_before, rows_after = prefilter_data(cleaned_file, filtered_file, rejected_file, roles_dir, config)
+            print(f"Предварительный отбор завершён. Было строк: {rows_before}, к анализу: {rows_after}")
+            print(f"Отклонённые статьи сохранены в {rejected_file}")
+            analysis_input = filtered_file
+
+        if run_analysis:
             print("Начинаем анализ данных...")
-            await run_analyse_data(cleaned_file, analysed_file, roles_dir, config)
+            await run_analyse_data(analysis_input, analysed_file, roles_dir, config)
             print("Анализ данных завершен.")
             
             # Экспорт в Excel
@@ -142,12 +175,20 @@ async def main_async():
         elif not data_fetched:
             print("Пропускаем этап анализа, так как данные не были получены.")
 
+        serp_cache.evict(serp_cache.ttl)
         print("Программа успешно завершена.")
 
     except Exception as e:
         print(f"Произошла ошибка: {str(e)}")
         import traceback
         traceback.print_exc()
+    finally:
+        await session_manager.close()
+        article_extractor.shutdown()
+        article_cache.close()
+        article_store.close()
+        serp_cache.close()
+        completion_cache.close()
 
 def main():
     """Wrapper для запуска асинхронной main функции."""
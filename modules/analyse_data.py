@@ -1,35 +1,133 @@
 # modules/analyse_data.py
 
 import os
+import json
 import pandas as pd
 import asyncio
-import time
 import logging
 from modules.utils import load_role_description
-from llm_clients import get_llm_client  # Импортируем функцию для получения LLM клиента
+from modules.rate_limiter import TokenRateLimiter, TokenEstimator, CHARS_PER_TOKEN
+from modules.history_index import open_history_index, prompt_fingerprint
+from modules.checkpoint import CheckpointJournal, row_id, write_csv_atomic
+from modules.analysis_batches import batched, build_batch_messages, parse_batch_response
+from modules.article_store import article_store
+from modules.snippets import select_snippet, snippet_config
+from modules.batch_analysis import (DEFAULT_BATCH_API_CONFIG, batch_model, batch_request_line, finish_batch_job,
+                                    get_batch_backend, run_batch_job)
+from llm_clients import get_cached_llm_client, completion_cache, provider_config  # Импортируем функцию для получения LLM клиента
 
-class RateLimiter:
-    def __init__(self, max_rate, period=60):
-        self.max_rate = max_rate
-        self.period = period
-        self.tokens = max_rate
-        self.updated_at = time.monotonic()
+def iter_rows(df, mask=None):
+    """
+    Лениво перебирает строки DataFrame как пары (индекс, словарь значений),
+    не создавая Series для каждой строки, как iterrows().
+    Если задана булева маска mask, пропускает строки, где она ложна.
+    """
+    columns = list(df.columns)
+    selected = mask if mask is not None else [True] * len(df)
+    for index, is_selected, values in zip(df.index, selected, zip(*(df[column] for column in columns))):
+        if is_selected:
+            yield index, dict(zip(columns, values))
 
-    async def acquire(self):
+# Режимы анализа: realtime — запрос на каждую статью (или пакет статей), batch — офлайн-задание Batch API
+ANALYSIS_MODES = ('realtime', 'batch')
+
+# Тексты короче не анализируются, длиннее — обрезаются
+MIN_ARTICLE_LENGTH = 100
+MAX_ARTICLE_LENGTH = 5000
+
+# Предел длины ответа модели (max_output_tokens), если он не задан в конфигурации:
+# лимит ответа на пакет статей не может его превышать
+DEFAULT_MAX_OUTPUT_TOKENS = 16384
+
+# Потоковый анализ с досрочной остановкой: для промптов с коротким ответом
+# (название компании или "3") поток прерывается, как только ответ получен
+DEFAULT_ANALYSIS_STREAM_CONFIG = {
+    "enabled": False,
+    "answer_pattern": r"^\s*[^\n]+",  # Ответ — первая непустая строка
+    "max_tokens": None                # Лимит длины ответа для этого типа промпта
+}
+
+def article_text(row, snippets=None):
+    """
+    Подготавливает текст строки для анализа: компания, сайт и описание.
+    Если у строки есть article_id, вместо превью из CSV берётся полный
+    текст статьи из хранилища article_store.
+
+    Если задан snippets (параметры modules.snippets), длинное описание
+    заменяется фрагментом, наиболее близким к поисковому запросу строки,
+    в пределах бюджета токенов; иначе текст обрезается до MAX_ARTICLE_LENGTH.
+    """
+    full_article_text = ""
+
+    if 'Organization name' in row and pd.notna(row['Organization name']):
+        full_article_text += f"Company: {row['Organization name']}\n"
+
+    if 'Website' in row and pd.notna(row['Website']):
+        full_article_text += f"Website: {row['Website']}\n"
+
+    text = article_store.get(row.get('article_id'))
+    if text is None and pd.notna(row['description']):
+        text = str(row['description'])
+    if text is not None:
+        if snippets and snippets['enabled']:
+            query = row.get('query') if pd.notna(row.get('query')) else ''
+            max_chars = max(0, snippets['analysis_max_tokens'] * CHARS_PER_TOKEN - len(full_article_text))
+            full_article_text += select_snippet(text, query, max_chars, snippets['lead_paragraphs'])
+        else:
+            full_article_text += text
+
+    return full_article_text.strip()[:MAX_ARTICLE_LENGTH]
+
+async def run_workers(items, handler, workers):
+    """
+    Обрабатывает элементы items пулом из workers обработчиков.
+
+    Элементы читаются из итератора по мере освобождения места в очереди
+    (не больше 2 * workers ожидающих), поэтому память не зависит от
+    числа элементов.
+    """
+    workers = max(1, workers)
+    queue = asyncio.Queue(maxsize=workers * 2)
+
+    async def producer():
+        for item in items:
+            await queue.put(item)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def worker():
         while True:
-            now = time.monotonic()
-            time_passed = now - self.updated_at
-            self.tokens += time_passed * (self.max_rate / self.period)
-            if self.tokens > self.max_rate:
-                self.tokens = self.max_rate
-            self.updated_at = now
-
-            if self.tokens >= 1:
-                self.tokens -= 1
+            item = await queue.get()
+            if item is None:
                 return
-            
-            sleep_time = (1 - self.tokens) / (self.max_rate / self.period)
-            await asyncio.sleep(sleep_time)
+            await handler(*item)
+
+    tasks = [asyncio.create_task(producer())] + [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def load_llm_config(roles_dir, parser_config):
+    """
+    Параметры анализа клиента: search_config.json, переопределённый
+    файлом roles/llm_config.json клиента, если он есть. Разделы
+    providers объединяются по провайдерам.
+    """
+    llm_config_file = os.path.join(roles_dir, 'llm_config.json')
+    if not os.path.exists(llm_config_file):
+        return parser_config
+    with open(llm_config_file, 'r', encoding='utf-8') as f:
+        overrides = json.load(f)
+    providers = {name: dict(section) for name, section in parser_config.get('providers', {}).items()}
+    for name, section in overrides.get('providers', {}).items():
+        providers.setdefault(name, {}).update(section)
+    merged = dict(parser_config)
+    merged.update(overrides)
+    merged['providers'] = providers
+    logging.info(f"Параметры анализа переопределены из {llm_config_file}.")
+    return merged
 
 async def analyse_data(input_filename, output_filename, roles_dir, parser_config):
     # Настройка логирования
@@ -41,6 +139,9 @@ async def analyse_data(input_filename, output_filename, roles_dir, parser_config
         ]
     )
 
+    # Клиент может выбрать своего провайдера и параметры в roles/llm_config.json
+    parser_config = load_llm_config(roles_dir, parser_config)
+
     # Путь к файлу с ролями
     role_file = os.path.join(roles_dir, 'prompt.txt')
 
@@ -56,61 +157,213 @@ async def analyse_data(input_filename, output_filename, roles_dir, parser_config
     if 'analysis' not in df.columns:
         df['analysis'] = ""
 
+    # История анализа за прошлые дни: переиспользуем готовые ответы или убираем уже найденные статьи
+    history, history_mode = open_history_index(roles_dir, parser_config)
+    prompt_key = prompt_fingerprint(role_description)
+    source = os.path.dirname(os.path.abspath(output_filename))
+    if history:
+        df, reused, skipped = history.apply(df, prompt_key, source, history_mode)
+        logging.info(f"История анализа: переиспользовано {reused}, пропущено ранее найденных статей {skipped}.")
+
+    # Журнал готовых результатов: восстанавливаем то, что успел сохранить прерванный запуск.
+    # Строки сопоставляются по row_id (хэш ссылки и описания), а не по позиции в файле.
+    journal = CheckpointJournal.from_config(output_filename, parser_config.get('analysis_checkpoint'))
+    completed_rows = journal.completed()
+    restored = 0
+    if completed_rows:
+        links = df['link'] if 'link' in df.columns else [None] * len(df)
+        for index, link, description in zip(df.index, links, df['description']):
+            analysis = completed_rows.get(row_id(link, description))
+            if analysis is not None:
+                df.at[index, 'analysis'] = analysis
+                restored += 1
+        logging.info(f"Восстановлено {restored} результатов из журнала {journal.path}.")
+
+    # В очередь попадают только строки без анализа
+    pending = df['analysis'].isna() | (df['analysis'] == "")
+    logging.info(f"Строк с готовым анализом: {len(df) - int(pending.sum())}, к анализу: {int(pending.sum())}.")
+
     # Настройка LLM клиента на основе конфигурации
     provider = parser_config.get('provider', 'openai')  # По умолчанию OpenAI
-    llm_client = get_llm_client(provider, parser_config)  # Передаём конфигурацию целиком
+    # Лимит ответа потокового режима применяется только к запросам по одной статье
+    stream_config = dict(DEFAULT_ANALYSIS_STREAM_CONFIG, **parser_config.get('analysis_stream', {}))
+    # Ответы кэшируются по клиенту; при изменении prompt.txt кэш клиента сбрасывается
+    client_name = os.path.basename(os.path.dirname(os.path.normpath(roles_dir)))
+    llm_client = get_cached_llm_client(provider, parser_config, namespace=client_name)  # Передаём конфигурацию целиком
+    invalidated = completion_cache.invalidate(client_name, role_description)
+    if invalidated:
+        logging.info(f"Промпт клиента {client_name} изменился: удалено {invalidated} ответов из кэша.")
+
+    # Ограничитель скорости по запросам и токенам за период; число одновременных запросов
+    # ограничено числом обработчиков (у балансировщика провайдеров — суммарная квота всех провайдеров)
+    llm_settings = provider_config(provider, parser_config)
+    max_rate = getattr(llm_client.client, 'rate_limit', llm_settings.get('rate_limit', 20))
+    rate_limit_period = getattr(llm_client.client, 'rate_limit_period', llm_settings.get('rate_limit_period', 60))
+    token_rate_limit = getattr(llm_client.client, 'token_rate_limit', llm_settings.get('token_rate_limit'))
+    rate_limiter = TokenRateLimiter(max_rate=max_rate, period=rate_limit_period, max_tokens=token_rate_limit)
+    workers = max(1, int(max_rate))
+    answer_max_tokens = llm_settings.get('max_tokens', 1500)
+    # Оценка запроса общая с клиентом, если он ведёт собственные лимиты токенов (ключи OpenAI)
+    token_estimator = getattr(llm_client.client, 'token_estimator', None) or TokenEstimator(answer_max_tokens)
+
+    # Выбор фрагментов статьи по запросу вместо обрезки по длине
+    snippets = snippet_config(parser_config)
+
+    # Размер пакета: сколько статей отправляется модели одним запросом. Лимит ответа на пакет —
+    # analysis_batch_answer_tokens на статью, но не больше предела модели max_output_tokens
+    batch_size = max(1, parser_config.get('analysis_batch_size', 1))
+    batch_answer_tokens = parser_config.get('analysis_batch_answer_tokens') or answer_max_tokens
+    max_output_tokens = llm_settings.get('max_output_tokens', DEFAULT_MAX_OUTPUT_TOKENS)
+    max_batch_size = max(1, max_output_tokens // batch_answer_tokens)
+    if batch_size > max_batch_size:
+        logging.warning(f"Ответ на пакет из {batch_size} статей не помещается в {max_output_tokens} токенов, "
+                        f"размер пакета уменьшен до {max_batch_size}.")
+        batch_size = max_batch_size
 
-    # Ограничитель скорости и семафор
-    max_rate = parser_config.get('rate_limit', 20)
-    rate_limit_period = parser_config.get('rate_limit_period', 60)
-    rate_limiter = RateLimiter(max_rate=max_rate, period=rate_limit_period)
+    async def request_completion(messages, stream=True, max_tokens=None):
+        stream = stream and stream_config['enabled']
+        answer_pattern = None
+        if stream:
+            max_tokens = stream_config['max_tokens']
+            answer_pattern = stream_config['answer_pattern']
+        # Сохранённый ответ не расходует лимит запросов
+        response = llm_client.lookup(messages, max_tokens, answer_pattern)
+        if response is None:
+            estimated = token_estimator.estimate(messages, max_tokens)
+            await rate_limiter.acquire(estimated)
+            if stream:
+                # Поток не сообщает расход токенов: списание уточняется по длине полученного ответа
+                response = await llm_client.get_completion_until(messages, answer_pattern, max_tokens)
+                rate_limiter.settle(estimated, token_estimator.count(messages, response))
+            else:
+                response, usage = await llm_client.get_completion_with_usage(messages, max_tokens)
+                rate_limiter.settle(estimated, token_estimator.observe(messages, usage))
+        return response
 
-    semaphore = asyncio.Semaphore(max_rate)
+    def save_result(index, row, response):
+        df.at[index, 'analysis'] = response
+        journal.append({'row_id': row_id(row.get('link'), row['description']), 'analysis': response})
+        if history:
+            history.record(row.get('link'), row['description'], response, prompt_key, source)
 
     async def process_row(index, row):
         try:
-            if pd.isna(row['analysis']) or row['analysis'] == "":
-                # Подготовка текста для анализа
-                full_article_text = ""
-                
-                if 'Organization name' in row and pd.notna(row['Organization name']):
-                    full_article_text += f"Company: {row['Organization name']}\n"
-                
-                if 'Website' in row and pd.notna(row['Website']):
-                    full_article_text += f"Website: {row['Website']}\n"
-                
-                if pd.notna(row['description']):
-                    full_article_text += str(row['description'])
-
-                full_article_text = full_article_text.strip()
-
-                if len(full_article_text) >= 100:
-                    if len(full_article_text) > 5000:
-                        full_article_text = full_article_text[:5000]
-                    
-                    messages = [
-                        {"role": "system", "content": role_description},
-                        {"role": "user", "content": full_article_text}
-                    ]
-                    
-                    async with semaphore:
-                        await rate_limiter.acquire()
-                        response = await llm_client.get_completion(messages)
-                    
-                    df.at[index, 'analysis'] = response
-                else:
-                    logging.info(f"\nСтрока {index + 1}: текст слишком короткий для анализа.")
+            full_article_text = article_text(row, snippets)
+            if len(full_article_text) >= MIN_ARTICLE_LENGTH:
+                messages = [
+                    {"role": "system", "content": role_description},
+                    {"role": "user", "content": full_article_text}
+                ]
+                save_result(index, row, await request_completion(messages))
             else:
-                logging.info(f"\nСтрока {index + 1}: анализ уже проведён.")
+                logging.info(f"\nСтрока {index + 1}: текст слишком короткий для анализа.")
         
         except Exception as e:
             logging.error(f"\nОшибка при обработке строки {index + 1}: {e}")
 
-        df.to_csv(output_filename, index=False)
-        logging.info(f"Результаты сохранены в '{output_filename}'. Обработано {index + 1} строк.")
+    async def process_batch(*items):
+        ready = []
+        for index, row in items:
+            full_article_text = article_text(row, snippets)
+            if len(full_article_text) >= MIN_ARTICLE_LENGTH:
+                ready.append((index, row, full_article_text))
+            else:
+                logging.info(f"\nСтрока {index + 1}: текст слишком короткий для анализа.")
+
+        answers = None
+        if len(ready) > 1:
+            messages = build_batch_messages(role_description, [text for _, _, text in ready])
+            # Лимит ответа растёт с числом статей, иначе ответ на пакет обрывается
+            max_tokens = min(batch_answer_tokens * len(ready), max_output_tokens)
+            try:
+                # Ответ на пакет содержит несколько статей, поэтому его нельзя обрывать на первой строке
+                response = await request_completion(messages, stream=False, max_tokens=max_tokens)
+                answers = parse_batch_response(response, len(ready))
+            except Exception as e:
+                logging.error(f"\nОшибка при пакетном анализе строк {[index + 1 for index, _, _ in ready]}: {e}")
+            if answers is None:
+                # Неразобранный ответ не должен возвращаться из кэша при следующем запуске
+                llm_client.forget(messages, max_tokens)
+                logging.warning(f"Не удалось разобрать ответ на пакет из {len(ready)} статей, анализируем по одной.")
+
+        if answers is None:
+            for index, row, _ in ready:
+                await process_row(index, row)
+            return
+        for (index, row, _), answer in zip(ready, answers):
+            save_result(index, row, answer)
+
+    async def process_batch_job():
+        batch_config = dict(DEFAULT_BATCH_API_CONFIG, **parser_config.get('batch_api', {}))
+        model = batch_model(batch_config, provider, llm_client.model)
+        # Кэш ответов ведётся по модели клиента: ответы другой модели задания в нём не хранятся
+        use_cache = model == llm_client.model
+        # Одинаковые строки (тот же row_id) отправляются в задании один раз
+        requests = {}
+        rows_by_id = {}
+        for index, row in iter_rows(df, pending):
+            full_article_text = article_text(row, snippets)
+            if len(full_article_text) < MIN_ARTICLE_LENGTH:
+                logging.info(f"\nСтрока {index + 1}: текст слишком короткий для анализа.")
+                continue
+            messages = [
+                {"role": "system", "content": role_description},
+                {"role": "user", "content": full_article_text}
+            ]
+            cached = llm_client.lookup(messages) if use_cache else None
+            if cached is not None:
+                save_result(index, row, cached)
+                continue
+            request_id = row_id(row.get('link'), row['description'])
+            requests[request_id] = messages
+            rows_by_id.setdefault(request_id, []).append((index, row))
+        state_path = f"{output_filename}.batch.json"
+        if not requests:
+            # Результаты прошлого задания уже в журнале, его состояние больше не нужно
+            finish_batch_job(state_path)
+            return
+
+        backend = get_batch_backend(batch_config, llm_client.client)
+        results = await run_batch_job(
+            [batch_request_line(request_id, model, messages, llm_client.params)
+             for request_id, messages in requests.items()],
+            backend, state_path, batch_config
+        )
+        for request_id, response in results.items():
+            if request_id not in rows_by_id:
+                continue
+            if use_cache:
+                llm_client.cache.put(llm_client.key(requests[request_id]), llm_client.namespace, response)
+            for index, row in rows_by_id[request_id]:
+                save_result(index, row, response)
+        # Оплаченное задание забываем только после того, как его ответы записаны на диск
+        journal.sync()
+        finish_batch_job(state_path)
+        logging.info(f"Пакетное задание: получено {len(results)} из {len(requests)} ответов.")
+
+    analysis_mode = parser_config.get('analysis_mode', 'realtime')
+    if analysis_mode not in ANALYSIS_MODES:
+        raise ValueError(f"Неизвестный режим анализа: {analysis_mode}")
 
-    tasks = [process_row(index, row) for index, row in df.iterrows()]
-    await asyncio.gather(*tasks)
+    completed = False
+    try:
+        if analysis_mode == 'batch':
+            await process_batch_job()
+        elif batch_size > 1:
+            await run_workers(batched(iter_rows(df, pending), batch_size), process_batch, workers)
+        else:
+            await run_workers(iter_rows(df, pending), process_row, workers)
+        completed = True
+    finally:
+        journal.close()
+        write_csv_atomic(df, output_filename)
+        logging.info(f"Результаты сохранены в '{output_filename}'.")
+        # Журнал нужен только для продолжения прерванного анализа
+        if completed:
+            journal.remove()
+        if history:
+            history.close()
+        await llm_client.close()
 
     logging.info("Анализ завершён.")
 
@@ -0,0 +1,60 @@
+# modules/analysis_batches.py
+
+import re
+from itertools import islice
+
+# Дополнение к промпту роли для пакетного анализа нескольких статей одним запросом
+BATCH_INSTRUCTIONS = (
+    "\n\nYou will receive several articles at once. Each article starts with a line "
+    "'### ARTICLE <n>'. Analyze every article independently according to the rules above. "
+    "Answer for every article in the same order: start each answer with a line '### <n>' "
+    "followed by the answer in the required format. Do not skip any article."
+)
+
+_ANSWER_HEADER = re.compile(r'^\s*###\s*(?:ARTICLE\s*)?(\d+)\s*:?\s*$', re.MULTILINE | re.IGNORECASE)
+
+
+def batched(items, size):
+    """
+    Разбивает итератор на кортежи длиной до size, не читая его целиком.
+    """
+    iterator = iter(items)
+    while True:
+        batch = tuple(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def build_batch_messages(role_description, texts):
+    """
+    Собирает один запрос к модели для нескольких статей с пронумерованными слотами.
+    """
+    content = "\n\n".join(f"### ARTICLE {number}\n{text}" for number, text in enumerate(texts, start=1))
+    return [
+        {"role": "system", "content": role_description + BATCH_INSTRUCTIONS},
+        {"role": "user", "content": content}
+    ]
+
+
+def parse_batch_response(response, count):
+    """
+    Разбирает ответ на пакетный запрос.
+
+    Returns:
+        list: Ответы для статей 1..count или None, если ответ не удалось
+        однозначно сопоставить со всеми статьями.
+    """
+    if not isinstance(response, str):
+        return None
+    parts = _ANSWER_HEADER.split(response)
+    answers = {}
+    for number, answer in zip(parts[1::2], parts[2::2]):
+        number = int(number)
+        answer = answer.strip()
+        if number in answers or not answer:
+            return None
+        answers[number] = answer
+    if set(answers) != set(range(1, count + 1)):
+        return None
+    return [answers[number] for number in range(1, count + 1)]
@@ -0,0 +1,157 @@
+# modules/article_cache.py
+
+import json
+import os
+import sqlite3
+import time
+from modules.link_utils import canonicalize_url
+
+# Параметры кэша статей по умолчанию
+DEFAULT_ARTICLE_CACHE_CONFIG = {
+    "enabled": False,
+    "path": "cache/articles.sqlite",
+    "ttl_hours": 24,         # Сколько запись считается свежей без обращения к сайту
+    "max_age_days": 30,      # Записи старше удаляются при очистке
+    "max_size_mb": 1024      # Предельный размер содержимого кэша
+}
+
+
+class ArticleCache:
+    """
+    Постоянный кэш загруженных статей в SQLite.
+
+    Ключ — канонический URL (см. canonicalize_url). Для каждой статьи
+    хранятся исходный HTML, заголовки ETag/Last-Modified и извлечённые
+    заголовок, авторы и текст. Свежие записи (моложе ttl_hours)
+    используются без сетевого запроса, устаревшие — перепроверяются
+    условным запросом (If-None-Match / If-Modified-Since).
+    """
+
+    def __init__(self, cache_config=None):
+        self.cache_config = dict(DEFAULT_ARTICLE_CACHE_CONFIG)
+        self._connection = None
+        self.configure(cache_config)
+
+    def configure(self, cache_config=None):
+        """
+        Обновляет параметры кэша. Закрывает открытое соединение.
+        """
+        if cache_config:
+            self.close()
+            self.cache_config.update(cache_config)
+
+    @property
+    def enabled(self):
+        return bool(self.cache_config.get('enabled'))
+
+    def _connect(self):
+        if self._connection is None:
+            path = self.cache_config['path']
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._connection = sqlite3.connect(path)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    url_key TEXT PRIMARY KEY,
+                    url TEXT,
+                    html TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    title TEXT,
+                    authors TEXT,
+                    text TEXT,
+                    fetched_at REAL,
+                    size INTEGER
+                )
+            """)
+            self._connection.execute("CREATE INDEX IF NOT EXISTS idx_articles_fetched_at ON articles (fetched_at)")
+            self._connection.commit()
+            self.evict()
+        return self._connection
+
+    def get(self, url):
+        """
+        Возвращает запись кэша для URL или None.
+        """
+        if not self.enabled:
+            return None
+        row = self._connect().execute(
+            "SELECT url, html, etag, last_modified, title, authors, text, fetched_at FROM articles WHERE url_key = ?",
+            (canonicalize_url(url),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'url': row[0],
+            'html': row[1],
+            'etag': row[2],
+            'last_modified': row[3],
+            'title': row[4],
+            'authors': json.loads(row[5]) if row[5] else [],
+            'text': row[6],
+            'fetched_at': row[7]
+        }
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched_at'] < self.cache_config['ttl_hours'] * 3600
+
+    def put(self, url, html_content, etag, last_modified, article):
+        """
+        Сохраняет загруженную статью и результат её разбора.
+        """
+        if not self.enabled:
+            return
+        text = article.get('text', '') or ''
+        size = len(html_content.encode('utf-8')) + len(text.encode('utf-8'))
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (canonicalize_url(url), url, html_content, etag, last_modified, article.get('title', ''),
+             json.dumps(article.get('authors', []), ensure_ascii=False), text, time.time(), size)
+        )
+        connection.commit()
+
+    def touch(self, url):
+        """
+        Продлевает свежесть записи после ответа 304 Not Modified.
+        """
+        if not self.enabled:
+            return
+        connection = self._connect()
+        connection.execute("UPDATE articles SET fetched_at = ? WHERE url_key = ?", (time.time(), canonicalize_url(url)))
+        connection.commit()
+
+    def evict(self):
+        """
+        Удаляет записи старше max_age_days и, если кэш превышает max_size_mb,
+        самые старые записи до укладывания в лимит.
+        """
+        connection = self._connection
+        if connection is None:
+            return
+        min_fetched_at = time.time() - self.cache_config['max_age_days'] * 86400
+        connection.execute("DELETE FROM articles WHERE fetched_at < ?", (min_fetched_at,))
+
+        max_size = self.cache_config['max_size_mb'] * 1024 * 1024
+        total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        if total_size > max_size:
+            excess = total_size - max_size
+            removed = 0
+            stale_keys = []
+            for url_key, size in connection.execute("SELECT url_key, size FROM articles ORDER BY fetched_at"):
+                if removed >= excess:
+                    break
+                stale_keys.append((url_key,))
+                removed += size
+            connection.executemany("DELETE FROM articles WHERE url_key = ?", stale_keys)
+        connection.commit()
+
+    def close(self):
+        if self._connection is not None:
+            self.evict()
+            self._connection.close()
+            self._connection = None
+
+
+# Общий кэш статей
+article_cache = ArticleCache()
@@ -0,0 +1,65 @@
+# modules/article_extractor.py
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from newspaper import Article
+
+
+def extract_article(url, html_content):
+    """
+    Извлекает заголовок, авторов и текст статьи из готового HTML.
+
+    Функция выполняется в отдельном процессе, поэтому принимает и
+    возвращает только простые типы.
+    """
+    article = Article(url)
+    article.set_html(html_content)
+    article.parse()
+    return {
+        'title': article.title,
+        'authors': article.authors,
+        'text': article.text
+    }
+
+
+class ArticleExtractor:
+    """
+    Пул процессов для разбора HTML статей вне цикла событий.
+
+    Размер пула задаётся ключом extraction_workers в search_config.json
+    (по умолчанию — число ядер). При значении 0 разбор выполняется
+    в текущем процессе, как раньше.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self._executor = None
+
+    def configure(self, workers=None):
+        """
+        Задаёт размер пула. Применяется к следующему создаваемому пулу.
+        """
+        if workers is not None:
+            self.shutdown()
+            self.workers = workers
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def extract(self, url, html_content):
+        if self.workers <= 0:
+            return extract_article(url, html_content)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), extract_article, url, html_content)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Общий пул разбора статей
+article_extractor = ArticleExtractor()
@@ -0,0 +1,128 @@
+# modules/article_store.py
+
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Параметры хранилища статей по умолчанию
+DEFAULT_ARTICLE_STORE_CONFIG = {
+    "enabled": False,
+    "path": "cache/article_store.sqlite",
+    "preview_chars": 500     # Длина превью текста в CSV
+}
+
+# Способы сжатия: zstd, если установлен пакет zstandard, иначе zlib
+CODEC = 'zstd' if zstandard is not None else 'zlib'
+
+
+def compress(text):
+    data = text.encode('utf-8')
+    if CODEC == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(blob, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Статья сжата zstd, но пакет zstandard не установлен.")
+        return zstandard.ZstdDecompressor().decompress(blob).decode('utf-8')
+    return zlib.decompress(blob).decode('utf-8')
+
+
+def article_id(text):
+    """
+    Идентификатор статьи — хэш её полного текста (одинаковые тексты хранятся один раз).
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class ArticleStore:
+    """
+    Хранилище полных текстов статей в SQLite со сжатием.
+
+    Тексты адресуются по содержимому (см. article_id), поэтому CSV
+    файлы этапов хранят только идентификатор и короткое превью, а
+    полный текст читается отсюда при анализе.
+    """
+
+    def __init__(self, store_config=None):
+        self.store_config = dict(DEFAULT_ARTICLE_STORE_CONFIG)
+        self._connection = None
+        self.configure(store_config)
+
+    def configure(self, store_config=None):
+        """
+        Обновляет параметры хранилища. Закрывает открытое соединение.
+        """
+        if store_config:
+            self.close()
+            self.store_config.update(store_config)
+
+    @property
+    def enabled(self):
+        return bool(self.store_config.get('enabled'))
+
+    @property
+    def preview_chars(self):
+        return self.store_config['preview_chars']
+
+    def _connect(self):
+        if self._connection is None:
+            path = self.store_config['path']
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._connection = sqlite3.connect(path)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    article_id TEXT PRIMARY KEY,
+                    codec TEXT,
+                    body BLOB,
+                    size INTEGER,
+                    stored_at REAL
+                )
+            """)
+            self._connection.commit()
+        return self._connection
+
+    def put(self, text):
+        """
+        Сохраняет текст и возвращает его идентификатор (None, если хранилище выключено).
+        """
+        if not self.enabled or not text:
+            return None
+        key = article_id(text)
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?)",
+            (key, CODEC, compress(text), len(text), time.time())
+        )
+        connection.commit()
+        return key
+
+    def get(self, key):
+        """
+        Возвращает полный текст статьи или None.
+        """
+        if not self.enabled or not isinstance(key, str) or not key:
+            return None
+        row = self._connect().execute("SELECT codec, body FROM articles WHERE article_id = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return decompress(row[1], row[0])
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# Общее хранилище статей
+article_store = ArticleStore()
@@ -0,0 +1,232 @@
+# modules/batch_analysis.py
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+import aiohttp
+from modules.http_session import session_manager
+
+# Параметры пакетного (офлайн) анализа по умолчанию
+DEFAULT_BATCH_API_CONFIG = {
+    "backend": "openai",              # openai или local (локальная замена для проверки)
+    "poll_interval": 60,              # Интервал опроса статуса задания в секундах
+    "completion_window": "24h",
+    "base_url": "https://api.openai.com/v1",
+    "model": None,                    # Модель задания; по умолчанию — модель провайдера openai
+    "workdir": "cache/batches"        # Каталог заданий локального бэкенда
+}
+
+# Параметры запроса, которые передаются в тело каждой строки задания
+BATCH_BODY_PARAMS = ('max_tokens', 'temperature', 'top_p')
+
+# Конечные статусы задания
+FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def batch_request_line(custom_id, model, messages, params):
+    """
+    Строка файла задания в формате OpenAI Batch API.
+    """
+    body = {'model': model, 'messages': messages}
+    body.update({name: value for name, value in params.items() if name in BATCH_BODY_PARAMS})
+    return {'custom_id': custom_id, 'method': 'POST', 'url': '/v1/chat/completions', 'body': body}
+
+
+def parse_batch_output(lines):
+    """
+    Разбирает файл результатов задания.
+
+    Returns:
+        dict: {custom_id: текст ответа} для успешно выполненных запросов.
+    """
+    results = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get('response') or {}
+        if entry.get('error') or response.get('status_code') != 200:
+            logging.warning(f"Запрос {entry.get('custom_id')} пакетного задания не выполнен: "
+                            f"{entry.get('error') or response.get('status_code')}")
+            continue
+        results[entry['custom_id']] = response['body']['choices'][0]['message']['content']
+    return results
+
+
+class LocalBatchBackend:
+    """
+    Локальная замена Batch API: задания хранятся в каталоге workdir
+    и выполняются при первом запросе статуса обычными вызовами клиента.
+    """
+
+    def __init__(self, workdir, llm_client):
+        self.workdir = workdir
+        self.llm_client = llm_client
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.workdir, job_id)
+
+    async def submit(self, input_path, completion_window=None):
+        job_id = f"local_{uuid.uuid4().hex}"
+        os.makedirs(self._job_dir(job_id), exist_ok=True)
+        shutil.copyfile(input_path, os.path.join(self._job_dir(job_id), 'input.jsonl'))
+        return job_id
+
+    async def status(self, job_id):
+        output_path = os.path.join(self._job_dir(job_id), 'output.jsonl')
+        if os.path.exists(output_path):
+            return 'completed'
+        with open(os.path.join(self._job_dir(job_id), 'input.jsonl'), 'r', encoding='utf-8') as input_file:
+            requests = [json.loads(line) for line in input_file if line.strip()]
+        with open(output_path + '.tmp', 'w', encoding='utf-8') as output_file:
+            for request in requests:
+                try:
+                    content = await self.llm_client.get_completion(request['body']['messages'])
+                    entry = {'custom_id': request['custom_id'], 'error': None,
+                             'response': {'status_code': 200, 'body': {'choices': [{'message': {'content': content}}]}}}
+                except Exception as e:
+                    entry = {'custom_id': request['custom_id'], 'error': {'message': str(e)}, 'response': None}
+                output_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(output_path + '.tmp', output_path)
+        return 'completed'
+
+    async def results(self, job_id):
+        with open(os.path.join(self._job_dir(job_id), 'output.jsonl'), 'r', encoding='utf-8') as output_file:
+            return parse_batch_output(output_file)
+
+
+class OpenAIBatchBackend:
+    """
+    Batch API OpenAI: загрузка файла задания, создание задания, опрос статуса
+    и скачивание результатов через общую aiohttp-сессию.
+    """
+
+    def __init__(self, api_key, base_url=DEFAULT_BATCH_API_CONFIG['base_url']):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self._output_file_ids = {}
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    async def _request(self, method, path, **kwargs):
+        session = await session_manager.get_session()
+        async with session.request(method, f"{self.base_url}{path}", headers=self.headers, **kwargs) as response:
+            response.raise_for_status()
+            if response.content_type == 'application/json':
+                return await response.json()
+            return await response.text()
+
+    async def submit(self, input_path, completion_window=DEFAULT_BATCH_API_CONFIG['completion_window']):
+        with open(input_path, 'rb') as input_file:
+            form = aiohttp.FormData()
+            form.add_field('purpose', 'batch')
+            form.add_field('file', input_file, filename=os.path.basename(input_path))
+            uploaded = await self._request('POST', '/files', data=form)
+        batch = await self._request('POST', '/batches', json={
+            'input_file_id': uploaded['id'],
+            'endpoint': '/v1/chat/completions',
+            'completion_window': completion_window
+        })
+        return batch['id']
+
+    async def status(self, job_id):
+        batch = await self._request('GET', f'/batches/{job_id}')
+        if batch.get('output_file_id'):
+            self._output_file_ids[job_id] = batch['output_file_id']
+        return batch['status']
+
+    async def results(self, job_id):
+        if job_id not in self._output_file_ids:
+            await self.status(job_id)
+        output_file_id = self._output_file_ids.get(job_id)
+        if not output_file_id:
+            return {}
+        content = await self._request('GET', f'/files/{output_file_id}/content')
+        return parse_batch_output(content.splitlines())
+
+
+def batch_model(batch_config, provider, model):
+    """
+    Модель для строк задания. Batch API OpenAI принимает только модели
+    OpenAI, поэтому модель другого провайдера (groq, openrouter и т.п.)
+    нужно явно заменить параметром batch_api.model.
+    """
+    if batch_config.get('model'):
+        return batch_config['model']
+    if batch_config['backend'] == 'openai' and provider != 'openai':
+        raise ValueError(f"Batch API OpenAI не поддерживает модели провайдера {provider}: "
+                         f"задайте модель задания в batch_api.model.")
+    return model
+
+
+def get_batch_backend(batch_config, llm_client):
+    """
+    Создаёт бэкенд пакетного анализа по параметру batch_api.backend.
+    """
+    backend = batch_config['backend']
+    if backend == 'local':
+        return LocalBatchBackend(batch_config['workdir'], llm_client)
+    if backend == 'openai':
+        api_keys = [key.strip() for key in os.getenv('OPENAI_API_KEYS', '').split(',') if key.strip()]
+        if not api_keys:
+            raise ValueError("Переменная окружения OPENAI_API_KEYS не установлена.")
+        return OpenAIBatchBackend(api_keys[0], batch_config['base_url'])
+    raise ValueError(f"Бэкенд пакетного анализа {backend} не поддерживается.")
+
+
+async def run_batch_job(requests, backend, state_path, batch_config):
+    """
+    Отправляет запросы одним заданием и ждёт его завершения.
+
+    Состояние задания хранится в state_path: прерванный запуск продолжит
+    ждать уже отправленное задание, а не отправит его повторно. Файл
+    состояния удаляет вызывающий код (finish_batch_job) после того, как
+    сохранит результаты.
+
+    Args:
+        requests (list): Строки задания (см. batch_request_line).
+
+    Returns:
+        dict: {custom_id: текст ответа}.
+    """
+    state = None
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as state_file:
+            state = json.load(state_file)
+        logging.info(f"Продолжаем ожидание пакетного задания {state['job_id']}.")
+
+    if state is None:
+        input_path = f"{state_path}.input.jsonl"
+        with open(input_path, 'w', encoding='utf-8') as input_file:
+            for request in requests:
+                input_file.write(json.dumps(request, ensure_ascii=False) + "\n")
+        job_id = await backend.submit(input_path, batch_config['completion_window'])
+        state = {'job_id': job_id}
+        with open(state_path, 'w', encoding='utf-8') as state_file:
+            json.dump(state, state_file)
+        os.remove(input_path)
+        logging.info(f"Отправлено пакетное задание {job_id}: {len(requests)} запросов.")
+
+    while True:
+        status = await backend.status(state['job_id'])
+        if status in FINAL_STATUSES:
+            break
+        logging.info(f"Пакетное задание {state['job_id']}: {status}. Следующая проверка через {batch_config['poll_interval']} с.")
+        await asyncio.sleep(batch_config['poll_interval'])
+
+    results = await backend.results(state['job_id'])
+    logging.info(f"Пакетное задание {state['job_id']} завершено со статусом {status}: получено {len(results)} ответов.")
+    return results
+
+
+def finish_batch_job(state_path):
+    """
+    Удаляет состояние задания, когда его результаты уже сохранены.
+    """
+    if os.path.exists(state_path):
+        os.remove(state_path)
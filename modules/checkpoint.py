@@ -0,0 +1,118 @@
+# modules/checkpoint.py
+
+import json
+import os
+import time
+from modules.fingerprints import fingerprint
+
+# Параметры журнала контрольных точек по умолчанию
+DEFAULT_CHECKPOINT_CONFIG = {
+    "flush_rows": 50,       # fsync после стольких записей...
+    "flush_interval": 5.0   # ...или после стольких секунд с прошлого fsync
+}
+
+
+def row_id(link, description):
+    """
+    Стабильный идентификатор строки для анализа: не зависит от её
+    позиции в файле, поэтому переживает перестановку и удаление строк.
+    """
+    return fingerprint(link, description)
+
+
+def journal_path(output_filename):
+    return f"{output_filename}.journal.jsonl"
+
+
+class CheckpointJournal:
+    """
+    Журнал готовых результатов в формате JSONL (одна строка на запись).
+
+    Каждая запись дописывается в конец файла и сразу передаётся ОС,
+    поэтому при падении процесса готовые результаты не теряются.
+    fsync выполняется раз в flush_rows записей или flush_interval секунд.
+    Оборванная последняя строка (падение во время записи) при чтении
+    пропускается, а перед новыми записями завершается переводом строки.
+    """
+
+    def __init__(self, path, flush_rows=DEFAULT_CHECKPOINT_CONFIG['flush_rows'],
+                 flush_interval=DEFAULT_CHECKPOINT_CONFIG['flush_interval']):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def from_config(cls, output_filename, checkpoint_config=None):
+        checkpoint_config = dict(DEFAULT_CHECKPOINT_CONFIG, **(checkpoint_config or {}))
+        return cls(journal_path(output_filename), checkpoint_config['flush_rows'], checkpoint_config['flush_interval'])
+
+    def load(self):
+        """
+        Возвращает записи, сохранённые в журнале прошлым запуском.
+        """
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
+
+    def completed(self):
+        """
+        Возвращает готовые результаты прошлых запусков: {row_id: analysis}.
+        """
+        return {entry['row_id']: entry['analysis'] for entry in self.load() if 'row_id' in entry}
+
+    def _open(self):
+        torn = False
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                torn = file.read(1) != b"\n"
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if torn:
+            # Завершаем оборванную строку, чтобы новая запись не склеилась с ней
+            self._file.write("\n")
+
+    def append(self, entry):
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.flush_rows or time.monotonic() - self._last_sync >= self.flush_interval:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def write_csv_atomic(df, output_filename):
+    """
+    Записывает DataFrame в CSV через временный файл, чтобы при падении
+    на диске не оставался наполовину записанный результат.
+    """
+    tmp_filename = f"{output_filename}.tmp"
+    df.to_csv(tmp_filename, index=False)
+    os.replace(tmp_filename, output_filename)
@@ -1,7 +1,12 @@
+import os
+import json
 import pandas as pd
 from fuzzywuzzy import fuzz
+from modules.fingerprints import fingerprint
+from modules.near_duplicates import (find_near_duplicates, find_near_duplicates_cdist, NEAR_DUPLICATE_METHODS,
+                                     NearDuplicateIndex, process_text)
 
-def clean_data(input_filename, output_filename, similarity_threshold=80, verbose=False):
+def clean_data(input_filename, output_filename, similarity_threshold=80, verbose=False, method='cdist', incremental=False):
     """
     Clean data by removing strict and non-strict duplicates.
 
@@ -10,11 +15,29 @@ def clean_data(input_filename, output_filename, similarity_threshold=80, verbose
         output_filename (str): Path to the output CSV file.
         similarity_threshold (int): Similarity threshold for fuzzy matching (default is 70).
         verbose (bool): Flag to enable/disable verbose output.
+        method (str): Near-duplicate search method: 'cdist' (exact blocked similarity
+            matrix on all cores, default) or 'lsh' (MinHash/LSH blocking by words; faster,
+            but may miss pairs that differ by typos in many words).
+        incremental (bool): Only check rows appended to the input file since the last run
+            against the persisted fingerprint index of accepted rows and append the new
+            unique rows to the output file. Falls back to a full clean if there is no index.
 
     Returns:
         tuple: Number of rows before and after cleaning.
     """
     print("Начало функции clean_data")
+    if method not in NEAR_DUPLICATE_METHODS:
+        raise ValueError(f"Неизвестный метод поиска дубликатов: {method}")
+
+    if incremental:
+        index_data = load_fingerprint_index(output_filename, similarity_threshold)
+        if index_data is not None:
+            result = clean_data_incremental(input_filename, output_filename, index_data, verbose, method)
+            if result is not None:
+                print("Конец функции clean_data")
+                return result
+        print("Индекс отпечатков отсутствует или устарел, выполняем полную очистку...")
+
     print(f"Загрузка данных из файла {input_filename}...")
     try:
         df = pd.read_csv(input_filename)
@@ -38,19 +61,23 @@ def clean_data(input_filename, output_filename, similarity_threshold=80, verbose
     indexes_to_remove = set()
 
     print("Поиск дубликатов с 'нестрогим' сравнением...")
-    # Use fuzzy matching algorithm to find duplicates
-    for i in range(len(df_no_strict_duplicates_sorted) - 1):
-        for j in range(i + 1, len(df_no_strict_duplicates_sorted)):
-            # Use fuzz.token_sort_ratio to compare strings
-            similarity_title = fuzz.token_sort_ratio(df_no_strict_duplicates_sorted.loc[i, 'title'], df_no_strict_duplicates_sorted.loc[j, 'title'])
-            similarity_text = fuzz.token_sort_ratio(df_no_strict_duplicates_sorted.loc[i, 'description'], df_no_strict_duplicates_sorted.loc[j, 'description'])
-
-            # if similarity_title > similarity_threshold or similarity_text > similarity_threshold:
-            if similarity_text > similarity_threshold:
-                indexes_to_remove.add(df_no_strict_duplicates_sorted.loc[j, 'index'])  # Add index to set for removal
-                if verbose:
-                    print(f"Найден дубликат: строка {i + 1} и строка {j + 1}")
-                    print(f"Схожесть заголовка: {similarity_title}, Схожесть текста: {similarity_text}")
+    # 'lsh': candidate pairs are selected with MinHash/LSH blocking, only they get the exact fuzz.token_sort_ratio check
+    # 'cdist': all pairs are scored in fixed-size blocks with rapidfuzz on all cores
+    titles = df_no_strict_duplicates_sorted['title'].tolist()
+    descriptions = df_no_strict_duplicates_sorted['description'].tolist()
+    original_indexes = df_no_strict_duplicates_sorted['index'].tolist()
+
+    if method == 'cdist':
+        duplicates = find_near_duplicates_cdist(descriptions, similarity_threshold)
+    else:
+        duplicates = find_near_duplicates(descriptions, similarity_threshold)
+
+    for i, j, similarity_text in duplicates:
+        indexes_to_remove.add(original_indexes[j])  # Add index to set for removal
+        if verbose:
+            similarity_title = fuzz.token_sort_ratio(titles[i], titles[j])
+            print(f"Найден дубликат: строка {i + 1} и строка {j + 1}")
+            print(f"Схожесть заголовка: {similarity_title}, Схожесть текста: {similarity_text}")
 
     # Remove duplicates found in the 'non-strict' comparison stage
     df_final = df_no_strict_duplicates_sorted.drop(df_no_strict_duplicates_sorted[df_no_strict_duplicates_sorted['index'].isin(indexes_to_remove)].index).reset_index(drop=True)
@@ -59,6 +86,12 @@ def clean_data(input_filename, output_filename, similarity_threshold=80, verbose
     # Save cleaned data back to CSV
     df_final.to_csv(output_filename, index=False)
 
+    # The fingerprint index must describe exactly the rows of the output file
+    if incremental:
+        save_fingerprint_index(output_filename, build_fingerprint_index(df_final, similarity_threshold, rows_before))
+    elif os.path.exists(fingerprint_index_path(output_filename)):
+        os.remove(fingerprint_index_path(output_filename))
+
     rows_after = len(df_final)
 
     # Output information about the number of removed and remaining rows
@@ -67,4 +100,128 @@ def clean_data(input_filename, output_filename, similarity_threshold=80, verbose
     print(f"Данные очищены и сохранены в '{output_filename}'.")
 
     print("Конец функции clean_data")
-    return rows_before, rows_after
\ No newline at end of file
+    return rows_before, rows_after
+
+def fingerprint_index_path(output_filename):
+    """
+    Path to the fingerprint index stored next to the cleaned CSV file.
+    """
+    return os.path.splitext(str(output_filename))[0] + '.index.json'
+
+def build_fingerprint_index(df, similarity_threshold, input_rows):
+    """
+    Build the fingerprint index of accepted (cleaned) rows.
+
+    Args:
+        df (DataFrame): Cleaned rows.
+        similarity_threshold (int): Similarity threshold the index was built with.
+        input_rows (int): Number of input file rows already covered by the index.
+
+    Returns:
+        dict: JSON-serializable index.
+    """
+    near_duplicate_index = NearDuplicateIndex(similarity_threshold)
+    for description in df['description']:
+        near_duplicate_index.add(process_text(description))
+    return {
+        'input_rows': input_rows,
+        'strict_keys': [fingerprint(title, description) for title, description in zip(df['title'], df['description'])],
+        'near_duplicates': near_duplicate_index.to_dict()
+    }
+
+def save_fingerprint_index(output_filename, index_data):
+    path = fingerprint_index_path(output_filename)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index_data, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+def load_fingerprint_index(output_filename, similarity_threshold):
+    """
+    Load the fingerprint index if it exists and matches the output file and threshold.
+
+    Returns:
+        dict: Index data or None.
+    """
+    path = fingerprint_index_path(output_filename)
+    if not os.path.exists(path) or not os.path.exists(output_filename):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index_data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ошибка при чтении индекса отпечатков {path}: {e}")
+        return None
+    if index_data['near_duplicates']['similarity_threshold'] != similarity_threshold:
+        return None
+    return index_data
+
+def clean_data_incremental(input_filename, output_filename, index_data, verbose=False, method='cdist'):
+    """
+    Check only the rows appended to the input file since the last clean.
+
+    New rows are compared with the fingerprint index of accepted rows: exact
+    (title, description) matches and descriptions more similar than the
+    index threshold are dropped, the rest are added to the output file
+    (kept sorted by title, as after a full clean) and to the index. With
+    method 'cdist' new rows are compared with all accepted rows, with 'lsh'
+    only with the LSH candidates.
+
+    Returns:
+        tuple: Total number of input rows and of rows in the output file, as
+        for a full clean, or None if the input file no longer matches the
+        index and a full clean is required.
+    """
+    print(f"Загрузка данных из файла {input_filename}...")
+    df = pd.read_csv(input_filename)
+    processed_rows = index_data['input_rows']
+    if len(df) < processed_rows:
+        print("Входной файл короче, чем при прошлой очистке.")
+        return None
+
+    new_rows = df.iloc[processed_rows:]
+    print(f"Новых строк для проверки: {len(new_rows)} (уже обработано: {processed_rows})")
+
+    strict_keys = set(index_data['strict_keys'])
+    near_duplicate_index = NearDuplicateIndex.from_dict(index_data['near_duplicates'])
+    accepted = []
+    strict_removed = 0
+    near_removed = 0
+
+    for position, title, description in zip(new_rows.index, new_rows['title'], new_rows['description']):
+        key = fingerprint(title, description)
+        if key in strict_keys:
+            strict_removed += 1
+            continue
+
+        processed = process_text(description)
+        band_keys = near_duplicate_index.band_keys(processed)
+        if method == 'cdist':
+            match = near_duplicate_index.find_exact(processed)
+        else:
+            match = near_duplicate_index.find(processed, band_keys)
+        if match is not None:
+            near_removed += 1
+            if verbose:
+                print(f"Найден дубликат: новая строка {position + 1}, схожесть текста: {match[1]}")
+            continue
+
+        strict_keys.add(key)
+        index_data['strict_keys'].append(key)
+        near_duplicate_index.add(processed, band_keys)
+        accepted.append(position)
+
+    if accepted:
+        # The output is rewritten rather than appended to: it stays sorted by title, and new
+        # columns (e.g. article_id after enabling the article store) are kept
+        df_output = pd.concat([pd.read_csv(output_filename), new_rows.loc[accepted].reset_index()], ignore_index=True)
+        df_output.sort_values('title', kind='stable').to_csv(output_filename, index=False)
+
+    index_data['input_rows'] = len(df)
+    index_data['near_duplicates'] = near_duplicate_index.to_dict()
+    save_fingerprint_index(output_filename, index_data)
+
+    print(f"Строгих дубликатов удалено: {strict_removed}")
+    print(f"Строк удалено на этапе 'нестрогого' сравнения: {near_removed}")
+    print(f"Добавлено строк в '{output_filename}': {len(accepted)}")
+    return len(df), len(index_data['strict_keys'])
@@ -34,6 +34,11 @@ def create_project_structure(config):
     with open(search_query_file, 'w') as f:
         json.dump(config['search_queries'], f)
 
+    # Параметры анализа для промпта клиента (например, потоковый режим для короткого ответа)
+    if config.get('llm_config'):
+        with open(os.path.join(roles_dir, 'llm_config.json'), 'w') as f:
+            json.dump(config['llm_config'], f, indent=2)
+
     # Папка текущего поиска
     search_date_str = search_date.strftime('%Y-%m-%d')
     current_search_dir = os.path.join(client_dir, search_date_str)
@@ -5,6 +5,11 @@ import os
 import logging
 from modules.fetch_data import fetch_xmlstock_search_results, process_search_results
 from modules.utils import clean_domain
+from modules.http_session import session_manager
+from modules.article_extractor import article_extractor
+from modules.article_cache import article_cache
+from modules.serp_cache import serp_cache
+from modules.article_store import article_store
 
 MAX_CONCURRENT_REQUESTS = 20  # Максимальное количество одновременно выполняемых запросов
 semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
@@ -87,15 +92,26 @@ async def fetch_company_data(input_file, output_file, config):
                     articles = await process_search_results(search_results)
                     if articles:
                         article = articles[0]  # Берем только первый результат для каждого запроса
+                        text = article.get('text', '') or ''
                         result = row.to_dict()
                         result.update({
                             'company_name': company_name,
                             'search_query': full_query,
                             'title': article.get('title', ''),
-                            'link': article.get('article_url', ''),
-                            'found_text': article.get('text', '')[:1000],
-                            'description': article.get('text', '')[:5000]
+                            'link': article.get('article_url', '')
                         })
+                        if article_store.enabled:
+                            # В CSV только превью, полный текст читается из хранилища при анализе
+                            result.update({
+                                'found_text': text[:article_store.preview_chars],
+                                'description': text[:article_store.preview_chars],
+                                'article_id': article_store.put(text)
+                            })
+                        else:
+                            result.update({
+                                'found_text': text[:1000],
+                                'description': text[:5000]
+                            })
                         company_results.append(result)
                         logging.info(f"Результаты для компании '{company_name}': {result}")
                         break
@@ -110,7 +126,8 @@ async def fetch_company_data(input_file, output_file, config):
                 'title': '',
                 'link': '',
                 'found_text': '',
-                'description': ''
+                'description': '',
+                **({'article_id': ''} if article_store.enabled else {})
             })
             company_results.append(result)
 
@@ -136,6 +153,20 @@ async def fetch_company_data(input_file, output_file, config):
 
     logging.info(f"Обработка завершена.")
 
+async def fetch_company_data_with_session(input_file, output_file, config):
+    """Запускает fetch_company_data с общей сессией, пулом разбора и кэшами и освобождает их по завершении."""
+    session_manager.configure(config.get('http'))
+    article_extractor.configure(config.get('extraction_workers'))
+    article_cache.configure(config.get('article_cache'))
+    serp_cache.configure(config.get('serp_cache'))
+    try:
+        async with session_manager:
+            await fetch_company_data(input_file, output_file, config)
+    finally:
+        article_extractor.shutdown()
+        article_cache.close()
+        serp_cache.close()
+
 def run_fetch_company_data(input_file, output_file, config):
     setup_logging()
-    asyncio.run(fetch_company_data(input_file, output_file, config))
+    asyncio.run(fetch_company_data_with_session(input_file, output_file, config))
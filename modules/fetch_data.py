@@ -3,9 +3,16 @@ import aiohttp
 import pandas as pd
 import time
 import xml.etree.ElementTree as ET
-from newspaper import Article
 from config.api_keys import api_keys
 from modules.date_utils import parse_date
+from modules.rate_limiter import RequestBudget
+from modules.http_session import session_manager
+from modules.article_extractor import article_extractor
+from modules.article_cache import article_cache
+from modules.serp_cache import serp_cache
+from modules.url_registry import UrlRegistry, QUERY_SEPARATOR
+from modules.snippets import select_snippet, snippet_config
+from modules.article_store import article_store
 from datetime import datetime, timedelta
 import os
 
@@ -21,9 +28,27 @@ semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 # Задержка между запросами в секундах
 REQUEST_DELAY = 1
 
-async def fetch_xmlstock_search_results(query, include, exclude, config, verbose=False):
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+}
+
+# Количество поисковых запросов, выполняемых одновременно, по умолчанию
+DEFAULT_QUERY_CONCURRENCY = 5
+
+def get_search_engine_config(config, name):
+    """
+    Возвращает конфигурацию поискового движка по имени или None.
+    """
+    return next((engine for engine in config.get('search_engines', []) if engine['name'] == name), None)
+
+async def fetch_xmlstock_search_results(query, include, exclude, config, verbose=False, budget=None):
     """
     Асинхронно получает результаты поиска из API xmlstock.
+
+    Если передан budget (RequestBudget), он ограничивает запросы к xmlstock
+    вместо общего семафора и фиксированной задержки. Страницы выдачи
+    берутся из serp_cache, если такой же запрос уже выполнялся в пределах
+    ttl_hours.
     """
     results = []
     
@@ -35,7 +60,7 @@ async def fetch_xmlstock_search_results(query, include, exclude, config, verbose
     
     print(f"Полный поисковый запрос: {full_query}")
     
-    xmlsearch_config = next((engine for engine in config['search_engines'] if engine['name'] == 'xmlsearch'), None)
+    xmlsearch_config = get_search_engine_config(config, 'xmlsearch')
     if not xmlsearch_config:
         print("Конфигурация для xmlsearch не найдена")
         return results
@@ -56,141 +81,355 @@ async def fetch_xmlstock_search_results(query, include, exclude, config, verbose
     if config['days']:
         params["tbs"] = f"qdr:d{config['days']}"
     
-    async with aiohttp.ClientSession() as session:
-        for page in range(config['num_pages']):
-            params['page'] = page
+    session = await session_manager.get_session()
+    for page in range(config['num_pages']):
+        params['page'] = page
+
+        content = serp_cache.get(params, serp_cache.ttl)
+        from_cache = content is not None
+        if from_cache:
+            if verbose:
+                print(f"Результаты страницы {page} взяты из кэша")
+        else:
             if verbose:
                 print(f"Отправка запроса с параметрами: {params}")
-            
-            async with semaphore:  # Используем семафор для ограничения одновременных запросов
-                try:
-                    async with session.get(url, params=params, timeout=30) as response:
-                        if verbose:
-                            print(f"Код статуса ответа: {response.status}")
-                            print(f"URL запроса: {response.url}")
-                        
-                        if response.status != 200:
-                            if verbose:
-                                print(f"Ошибка при получении результатов: {response.status}")
-                                print(await response.text())
-                            continue
-
-                        content = await response.text()
-                        # print(f"content {content}")
-                        root = ET.fromstring(content)
-                        for group in root.findall('.//group'):
-                            for doc in group.findall('doc'):
-                                
-                                pub_date = doc.find('pubDate').text if doc.find('pubDate') is not None else "N/A"
-                                pub_date_dt = parse_date(pub_date) if pub_date != "N/A" else None
-                                # if config['days'] is False or (pub_date_dt is not None and pub_date_dt >= (datetime.now() - timedelta(days=config['days']))):
-                                result = {
-                                    'title': doc.find('title').text if doc.find('title') is not None else "N/A",
-                                    'link': doc.find('url').text if doc.find('url') is not None else "N/A",
-                                    'pubDate': pub_date
-                                }
-                                results.append(result)
-                                if len(results) >= config['num_results']:
-                                    return results[:config['num_results']]
-                    
-                    if verbose:
-                        print(f"Получено результатов: {len(results)}")
-                
-                except asyncio.TimeoutError:
-                    if verbose:
-                        print(f"Таймаут при получении результатов для страницы {page}")
-                except Exception as e:
-                    if verbose:
-                        print(f"Ошибка при получении результатов для страницы {page}: {e}")
-                
-                await asyncio.sleep(REQUEST_DELAY)  # Добавляем задержку между запросами
+            content = await fetch_xmlstock_page(session, params, verbose, budget)
+            if content is None:
+                continue
+
+        try:
+            page_results, error = parse_xmlstock_response(content)
+        except ET.ParseError as e:
+            if verbose:
+                print(f"Ошибка при разборе результатов для страницы {page}: {e}")
+            continue
+
+        if error:
+            if verbose:
+                print(f"xmlstock вернул ошибку для страницы {page}: {error}")
+            continue
+
+        if not from_cache:
+            serp_cache.put(params, content)
+
+        results.extend(page_results)
+        if verbose:
+            print(f"Получено результатов: {len(results)}")
+        if len(results) >= config['num_results']:
+            break
 
     return results[:config['num_results']]
 
-async def fetch_and_parse(url, verbose=False, proxy=None, timeout=240):
+async def fetch_xmlstock_page(session, params, verbose=False, budget=None):
     """
-    Асинхронно получает и парсит статью по указанному URL.
+    Загружает одну страницу выдачи xmlstock.
+
+    Returns:
+        str: XML ответа или None при ошибке.
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-    }
-    async with semaphore:  # Используем семафор для ограничения одновременных запросов
+    async with budget or semaphore:  # Ограничиваем одновременные запросы к провайдеру
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, proxy=proxy, timeout=timeout) as response:
-                    if response.status != 200:
-                        raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status)
-                    html_content = await response.text()
-            
-            article = Article(url)
-            article.set_html(html_content)
-            article.parse()
-            print(f"Успешно получен текст статьи {article.text[:500]}")
-            return {
-                'title': article.title,
-                'authors': article.authors,
-                'text': article.text,
-                'article_url': url
-            }
+            async with session.get(url, params=params, timeout=30) as response:
+                if verbose:
+                    print(f"Код статуса ответа: {response.status}")
+                    print(f"URL запроса: {response.url}")
+
+                if response.status != 200:
+                    if verbose:
+                        print(f"Ошибка при получении результатов: {response.status}")
+                        print(await response.text())
+                    return None
+
+                return await response.text()
+
         except asyncio.TimeoutError:
-            print(f"Таймаут при получении статьи: {url}")
-            return {
-                'title': "N/A",
-                'authors': [],
-                'text': "Таймаут при получении статьи",
-                'article_url': url
-            }
+            if verbose:
+                print(f"Таймаут при получении результатов для страницы {params.get('page')}")
         except Exception as e:
-            print(f"Ошибка при получении или парсинге статьи: {url}\n{e}")
-            return {
-                'title': "N/A",
-                'authors': [],
-                'text': f"Ошибка: {str(e)}",
-                'article_url': url
-            }
+            if verbose:
+                print(f"Ошибка при получении результатов для страницы {params.get('page')}: {e}")
+        finally:
+            if budget is None:
+                await asyncio.sleep(REQUEST_DELAY)  # Добавляем задержку между запросами
+
+    return None
+
+def parse_xmlstock_response(content):
+    """
+    Разбирает XML ответа xmlstock.
+
+    Returns:
+        tuple: (список результатов, текст ошибки xmlstock или None).
+    """
+    root = ET.fromstring(content)
+    error = root.find('.//error')
+    if error is not None:
+        return [], error.text or "unknown error"
+
+    results = []
+    for group in root.findall('.//group'):
+        for doc in group.findall('doc'):
+            pub_date = doc.find('pubDate').text if doc.find('pubDate') is not None else "N/A"
+            # pub_date_dt = parse_date(pub_date) if pub_date != "N/A" else None
+            # if config['days'] is False or (pub_date_dt is not None and pub_date_dt >= (datetime.now() - timedelta(days=config['days']))):
+            results.append({
+                'title': doc.find('title').text if doc.find('title') is not None else "N/A",
+                'link': doc.find('url').text if doc.find('url') is not None else "N/A",
+                'pubDate': pub_date
+            })
+    return results, None
+
+async def download_html(url, proxy=None, timeout=240, etag=None, last_modified=None):
+    """
+    Асинхронно загружает HTML страницы через общую сессию.
+
+    Если переданы etag или last_modified, выполняется условный запрос.
+
+    Returns:
+        tuple: (status, html_content, etag, last_modified). При ответе
+        304 Not Modified html_content равен None.
+    """
+    headers = dict(HEADERS)
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    async with semaphore:  # Используем семафор для ограничения одновременных запросов
+        try:
+            session = await session_manager.get_session()
+            async with session.get(url, headers=headers, proxy=proxy, timeout=timeout) as response:
+                if response.status == 304:
+                    return response.status, None, etag, last_modified
+                if response.status != 200:
+                    raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status)
+                return (response.status, await response.text(),
+                        response.headers.get('ETag'), response.headers.get('Last-Modified'))
         finally:
             await asyncio.sleep(REQUEST_DELAY)  # Добавляем задержку между запросами
 
-async def process_search_results(search_results, verbose=False, proxy=None):
+async def fetch_and_parse(url, verbose=False, proxy=None, timeout=240):
+    """
+    Асинхронно получает и парсит статью по указанному URL.
+
+    Сначала проверяется article_cache: свежая запись возвращается без
+    сетевого запроса, устаревшая перепроверяется условным запросом. Если
+    перепроверить не удалось (сетевая ошибка или 5xx), возвращается
+    устаревшая копия. Разбор HTML выполняется в пуле процессов article_extractor уже после
+    освобождения семафора, поэтому загрузки и разбор идут параллельно.
+    """
+    try:
+        cached = article_cache.get(url)
+        if cached and article_cache.is_fresh(cached):
+            if verbose:
+                print(f"Статья взята из кэша: {url}")
+            article = cached
+        else:
+            try:
+                status, html_content, etag, last_modified = await download_html(
+                    url, proxy, timeout,
+                    etag=cached['etag'] if cached else None,
+                    last_modified=cached['last_modified'] if cached else None
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Ответ 4xx означает, что статьи больше нет; при сбое сети или сервера устаревшая копия лучше пустой
+                if cached is None or (isinstance(e, aiohttp.ClientResponseError) and e.status < 500):
+                    raise
+                print(f"Не удалось перепроверить статью ({e!r}), используем устаревшую копию из кэша: {url}")
+                article = cached
+            else:
+                if status == 304:
+                    if verbose:
+                        print(f"Статья не изменилась, используем кэш: {url}")
+                    article_cache.touch(url)
+                    article = cached
+                else:
+                    article = await article_extractor.extract(url, html_content)
+                    article_cache.put(url, html_content, etag, last_modified, article)
+        print(f"Успешно получен текст статьи {article['text'][:500]}")
+        return {
+            'title': article['title'],
+            'authors': article['authors'],
+            'text': article['text'],
+            'article_url': url
+        }
+    except asyncio.TimeoutError:
+        print(f"Таймаут при получении статьи: {url}")
+        return {
+            'title': "N/A",
+            'authors': [],
+            'text': "Таймаут при получении статьи",
+            'article_url': url
+        }
+    except Exception as e:
+        print(f"Ошибка при получении или парсинге статьи: {url}\n{e}")
+        return {
+            'title': "N/A",
+            'authors': [],
+            'text': f"Ошибка: {str(e)}",
+            'article_url': url
+        }
+
+async def process_search_results(search_results, verbose=False, proxy=None, url_registry=None):
     """
     Асинхронно обрабатывает результаты поиска, получая и парся статьи.
+
+    Если передан url_registry (UrlRegistry), статьи с одинаковым
+    каноническим URL загружаются один раз на весь запуск.
     """
-    tasks = [fetch_and_parse(result['link'], verbose, proxy) for result in search_results]
+    if url_registry is None:
+        tasks = [fetch_and_parse(result['link'], verbose, proxy) for result in search_results]
+    else:
+        fetch_func = lambda link: fetch_and_parse(link, verbose, proxy)
+        tasks = [url_registry.fetch(result['link'], fetch_func) for result in search_results]
     return await asyncio.gather(*tasks)
 
-async def fetch_and_save_articles(query, include, exclude, config, output_filename, verbose=False, proxy=None):
+async def fetch_articles(query, include, exclude, config, verbose=False, proxy=None, budget=None, url_registry=None):
     """
-    Асинхронно получает результаты поиска, обрабатывает их и сохраняет список статей.
+    Асинхронно получает результаты поиска и статьи для одного запроса.
+
+    Returns:
+        list: Список статей в формате строк search_results.csv.
     """
-    search_results = await fetch_xmlstock_search_results(query, include, exclude, config, verbose)
+    search_results = await fetch_xmlstock_search_results(query, include, exclude, config, verbose, budget=budget)
     if not search_results:
-        print("Результаты поиска не найдены.")
+        print(f"Результаты поиска не найдены для запроса: {query}")
         return []
 
-    articles = await process_search_results(search_results, verbose, proxy)
-    
+    articles = await process_search_results(search_results, verbose, proxy, url_registry)
+
+    snippets = snippet_config(config)
     processed_articles = []
     for search_result, article in zip(search_results, articles):
+        text = article.get('text', '') or ''
+        if snippets['enabled']:
+            # Описание — абзацы статьи, наиболее близкие к запросу
+            description = select_snippet(text, f"{query} {include or ''}", snippets['description_chars'],
+                                         snippets['lead_paragraphs'])
+        elif article_store.enabled:
+            description = text[:article_store.preview_chars]  # Превью; полный текст — в хранилище статей
+        else:
+            description = text[:500]  # Берем первые 500 символов текста статьи как описание
         processed_article = {
             'title': search_result.get('title', ''),
             'link': search_result.get('link', ''),
             'pubDate': search_result.get('pubDate', ''),
-            'description': article.get('text', '')[:500],  # Берем первые 500 символов текста статьи как описание
+            'description': description,
+            **({'article_id': article_store.put(text)} if article_store.enabled else {}),
             'query': query,
             'analysis': ''  # Пустое поле для будущего анализа
         }
         processed_articles.append(processed_article)
 
-    # Сохраняем результаты после обработки всего поискового запроса
-    df = pd.DataFrame(processed_articles)
-    if os.path.exists(output_filename):
-        df.to_csv(output_filename, mode='a', header=False, index=False)
+    return processed_articles
+
+def save_articles(articles, output_filename):
+    """
+    Дописывает статьи в CSV файл, создавая его с заголовком при необходимости.
+    """
+    if not articles:
+        return
+    df = pd.DataFrame(articles)
+    if os.path.exists(output_filename) and os.path.getsize(output_filename) > 0:
+        columns = pd.read_csv(output_filename, nrows=0).columns
+        if set(df.columns) - set(columns):
+            # Новые колонки (например, article_id после включения хранилища статей) — перезаписываем файл
+            pd.concat([pd.read_csv(output_filename), df], ignore_index=True).to_csv(output_filename, index=False)
+        else:
+            df.reindex(columns=columns).to_csv(output_filename, mode='a', header=False, index=False)
     else:
         df.to_csv(output_filename, index=False)
 
+async def fetch_and_save_articles(query, include, exclude, config, output_filename, verbose=False, proxy=None):
+    """
+    Асинхронно получает результаты поиска, обрабатывает их и сохраняет список статей.
+    """
+    processed_articles = await fetch_articles(query, include, exclude, config, verbose, proxy)
+
+    # Сохраняем результаты после обработки всего поискового запроса
+    save_articles(processed_articles, output_filename)
+
     print(f"Сохранено {len(processed_articles)} статей для запроса: {query}")
     return processed_articles
 
+async def fetch_and_save_queries(queries, include, exclude, config, output_filename, verbose=False, proxy=None):
+    """
+    Конкурентно выполняет поисковые запросы и сохраняет статьи.
+
+    Одновременно выполняется не более config['query_concurrency'] запросов,
+    а обращения к xmlstock ограничиваются бюджетом провайдера из
+    конфигурации движка xmlsearch (max_concurrent_requests, rate_limit,
+    rate_limit_period). Результаты записываются в порядке следования
+    запросов, независимо от того, какой из них завершился раньше, поэтому
+    содержимое файла воспроизводимо.
+
+    Статья, найденная несколькими запросами, загружается один раз и
+    сохраняется одной строкой первым по порядку запросом; в колонке query
+    этой строки перечисляются все нашедшие её запросы.
+
+    Returns:
+        int: Количество сохранённых статей.
+    """
+    query_concurrency = max(1, config.get('query_concurrency', DEFAULT_QUERY_CONCURRENCY))
+    query_semaphore = asyncio.Semaphore(query_concurrency)
+    budget = RequestBudget.from_config(get_search_engine_config(config, 'xmlsearch') or {},
+                                       default_concurrent=MAX_CONCURRENT_REQUESTS)
+    url_registry = UrlRegistry()
+    seed_url_registry(url_registry, output_filename)
+
+    async def run_query(query):
+        async with query_semaphore:
+            print(f"Получаем данные для запроса: {query}")
+            return await fetch_articles(query, include, exclude, config, verbose, proxy,
+                                        budget=budget, url_registry=url_registry)
+
+    tasks = [asyncio.create_task(run_query(query)) for query in queries]
+    total_saved = 0
+    total_found = 0
+    try:
+        # Ожидаем задачи по порядку: запрос сохраняется только после всех предыдущих
+        for query, task in zip(queries, tasks):
+            processed_articles = await task
+            total_found += len(processed_articles)
+            new_articles = [article for article in processed_articles
+                            if url_registry.claim(article['link'], query)]
+            save_articles(new_articles, output_filename)
+            total_saved += len(new_articles)
+            print(f"Сохранено {len(new_articles)} статей для запроса: {query} "
+                  f"(повторов пропущено: {len(processed_articles) - len(new_articles)})")
+    finally:
+        for task in tasks:
+            task.cancel()
+        url_registry.cancel()
+
+    print(f"Найдено ссылок: {total_found}, загружено уникальных статей: {url_registry.fetched_count}")
+    if url_registry.has_shared_urls():
+        update_query_attribution(url_registry, output_filename)
+
+    return total_saved
+
+def seed_url_registry(url_registry, output_filename):
+    """
+    Регистрирует статьи, уже сохранённые в файле (например, при --continue_from).
+    """
+    if not os.path.exists(output_filename) or os.path.getsize(output_filename) == 0:
+        return
+    df = pd.read_csv(output_filename, usecols=['link', 'query'])
+    for link, queries in zip(df['link'], df['query']):
+        if pd.isna(link):
+            continue
+        for query in str(queries).split(QUERY_SEPARATOR) if pd.notna(queries) else ['']:
+            url_registry.claim(link, query)
+
+def update_query_attribution(url_registry, output_filename):
+    """
+    Перечисляет в колонке query все запросы, нашедшие каждую статью.
+    """
+    df = pd.read_csv(output_filename)
+    df['query'] = [url_registry.attributed_query(link, query) if pd.notna(link) else query
+                   for link, query in zip(df['link'], df['query'])]
+    df.to_csv(output_filename, index=False)
+
 def save_results_to_csv(results, output_filename, verbose=False):
     """
     Сохраняет результаты в CSV файл.
@@ -0,0 +1,38 @@
+# modules/fingerprints.py
+
+import hashlib
+import re
+import pandas as pd
+
+
+def _as_text(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    return str(value)
+
+
+def fingerprint(*parts):
+    """
+    Стабильный (одинаковый между запусками) хэш набора значений.
+
+    Пустые значения и NaN считаются пустой строкой.
+    """
+    joined = "\x1f".join(_as_text(part) for part in parts)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
+
+
+def normalize_text(text):
+    """
+    Нормализует текст для сравнения содержимого: нижний регистр,
+    без пунктуации, пробелы схлопнуты.
+    """
+    text = _as_text(text).lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def content_fingerprint(text):
+    """
+    Отпечаток содержимого текста, не зависящий от регистра, пунктуации и пробелов.
+    """
+    return fingerprint(normalize_text(text))
@@ -0,0 +1,154 @@
+# modules/history_index.py
+
+import os
+import sqlite3
+import time
+import pandas as pd
+from modules.fingerprints import content_fingerprint, fingerprint
+from modules.link_utils import canonicalize_url
+
+# Параметры истории анализа по умолчанию
+DEFAULT_HISTORY_CONFIG = {
+    "enabled": False,
+    "scope": "client",                     # client — своя история у каждого клиента, global — общая
+    "global_path": "results/history.sqlite",
+    "mode": "reuse"                        # reuse — брать прошлый анализ, skip — убирать уже найденные статьи
+}
+
+HISTORY_MODES = ('reuse', 'skip')
+
+# Короче этого описание не используется как отпечаток содержимого:
+# одинаковые короткие тексты (например, сообщения об ошибках загрузки)
+# не означают одинаковые статьи
+MIN_CONTENT_LENGTH = 100
+
+
+class HistoryIndex:
+    """
+    История проанализированных статей за все дни (по клиенту или общая).
+
+    Для каждой статьи хранятся канонический URL, отпечаток содержимого
+    описания, результат анализа, отпечаток промпта, которым он получен,
+    и каталог запуска. Статья считается уже встречавшейся, если совпадает
+    URL или содержимое.
+    """
+
+    def __init__(self, path, client_name=''):
+        self.path = path
+        self.client_name = client_name
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                url_key TEXT,
+                content_key TEXT,
+                client TEXT,
+                prompt_key TEXT,
+                analysis TEXT,
+                source TEXT,
+                analyzed_at REAL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_history_url ON history (url_key)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_history_content ON history (content_key)")
+        self._connection.commit()
+
+    @staticmethod
+    def row_keys(link, description):
+        """
+        Возвращает ключи статьи: канонический URL и отпечаток содержимого (или None).
+        """
+        url_key = canonicalize_url(link) if isinstance(link, str) and link.strip() else None
+        content_key = None
+        if isinstance(description, str) and len(description.strip()) >= MIN_CONTENT_LENGTH:
+            content_key = content_fingerprint(description)
+        return url_key, content_key
+
+    def lookup(self, link, description):
+        """
+        Возвращает прошлые записи о статье, начиная с самой свежей.
+        """
+        url_key, content_key = self.row_keys(link, description)
+        if url_key is None and content_key is None:
+            return []
+        rows = self._connection.execute(
+            "SELECT prompt_key, analysis, source, client FROM history "
+            "WHERE url_key = ? OR content_key = ? ORDER BY analyzed_at DESC",
+            (url_key, content_key)
+        ).fetchall()
+        return [{'prompt_key': row[0], 'analysis': row[1], 'source': row[2], 'client': row[3]} for row in rows]
+
+    def record(self, link, description, analysis, prompt_key, source):
+        url_key, content_key = self.row_keys(link, description)
+        if url_key is None and content_key is None:
+            return
+        self._connection.execute(
+            "INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url_key, content_key, self.client_name, prompt_key, analysis, source, time.time())
+        )
+        self._connection.commit()
+
+    def apply(self, df, prompt_key, source, mode='reuse'):
+        """
+        Применяет историю к строкам для анализа.
+
+        В режиме reuse строкам без анализа проставляется прошлый результат,
+        полученный тем же промптом. В режиме skip удаляются строки, уже
+        встречавшиеся в других запусках (source) того же клиента: в общей
+        истории статья другого клиента не проанализирована его промптом.
+
+        Returns:
+            tuple: (DataFrame, число переиспользованных, число удалённых строк).
+        """
+        if mode not in HISTORY_MODES:
+            raise ValueError(f"Неизвестный режим истории: {mode}")
+
+        reused = 0
+        skipped_indexes = []
+        links = df['link'] if 'link' in df.columns else [None] * len(df)
+        for index, link, description, analysis in zip(df.index, links, df['description'], df['analysis']):
+            if pd.notna(analysis) and analysis != "":
+                continue
+            entries = self.lookup(link, description)
+            if mode == 'skip':
+                if any(entry['client'] == self.client_name and entry['source'] != source for entry in entries):
+                    skipped_indexes.append(index)
+                continue
+            previous = next((entry for entry in entries if entry['prompt_key'] == prompt_key and entry['analysis']), None)
+            if previous is not None:
+                df.at[index, 'analysis'] = previous['analysis']
+                reused += 1
+
+        if skipped_indexes:
+            df = df.drop(skipped_indexes).reset_index(drop=True)
+        return df, reused, len(skipped_indexes)
+
+    def close(self):
+        self._connection.close()
+
+
+def open_history_index(roles_dir, parser_config):
+    """
+    Открывает историю анализа клиента, которому принадлежит roles_dir,
+    или общую историю — в зависимости от параметра history.scope.
+
+    Returns:
+        tuple: (HistoryIndex или None, режим).
+    """
+    history_config = dict(DEFAULT_HISTORY_CONFIG)
+    history_config.update(parser_config.get('history', {}))
+    if not history_config['enabled']:
+        return None, history_config['mode']
+
+    client_dir = os.path.dirname(os.path.normpath(roles_dir))
+    client_name = os.path.basename(client_dir)
+    if history_config['scope'] == 'global':
+        path = history_config['global_path']
+    else:
+        path = os.path.join(client_dir, 'history.sqlite')
+    return HistoryIndex(path, client_name), history_config['mode']
+
+
+def prompt_fingerprint(role_description):
+    return fingerprint(role_description)
@@ -0,0 +1,60 @@
+# modules/http_session.py
+
+import aiohttp
+
+# Параметры пула соединений по умолчанию
+DEFAULT_HTTP_CONFIG = {
+    "limit": 100,              # Всего одновременных соединений
+    "limit_per_host": 8,       # Одновременных соединений на один хост
+    "ttl_dns_cache": 300,      # Время жизни DNS кэша в секундах
+    "keepalive_timeout": 30    # Время удержания простаивающего соединения в секундах
+}
+
+
+class SessionManager:
+    """
+    Общая aiohttp-сессия с пулом соединений на время одного запуска пайплайна.
+
+    Сессия создаётся лениво при первом обращении и переиспользует
+    соединения (keep-alive) и DNS кэш между всеми запросами.
+    После close() следующий вызов get_session() создаст новую сессию.
+    """
+
+    def __init__(self, http_config=None):
+        self.http_config = dict(DEFAULT_HTTP_CONFIG)
+        self._session = None
+        self.configure(http_config)
+
+    def configure(self, http_config=None):
+        """
+        Обновляет параметры пула. Применяются к следующей создаваемой сессии.
+        """
+        if http_config:
+            self.http_config.update(http_config)
+
+    async def get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.http_config['limit'],
+                limit_per_host=self.http_config['limit_per_host'],
+                ttl_dns_cache=self.http_config['ttl_dns_cache'],
+                keepalive_timeout=self.http_config['keepalive_timeout']
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+
+# Общий менеджер сессий для всех модулей загрузки
+session_manager = SessionManager()
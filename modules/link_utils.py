@@ -1,4 +1,4 @@
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode, urlunparse
 import requests
 from bs4 import BeautifulSoup
 
@@ -61,4 +61,44 @@ def validate_linkedin_link(url: str, original_text: str, max_chars: int = 100) -
         return original_text[:max_chars].lower() in post_text.lower()
     except Exception as e:
         print(f"Ошибка при валидации ссылки: {e}")
-        return False
\ No newline at end of file
+        return False
+
+# Параметры запроса, которые не влияют на содержимое страницы
+TRACKING_PARAMS = {
+    'gclid', 'fbclid', 'yclid', 'msclkid', 'dclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_hsenc', '_hsmi', 'spm', 'cmpid', 'ncid'
+}
+TRACKING_PREFIXES = ('utm_',)
+
+def canonicalize_url(url):
+    """
+    Приводит URL к каноническому виду для использования в качестве ключа.
+
+    Схема и хост переводятся в нижний регистр, порт по умолчанию и фрагмент
+    отбрасываются, трекинговые параметры (utm_*, gclid, fbclid и т.п.)
+    удаляются, остальные параметры сортируются.
+
+    Args:
+        url (str): Исходный URL.
+
+    Returns:
+        str: Канонический URL.
+    """
+    url = str(url).strip()
+    parsed = urlparse(url)
+    if not parsed.scheme or not parsed.netloc:
+        return url
+
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').rstrip('.')
+    port = parsed.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+
+    query = [
+        (name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, urlencode(query), ''))
@@ -0,0 +1,231 @@
+# modules/near_duplicates.py
+
+import hashlib
+import numpy as np
+from fuzzywuzzy import fuzz, utils
+from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process
+
+# Параметры MinHash/LSH: NUM_PERM хэш-функций делятся на BANDS полос.
+# При 40 полосах по 3 строки пара с коэффициентом Жаккара по словам 0.5
+# попадает в кандидаты с вероятностью ~99.5%, а 0.1 — лишь ~4%.
+NUM_PERM = 120
+BANDS = 40
+
+_PRIME = (1 << 31) - 1
+
+# Размер блока строк и столбцов матрицы схожести в режиме cdist
+CDIST_BLOCK_SIZE = 1024
+
+# Доступные способы поиска нестрогих дубликатов. 'cdist' точный; 'lsh' быстрее,
+# но отбирает кандидатов по общим словам и может пропускать пары, отличающиеся
+# опечатками во многих словах
+NEAR_DUPLICATE_METHODS = ('lsh', 'cdist')
+
+
+def process_text(text):
+    """
+    Приводит текст к виду, который сравнивает fuzz.token_sort_ratio:
+    только буквы и цифры в нижнем регистре, слова отсортированы.
+    """
+    if not isinstance(text, str):
+        text = str(text)
+    tokens = utils.full_process(text, force_ascii=True).split()
+    return " ".join(sorted(tokens)).strip()
+
+
+def similarity(processed_a, processed_b):
+    """
+    Схожесть двух обработанных текстов. Совпадает с
+    fuzz.token_sort_ratio для исходных текстов.
+    """
+    return fuzz.ratio(processed_a, processed_b)
+
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little') % _PRIME
+
+
+class NearDuplicateIndex:
+    """
+    Индекс нестрогих дубликатов на основе MinHash/LSH по словам текста.
+
+    Индекс отбирает кандидатов — ранее добавленные тексты, совпавшие хотя
+    бы в одной полосе сигнатуры, — и только для них вычисляет точную
+    схожесть fuzz.token_sort_ratio. Отбор вероятностный: пары с большой
+    долей общих слов находятся практически всегда, а несвязанные тексты
+    почти никогда не сравниваются.
+    """
+
+    def __init__(self, similarity_threshold=80, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands без остатка")
+        self.similarity_threshold = similarity_threshold
+        self.num_perm = num_perm
+        self.seed = seed
+        self.bands = bands
+        self.rows = num_perm // bands
+        random_state = np.random.RandomState(seed)
+        self._a = random_state.randint(1, _PRIME, size=num_perm, dtype=np.int64)
+        self._b = random_state.randint(0, _PRIME, size=num_perm, dtype=np.int64)
+        self.texts = []
+        self._band_keys = []
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.texts)
+
+    def band_keys(self, processed):
+        """
+        Возвращает ключи полос MinHash-сигнатуры обработанного текста.
+        """
+        tokens = set(processed.split())
+        if not tokens:
+            # Все пустые тексты попадают в одну корзину
+            return [0 for _ in range(self.bands)]
+        hashes = np.fromiter((_token_hash(token) for token in tokens), dtype=np.int64, count=len(tokens))
+        signature = ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+        return [
+            int.from_bytes(hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                                           digest_size=8).digest(), 'little')
+            for band in range(self.bands)
+        ]
+
+    def candidates(self, band_keys):
+        """
+        Возвращает позиции ранее добавленных текстов, совпавших хотя бы в одной полосе.
+        """
+        positions = set()
+        for bucket, key in zip(self._buckets, band_keys):
+            positions.update(bucket.get(key, ()))
+        return sorted(positions)
+
+    def find(self, processed, band_keys=None):
+        """
+        Ищет ранее добавленный текст, схожесть с которым выше порога.
+
+        Returns:
+            tuple: (позиция, схожесть) первого такого текста или None.
+        """
+        if band_keys is None:
+            band_keys = self.band_keys(processed)
+        for position in self.candidates(band_keys):
+            candidate = self.texts[position]
+            # Схожесть не превышает 2 * min(len) / (сумма длин) — отсекаем заведомо разные по длине тексты
+            total_length = len(candidate) + len(processed)
+            if total_length and round(200 * min(len(candidate), len(processed)) / total_length) <= self.similarity_threshold:
+                continue
+            score = similarity(candidate, processed)
+            if score > self.similarity_threshold:
+                return position, score
+        return None
+
+    def find_exact(self, processed):
+        """
+        Ищет ранее добавленный текст, схожесть с которым выше порога,
+        сравнивая со всеми текстами индекса (rapidfuzz), без отбора
+        кандидатов по полосам.
+
+        Returns:
+            tuple: (позиция, схожесть) самого похожего такого текста или None.
+        """
+        if not self.texts:
+            return None
+        # fuzzywuzzy округляет схожесть до целого: выше порога — от порога + 0.5
+        match = rapid_process.extractOne(processed, self.texts, scorer=rapid_fuzz.ratio, processor=None,
+                                         score_cutoff=self.similarity_threshold + 0.5)
+        if match is None:
+            return None
+        score = round(match[1])
+        return (match[2], score) if score > self.similarity_threshold else None
+
+    def add(self, processed, band_keys=None):
+        """
+        Добавляет обработанный текст в индекс и возвращает его позицию.
+        """
+        if band_keys is None:
+            band_keys = self.band_keys(processed)
+        position = len(self.texts)
+        self.texts.append(processed)
+        self._band_keys.append(list(band_keys))
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, []).append(position)
+        return position
+
+    def to_dict(self):
+        """
+        Представление индекса для сохранения в JSON.
+        """
+        return {
+            'similarity_threshold': self.similarity_threshold,
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'seed': self.seed,
+            'texts': self.texts,
+            'band_keys': self._band_keys
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Восстанавливает индекс, сохранённый через to_dict(), без пересчёта сигнатур.
+        """
+        index = cls(data['similarity_threshold'], num_perm=data['num_perm'], bands=data['bands'], seed=data['seed'])
+        for processed, band_keys in zip(data['texts'], data['band_keys']):
+            index.add(processed, band_keys)
+        return index
+
+
+def find_near_duplicates(texts, similarity_threshold=80):
+    """
+    Находит нестрогие дубликаты в списке текстов.
+
+    Текст j считается дубликатом, если схожесть fuzz.token_sort_ratio
+    с каким-либо предыдущим текстом i < j выше порога — так же, как
+    при попарном сравнении всех строк.
+
+    Returns:
+        list: Пары (i, j, схожесть) — для каждого дубликата j первый найденный i.
+    """
+    index = NearDuplicateIndex(similarity_threshold)
+    duplicates = []
+    for j, text in enumerate(texts):
+        processed = process_text(text)
+        band_keys = index.band_keys(processed)
+        match = index.find(processed, band_keys)
+        if match is not None:
+            duplicates.append((match[0], j, match[1]))
+        index.add(processed, band_keys)
+    return duplicates
+
+
+def find_near_duplicates_cdist(texts, similarity_threshold=80, block_size=CDIST_BLOCK_SIZE, workers=-1):
+    """
+    Находит нестрогие дубликаты точным перебором всех пар, вычисляя
+    матрицу схожести блоками через rapidfuzz.process.cdist на всех ядрах.
+
+    Результат совпадает с попарным сравнением fuzz.token_sort_ratio,
+    а память ограничена блоком block_size x block_size.
+
+    Returns:
+        list: Пары (i, j, схожесть) — для каждого дубликата j первый найденный i.
+    """
+    processed = [process_text(text) for text in texts]
+    first_match = {}
+
+    for row_start in range(0, len(processed), block_size):
+        rows = processed[row_start:row_start + block_size]
+        for column_start in range(row_start, len(processed), block_size):
+            columns = processed[column_start:column_start + block_size]
+            scores = rapid_process.cdist(rows, columns, scorer=rapid_fuzz.ratio, score_cutoff=similarity_threshold,
+                                         dtype=np.float64, workers=workers)
+            for row, column in zip(*np.nonzero(scores)):
+                i = row_start + int(row)
+                j = column_start + int(column)
+                if i >= j or j in first_match:
+                    continue
+                # fuzzywuzzy округляет схожесть до целого
+                score = round(scores[row, column])
+                if score > similarity_threshold:
+                    first_match[j] = (i, score)
+
+    return [(i, j, score) for j, (i, score) in sorted(first_match.items())]
@@ -0,0 +1,176 @@
+# modules/prefilter.py
+
+import os
+import re
+import glob
+import json
+import pandas as pd
+from modules.text_terms import tokenize
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+except ImportError:
+    TfidfVectorizer = LogisticRegression = None
+
+# Параметры предварительного отбора по умолчанию
+DEFAULT_PREFILTER_CONFIG = {
+    "enabled": False,
+    "threshold": 0.25,           # Статьи с оценкой ниже порога не отправляются в LLM
+    "classifier": True,          # Использовать классификатор по прошлым результатам анализа (нужен scikit-learn)
+    "classifier_weight": 0.5,    # Доля оценки классификатора в итоговой оценке
+    "min_samples": 200,          # Минимум размеченных статей для обучения классификатора
+    "negative_labels": ["3"]     # Ответы LLM, означающие отсутствие сигнала
+}
+
+
+def parse_exclude_terms(exclude):
+    """
+    Разбирает строку исключений поискового запроса ('-word -"some phrase"')
+    в список слов и фраз. Операторы вида filetype:pdf пропускаются.
+    """
+    terms = re.findall(r'-"([^"]+)"|-(\S+)', exclude or "")
+    return [(phrase or word).lower() for phrase, word in terms if ':' not in (phrase or word)]
+
+
+class KeywordRules:
+    """
+    Правила по поисковым запросам клиента (search_query.json).
+
+    Оценка статьи — наибольшая доля слов одного запроса (и списка
+    include, если он задан), встречающихся в тексте. Статья с любым
+    словом или фразой из exclude получает оценку 0.
+    """
+
+    def __init__(self, queries, include=None, exclude=None):
+        query_terms = [set(tokenize(query)) for query in queries]
+        if include:
+            query_terms.append(set(tokenize(include)))
+        self.query_terms = [terms for terms in query_terms if terms]
+        self.exclude_terms = parse_exclude_terms(exclude)
+        self._exclude_pattern = None
+        if self.exclude_terms:
+            self._exclude_pattern = re.compile(
+                r"\b(?:" + "|".join(re.escape(term) for term in self.exclude_terms) + r")\b", re.IGNORECASE)
+
+    @classmethod
+    def from_roles_dir(cls, roles_dir):
+        with open(os.path.join(roles_dir, 'search_query.json'), 'r') as f:
+            search_queries = json.load(f)
+        return cls(search_queries.get('queries', []), search_queries.get('include'), search_queries.get('exclude'))
+
+    def excluded(self, text):
+        """
+        Есть ли в тексте слово или фраза из exclude.
+        """
+        return self._exclude_pattern is not None and self._exclude_pattern.search(str(text)) is not None
+
+    def score(self, text):
+        if self.excluded(text):
+            return 0.0
+        if not self.query_terms:
+            return 1.0
+        words = set(tokenize(text))
+        return max(len(terms & words) / len(terms) for terms in self.query_terms)
+
+
+class RelevanceClassifier:
+    """
+    TF-IDF и логистическая регрессия, обученные на прошлых результатах
+    анализа клиента: ответ из negative_labels — нет сигнала, любой
+    другой непустой ответ — сигнал.
+    """
+
+    def __init__(self, texts, labels):
+        self.vectorizer = TfidfVectorizer(max_features=50000, ngram_range=(1, 2), sublinear_tf=True, min_df=2)
+        self.model = LogisticRegression(max_iter=1000, class_weight='balanced')
+        self.model.fit(self.vectorizer.fit_transform(texts), labels)
+
+    @classmethod
+    def from_history(cls, client_dir, prefilter_config):
+        """
+        Обучает классификатор на файлах search_results_analysed.csv всех
+        прошлых запусков клиента. Возвращает None, если scikit-learn не
+        установлен или размеченных статей недостаточно.
+        """
+        if TfidfVectorizer is None:
+            print("scikit-learn не установлен, предварительный отбор только по ключевым словам.")
+            return None
+        texts, labels = load_training_data(client_dir, prefilter_config['negative_labels'])
+        if len(texts) < prefilter_config['min_samples'] or len(set(labels)) < 2:
+            print(f"Для обучения классификатора недостаточно размеченных статей ({len(texts)}), "
+                  f"предварительный отбор только по ключевым словам.")
+            return None
+        print(f"Классификатор обучен на {len(texts)} статьях, из них с сигналом: {sum(labels)}.")
+        return cls(texts, labels)
+
+    def score(self, texts):
+        """
+        Вероятности наличия сигнала для списка текстов.
+        """
+        return self.model.predict_proba(self.vectorizer.transform(texts))[:, 1]
+
+
+def load_training_data(client_dir, negative_labels):
+    """
+    Тексты и метки (1 — сигнал, 0 — нет) из прошлых результатов анализа клиента.
+    """
+    negative_labels = {str(label).strip() for label in negative_labels}
+    texts, labels, seen = [], [], set()
+    for path in sorted(glob.glob(os.path.join(client_dir, '*', 'search_results_analysed.csv'))):
+        if os.path.getsize(path) == 0:
+            continue
+        df = pd.read_csv(path)
+        if 'analysis' not in df.columns or 'description' not in df.columns:
+            continue
+        for text, analysis in zip(row_texts(df), df['analysis']):
+            if pd.isna(analysis) or not str(analysis).strip() or text in seen:
+                continue
+            seen.add(text)
+            texts.append(text)
+            labels.append(0 if str(analysis).strip() in negative_labels else 1)
+    return texts, labels
+
+
+def row_texts(df):
+    """
+    Текст строки для оценки: заголовок и описание.
+    """
+    titles = df['title'].fillna('').astype(str) if 'title' in df.columns else pd.Series([''] * len(df), index=df.index)
+    return (titles + "\n" + df['description'].fillna('').astype(str)).tolist()
+
+
+def prefilter_data(input_filename, output_filename, rejected_filename, roles_dir, config):
+    """
+    Предварительный отбор статей перед анализом LLM.
+
+    Статьи с оценкой релевантности не ниже порога записываются в
+    output_filename, остальные — в rejected_filename с колонкой
+    relevance, чтобы отбор можно было проверить.
+
+    Returns:
+        tuple: Число строк до и после отбора.
+    """
+    prefilter_config = dict(DEFAULT_PREFILTER_CONFIG, **config.get('prefilter', {}))
+    df = pd.read_csv(input_filename)
+    rows_before = len(df)
+    texts = row_texts(df)
+
+    rules = KeywordRules.from_roles_dir(roles_dir)
+    relevance = pd.Series([rules.score(text) for text in texts], index=df.index)
+    excluded = pd.Series([rules.excluded(text) for text in texts], index=df.index, dtype=bool)
+
+    classifier = None
+    if prefilter_config['classifier'] and texts:
+        client_dir = os.path.dirname(os.path.normpath(roles_dir))
+        classifier = RelevanceClassifier.from_history(client_dir, prefilter_config)
+    if classifier is not None:
+        weight = prefilter_config['classifier_weight']
+        # Исключающие слова запроса остаются жёстким правилом; статью без общих
+        # слов с запросами классификатор может оставить
+        relevance = ((1 - weight) * relevance + weight * classifier.score(texts)).where(~excluded, 0.0)
+
+    kept = relevance >= prefilter_config['threshold']
+    df[kept].to_csv(output_filename, index=False)
+    df[~kept].assign(relevance=relevance[~kept].round(3)).to_csv(rejected_filename, index=False)
+    return rows_before, int(kept.sum())
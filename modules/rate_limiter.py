@@ -0,0 +1,206 @@
+# modules/rate_limiter.py
+
+import asyncio
+import time
+
+# Символов на токен до первых наблюдений (грубая оценка без токенизатора)
+CHARS_PER_TOKEN = 4
+
+
+class RateLimiter:
+    """
+    Асинхронный ограничитель скорости по алгоритму token bucket.
+    """
+
+    def __init__(self, max_rate, period=60):
+        self.max_rate = max_rate
+        self.period = period
+        self.tokens = max_rate
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        time_passed = now - self.updated_at
+        self.tokens += time_passed * (self.max_rate / self.period)
+        if self.tokens > self.max_rate:
+            self.tokens = self.max_rate
+        self.updated_at = now
+
+    def available(self):
+        """
+        Доля оставшейся квоты (от 0 до 1) без её расходования.
+        """
+        self._refill()
+        return self.tokens / self.max_rate
+
+    def try_acquire(self, amount=1):
+        """
+        Забирает amount токенов, если они есть, не дожидаясь их появления.
+        Запрос больше ёмкости корзины ограничивается ёмкостью.
+        """
+        amount = min(amount, self.max_rate)
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def wait_time(self, amount=1):
+        """
+        Через сколько секунд в корзине будет amount токенов.
+        """
+        amount = min(amount, self.max_rate)
+        self._refill()
+        return max(0.0, (amount - self.tokens) / (self.max_rate / self.period))
+
+    def refund(self, amount):
+        """
+        Возвращает в корзину amount токенов (отрицательное значение —
+        дополнительно списывает, корзина может уйти в минус).
+        """
+        self._refill()
+        self.tokens = min(self.tokens + amount, self.max_rate)
+
+    async def acquire(self):
+        while not self.try_acquire():
+            await asyncio.sleep(self.wait_time())
+
+
+class TokenRateLimiter:
+    """
+    Ограничитель по двум бюджетам: запросов (RPM) и токенов (TPM) за период.
+
+    acquire(tokens) ждёт, пока оба бюджета позволят выполнить запрос
+    оценочной стоимостью tokens. После ответа settle() исправляет
+    списание по фактическому расходу из ответа API.
+    """
+
+    def __init__(self, max_rate, period=60, max_tokens=None):
+        self.requests = RateLimiter(max_rate, period)
+        self.tokens = RateLimiter(max_tokens, period) if max_tokens else None
+
+    def wait_time(self, tokens=0):
+        waits = [self.requests.wait_time()]
+        if self.tokens and tokens:
+            waits.append(self.tokens.wait_time(tokens))
+        return max(waits)
+
+    async def acquire(self, tokens=0):
+        while True:
+            wait = self.wait_time(tokens)
+            if wait <= 0:
+                self.requests.try_acquire()
+                if self.tokens and tokens:
+                    self.tokens.try_acquire(tokens)
+                return
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated, actual):
+        if self.tokens and actual is not None:
+            self.tokens.refund(estimated - actual)
+
+
+class TokenEstimator:
+    """
+    Оценка стоимости запроса в токенах, уточняемая по фактическому расходу.
+
+    Промпт оценивается по числу символов и наблюдаемому числу символов
+    на токен, ответ — по среднему фактическому размеру ответа с запасом
+    (но не больше max_tokens). До первых наблюдений ответ считается
+    равным max_tokens.
+
+    Один экземпляр используется и для общего лимита токенов, и для
+    корзин ключей API (см. OpenAIClient.token_estimator), чтобы запрос
+    списывался из обоих лимитов одинаково.
+    """
+
+    def __init__(self, max_tokens, chars_per_token=CHARS_PER_TOKEN, completion_margin=1.5, smoothing=0.2):
+        self.max_tokens = max_tokens
+        self.chars_per_token = chars_per_token
+        self.completion_margin = completion_margin
+        self.smoothing = smoothing
+        self.completion_tokens = None
+
+    @staticmethod
+    def _chars(messages):
+        return sum(len(message.get('content') or '') for message in messages)
+
+    def estimate(self, messages, max_tokens=None):
+        """
+        Оценка запроса; max_tokens — лимит ответа этого запроса, если он
+        отличается от заданного в конфигурации.
+        """
+        max_tokens = max_tokens or self.max_tokens
+        prompt = self._chars(messages) / self.chars_per_token
+        if self.completion_tokens is None:
+            completion = max_tokens
+        else:
+            completion = min(max_tokens, self.completion_tokens * self.completion_margin)
+        return int(prompt + completion) + 1
+
+    def observe(self, messages, usage):
+        """
+        Учитывает фактический расход из ответа API (usage с prompt_tokens
+        и completion_tokens). Возвращает фактическое число токенов или None.
+        """
+        if not usage:
+            return None
+        prompt_tokens = usage.get('prompt_tokens')
+        completion_tokens = usage.get('completion_tokens')
+        if prompt_tokens:
+            self.chars_per_token += self.smoothing * (self._chars(messages) / prompt_tokens - self.chars_per_token)
+        if completion_tokens is not None:
+            if self.completion_tokens is None:
+                self.completion_tokens = completion_tokens
+            else:
+                self.completion_tokens += self.smoothing * (completion_tokens - self.completion_tokens)
+        return usage.get('total_tokens') or (prompt_tokens or 0) + (completion_tokens or 0)
+
+    def count(self, messages, completion):
+        """
+        Оценка фактического расхода по тексту запроса и полученного ответа —
+        для ответов без usage (потоковый режим).
+        """
+        return int((self._chars(messages) + len(completion or '')) / self.chars_per_token) + 1
+
+
+class RequestBudget:
+    """
+    Бюджет запросов к одному провайдеру: ограничивает число одновременных
+    запросов и, если задано, их частоту.
+
+    Используется как асинхронный контекстный менеджер:
+
+        async with budget:
+            ...
+    """
+
+    def __init__(self, max_concurrent=10, max_rate=None, period=1):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.rate_limiter = RateLimiter(max_rate, period) if max_rate else None
+
+    @classmethod
+    def from_config(cls, engine_config, default_concurrent=10):
+        """
+        Создаёт бюджет из конфигурации поискового движка
+        (ключи max_concurrent_requests, rate_limit, rate_limit_period).
+        """
+        return cls(
+            max_concurrent=engine_config.get('max_concurrent_requests', default_concurrent),
+            max_rate=engine_config.get('rate_limit'),
+            period=engine_config.get('rate_limit_period', 1)
+        )
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.rate_limiter:
+            try:
+                await self.rate_limiter.acquire()
+            except BaseException:
+                self.semaphore.release()
+                raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+        return False
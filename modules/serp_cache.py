@@ -0,0 +1,125 @@
+# modules/serp_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Параметры кэша поисковой выдачи по умолчанию
+DEFAULT_SERP_CACHE_CONFIG = {
+    "enabled": False,
+    "path": "cache/serp.sqlite",
+    "ttl_hours": 24       # Время жизни записи
+}
+
+# Режимы работы кэша: use — читать и записывать, refresh — только
+# записывать свежие ответы, off — не использовать
+SERP_CACHE_MODES = ('use', 'refresh', 'off')
+
+# Параметры запроса, не влияющие на выдачу (учётные данные)
+EXCLUDED_PARAMS = ('user', 'key')
+
+
+class SerpCache:
+    """
+    Кэш страниц выдачи xmlstock в SQLite.
+
+    Ключ — хэш полного набора параметров запроса (query, tbs, lr, hl,
+    page и т.д.) без учётных данных. Время жизни записи — ttl_hours,
+    а не окно поиска days: выдача qdr:d7 отсчитывается от текущей даты и
+    через сутки уже содержит новые статьи.
+    """
+
+    def __init__(self, cache_config=None):
+        self.cache_config = dict(DEFAULT_SERP_CACHE_CONFIG)
+        self.mode = 'use'
+        self._connection = None
+        self.configure(cache_config)
+
+    def configure(self, cache_config=None, mode=None):
+        """
+        Обновляет параметры кэша и режим работы.
+        """
+        if cache_config:
+            self.close()
+            self.cache_config.update(cache_config)
+        if mode is not None:
+            if mode not in SERP_CACHE_MODES:
+                raise ValueError(f"Неизвестный режим кэша выдачи: {mode}")
+            self.mode = mode
+
+    @property
+    def enabled(self):
+        return bool(self.cache_config.get('enabled')) and self.mode != 'off'
+
+    @property
+    def ttl(self):
+        """
+        Время жизни записи в секундах.
+        """
+        return self.cache_config['ttl_hours'] * 3600
+
+    @staticmethod
+    def make_key(params):
+        key_params = {name: value for name, value in params.items() if name not in EXCLUDED_PARAMS}
+        return hashlib.sha256(json.dumps(key_params, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _connect(self):
+        if self._connection is None:
+            path = self.cache_config['path']
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._connection = sqlite3.connect(path)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS serp_pages (
+                    params_key TEXT PRIMARY KEY,
+                    params TEXT,
+                    content TEXT,
+                    fetched_at REAL
+                )
+            """)
+            self._connection.commit()
+        return self._connection
+
+    def get(self, params, ttl):
+        """
+        Возвращает сохранённый XML страницы выдачи, если он моложе ttl секунд.
+        """
+        if not self.enabled or self.mode != 'use':
+            return None
+        row = self._connect().execute(
+            "SELECT content, fetched_at FROM serp_pages WHERE params_key = ?", (self.make_key(params),)
+        ).fetchone()
+        if row is None or time.time() - row[1] >= ttl:
+            return None
+        return row[0]
+
+    def put(self, params, content):
+        if not self.enabled:
+            return
+        key_params = {name: value for name, value in params.items() if name not in EXCLUDED_PARAMS}
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO serp_pages VALUES (?, ?, ?, ?)",
+            (self.make_key(params), json.dumps(key_params, ensure_ascii=False), content, time.time())
+        )
+        connection.commit()
+
+    def evict(self, max_age):
+        """
+        Удаляет записи старше max_age секунд.
+        """
+        if self._connection is None:
+            return
+        self._connection.execute("DELETE FROM serp_pages WHERE fetched_at < ?", (time.time() - max_age,))
+        self._connection.commit()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# Общий кэш поисковой выдачи
+serp_cache = SerpCache()
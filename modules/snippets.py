@@ -0,0 +1,116 @@
+# modules/snippets.py
+
+import math
+import re
+import textwrap
+from collections import Counter
+from modules.rate_limiter import CHARS_PER_TOKEN
+from modules.text_terms import tokenize
+
+# Параметры выбора фрагментов по умолчанию
+DEFAULT_SNIPPET_CONFIG = {
+    "enabled": False,
+    "description_chars": 500,      # Размер описания статьи в search_results.csv
+    "analysis_max_tokens": 1250,   # Бюджет текста статьи в запросе к LLM
+    "lead_paragraphs": 1           # Первые абзацы (лид) попадают во фрагмент всегда
+}
+
+# Абзацы длиннее делятся по предложениям
+MAX_PARAGRAPH_LENGTH = 600
+
+# Разделитель пропущенных частей текста
+GAP = "\n...\n"
+
+
+def split_paragraphs(text, max_length=MAX_PARAGRAPH_LENGTH):
+    """
+    Делит текст на абзацы; длинные абзацы — на части из целых предложений,
+    а предложения длиннее max_length — по словам.
+    """
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        part = ""
+        sentences = re.split(r"(?<=[.!?])\s+", paragraph)
+        for sentence in (chunk for sentence in sentences for chunk in textwrap.wrap(sentence, max_length)):
+            if part and len(part) + len(sentence) + 1 > max_length:
+                paragraphs.append(part)
+                part = ""
+            part = f"{part} {sentence}" if part else sentence
+        if part:
+            paragraphs.append(part)
+    return paragraphs
+
+
+def bm25_scores(paragraphs, query_terms, k1=1.5, b=0.75):
+    """
+    Оценки BM25 абзацев статьи по словам запроса (статья — коллекция
+    документов-абзацев).
+    """
+    documents = [Counter(tokenize(paragraph)) for paragraph in paragraphs]
+    if not documents:
+        return []
+    average_length = sum(sum(document.values()) for document in documents) / len(documents) or 1
+    scores = []
+    for document in documents:
+        length = sum(document.values())
+        score = 0.0
+        for term in set(query_terms):
+            frequency = document.get(term, 0)
+            if not frequency:
+                continue
+            containing = sum(1 for other in documents if term in other)
+            idf = math.log(1 + (len(documents) - containing + 0.5) / (containing + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def select_snippet(text, query, max_chars, lead_paragraphs=1):
+    """
+    Собирает из текста фрагмент не длиннее max_chars: лучший по оценке
+    BM25 абзац, лид и другие абзацы с наибольшей оценкой по словам запроса
+    query, в исходном порядке. Абзацы длиннее бюджета делятся на части.
+
+    Текст, помещающийся в бюджет, возвращается без изменений.
+    """
+    text = str(text or "").strip()
+    if len(text) <= max_chars:
+        return text
+    # Каждая часть помещается в бюджет вместе с разделителем
+    paragraphs = split_paragraphs(text, max(1, min(MAX_PARAGRAPH_LENGTH, max_chars - len(GAP))))
+    scores = bm25_scores(paragraphs, tokenize(query or ""))
+    # Первой берётся самая близкая к запросу часть, затем лид, затем остальные
+    # по убыванию оценки (при равной — по порядку в тексте)
+    ranked = sorted(range(len(paragraphs)), key=lambda position: (-scores[position], position))
+    lead = list(range(min(lead_paragraphs, len(paragraphs))))
+    order = ranked[:1] if ranked and scores[ranked[0]] > 0 else []
+    order += [position for position in lead + ranked if position not in order]
+
+    selected = []
+    length = 0
+    for position in order:
+        paragraph_length = len(paragraphs[position]) + len(GAP)
+        if length + paragraph_length > max_chars:
+            continue
+        selected.append(position)
+        length += paragraph_length
+    if not selected:
+        # Бюджет меньше разделителя: берём начало самой близкой к запросу части
+        best = max(range(len(paragraphs)), key=lambda position: (scores[position], -position))
+        return paragraphs[best][:max_chars]
+
+    snippet = ""
+    previous = None
+    for position in sorted(selected):
+        if previous is not None:
+            snippet += "\n" if position == previous + 1 else GAP
+        snippet += paragraphs[position]
+        previous = position
+    return snippet
+
+
+def snippet_config(config):
+    return dict(DEFAULT_SNIPPET_CONFIG, **(config or {}).get('snippets', {}))
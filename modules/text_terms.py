@@ -0,0 +1,20 @@
+# modules/text_terms.py
+
+import re
+
+# Служебные слова, не несущие смысла запроса
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'from', 'into', 'about', 'new', 'plans', 'plan', 'planning', 'its', 'their',
+    'next', 'gen', 'how', 'what', 'why', 'are', 'has', 'have', 'will'
+}
+
+# Длина основы слова: грубая замена стемминга ("startups" и "startup" совпадают)
+STEM_LENGTH = 6
+
+
+def tokenize(text):
+    """
+    Основы значимых слов текста.
+    """
+    words = re.findall(r"[a-zа-яё0-9]+", str(text).lower())
+    return [word[:STEM_LENGTH] for word in words if len(word) > 2 and word not in STOPWORDS]
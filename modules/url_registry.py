@@ -0,0 +1,70 @@
+# modules/url_registry.py
+
+import asyncio
+from modules.link_utils import canonicalize_url
+
+# Разделитель запросов в колонке query, если статью нашли несколько запросов
+QUERY_SEPARATOR = " | "
+
+
+class UrlRegistry:
+    """
+    Реестр URL одного запуска получения данных.
+
+    Каждая статья (по каноническому URL) загружается один раз, даже если
+    её вернули несколько поисковых запросов: повторные обращения получают
+    результат уже запущенной загрузки. Реестр также запоминает, какие
+    запросы нашли статью, и какой из них первым её сохранил.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._queries = {}
+
+    async def fetch(self, url, fetch_func):
+        """
+        Возвращает результат fetch_func(url), вызывая его не более одного
+        раза для каждого канонического URL.
+        """
+        key = canonicalize_url(url)
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch_func(url))
+            self._tasks[key] = task
+        # shield: отмена одного из ожидающих не должна отменять общую загрузку
+        return await asyncio.shield(task)
+
+    def claim(self, url, query):
+        """
+        Отмечает, что запрос query нашёл статью url.
+
+        Returns:
+            bool: True, если статья ещё не была сохранена другим запросом.
+        """
+        key = canonicalize_url(url)
+        queries = self._queries.setdefault(key, [])
+        first = not queries
+        if query not in queries:
+            queries.append(query)
+        return first
+
+    def queries_for(self, url):
+        return list(self._queries.get(canonicalize_url(url), []))
+
+    def attributed_query(self, url, default=''):
+        """
+        Возвращает все запросы, нашедшие статью, в виде одной строки.
+        """
+        queries = self.queries_for(url)
+        return QUERY_SEPARATOR.join(queries) if queries else default
+
+    def has_shared_urls(self):
+        return any(len(queries) > 1 for queries in self._queries.values())
+
+    @property
+    def fetched_count(self):
+        return len(self._tasks)
+
+    def cancel(self):
+        for task in self._tasks.values():
+            task.cancel()
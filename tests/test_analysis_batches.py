@@ -0,0 +1,165 @@
+# tests/test_analysis_batches.py
+
+import asyncio
+import os
+import pandas as pd
+import pytest
+import llm_clients
+import modules.analyse_data as analyse_module
+from modules.analysis_batches import batched, build_batch_messages, parse_batch_response
+from modules.batch_analysis import DEFAULT_BATCH_API_CONFIG, batch_model
+from modules.checkpoint import CheckpointJournal
+from llm_clients.completion_cache import completion_cache
+
+LONG_TEXT = "Logistics company announced a new partnership with a startup. " * 3
+
+class FakeBatchClient:
+    """Отвечает на пакет пронумерованными слотами; на пакет из broken_size статей — без разметки."""
+
+    def __init__(self, broken_size=None):
+        self.broken_size = broken_size
+        self.requests = []
+        self.limits = []
+
+    async def get_completion(self, messages, max_tokens=None):
+        content = messages[1]['content']
+        self.requests.append(content)
+        self.limits.append(max_tokens)
+        count = content.count('### ARTICLE')
+        if count == 0:
+            return f"single {content[:1]}"
+        if count == self.broken_size:
+            return "I cannot follow the format"
+        return "\n".join(f"### {n}\n['answer {n}']" for n in range(1, count + 1))
+
+    async def close(self):
+        pass
+
+def test_batched_keeps_order_and_tail():
+    assert list(batched(range(5), 2)) == [(0, 1), (2, 3), (4,)]
+
+def test_parse_batch_response():
+    assert parse_batch_response("### 1\n['a', 1]\n### 2\n['b', 2]", 2) == ["['a', 1]", "['b', 2]"]
+    # Пропущенный, повторённый или пустой слот — ответ не принимается
+    assert parse_batch_response("### 1\n['a', 1]", 2) is None
+    assert parse_batch_response("### 1\na\n### 1\nb", 2) is None
+    assert parse_batch_response("### 1\n\n### 2\nb", 2) is None
+
+def test_build_batch_messages_numbers_articles():
+    messages = build_batch_messages('prompt', ['first', 'second'])
+    assert messages[0]['content'].startswith('prompt')
+    assert messages[1]['content'] == "### ARTICLE 1\nfirst\n\n### ARTICLE 2\nsecond"
+
+def run_analysis(tmp_path, monkeypatch, client, descriptions, config=None):
+    roles_dir = tmp_path / 'client' / 'roles'
+    roles_dir.mkdir(parents=True)
+    (roles_dir / 'prompt.txt').write_text('prompt', encoding='utf-8')
+    input_file = str(tmp_path / 'cleaned.csv')
+    output_file = str(tmp_path / 'analysed.csv')
+    pd.DataFrame({'link': [f'https://{n}.com' for n in range(len(descriptions))],
+                  'description': descriptions}).to_csv(input_file, index=False)
+    monkeypatch.setattr(llm_clients, 'get_llm_client', lambda provider, config: client)
+    config = config or {'analysis_batch_size': 3, 'rate_limit': 2, 'rate_limit_period': 0.01}
+    asyncio.run(analyse_module.analyse_data(input_file, output_file, str(roles_dir), config))
+    return pd.read_csv(output_file)
+
+def test_batched_analysis_with_fallback(tmp_path, monkeypatch):
+    # Пакеты: (A, B, короткий текст) -> 2 статьи, (C, D, E) -> 3 статьи с неразборчивым ответом
+    descriptions = ['A ' + LONG_TEXT, 'B ' + LONG_TEXT, 'short', 'C ' + LONG_TEXT, 'D ' + LONG_TEXT, 'E ' + LONG_TEXT]
+    client = FakeBatchClient(broken_size=3)
+
+    result = run_analysis(tmp_path, monkeypatch, client, descriptions)
+
+    assert list(result['analysis'].fillna('')) == [
+        "['answer 1']", "['answer 2']", '', 'single C', 'single D', 'single E'
+    ]
+    assert len(client.requests) == 2 + 3
+    # Лимит ответа на пакет растёт с числом статей, у одиночных запросов — из конфигурации
+    assert sorted(limit for limit in client.limits if limit) == [2 * 1500, 3 * 1500]
+
+def test_batch_fits_model_output_limit(tmp_path, monkeypatch):
+    descriptions = [f'{n} ' + LONG_TEXT for n in range(5)]
+    client = FakeBatchClient()
+    config = {'analysis_batch_size': 5, 'analysis_batch_answer_tokens': 1000, 'max_output_tokens': 3000,
+              'rate_limit': 2, 'rate_limit_period': 0.01}
+
+    result = run_analysis(tmp_path, monkeypatch, client, descriptions, config)
+
+    # Пакет уменьшен до 3 статей, лимит ответа не превышает предел модели
+    assert sorted(request.count('### ARTICLE') for request in client.requests) == [2, 3]
+    assert sorted(client.limits) == [2000, 3000]
+    assert result['analysis'].notna().all()
+
+def test_unparsed_batch_response_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(completion_cache, 'cache_config',
+                        dict(completion_cache.cache_config, enabled=True, path=str(tmp_path / 'completions.sqlite')))
+    monkeypatch.setattr(completion_cache, '_connection', None)
+    descriptions = ['C ' + LONG_TEXT, 'D ' + LONG_TEXT, 'E ' + LONG_TEXT]
+    (tmp_path / 'first').mkdir()
+    (tmp_path / 'second').mkdir()
+    try:
+        run_analysis(tmp_path / 'first', monkeypatch, FakeBatchClient(broken_size=3), descriptions)
+        client = FakeBatchClient()
+        result = run_analysis(tmp_path / 'second', monkeypatch, client, descriptions)
+    finally:
+        completion_cache.close()
+
+    # Второй запуск заново запрашивает пакет, а не получает из кэша неразобранный ответ
+    assert list(result['analysis']) == ["['answer 1']", "['answer 2']", "['answer 3']"]
+    assert len(client.requests) == 1
+
+def test_batch_api_mode_with_local_backend(tmp_path, monkeypatch):
+    descriptions = ['A ' + LONG_TEXT, 'short', 'B ' + LONG_TEXT, 'A ' + LONG_TEXT]
+    client = FakeBatchClient()
+    config = {'analysis_mode': 'batch',
+              'batch_api': {'backend': 'local', 'workdir': str(tmp_path / 'batches'), 'poll_interval': 0}}
+
+    result = run_analysis(tmp_path, monkeypatch, client, descriptions, config)
+
+    assert list(result['analysis'].fillna('')) == ['single A', '', 'single B', 'single A']
+    assert len(client.requests) == 3
+    assert not os.path.exists(str(tmp_path / 'analysed.csv.batch.json'))
+
+def test_batch_job_state_survives_crash_while_saving(tmp_path, monkeypatch):
+    descriptions = ['A ' + LONG_TEXT, 'B ' + LONG_TEXT]
+    client = FakeBatchClient()
+    config = {'analysis_mode': 'batch',
+              'batch_api': {'backend': 'local', 'workdir': str(tmp_path / 'batches'), 'poll_interval': 0}}
+    append = CheckpointJournal.append
+
+    def crash(self, entry):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(CheckpointJournal, 'append', crash)
+    with pytest.raises(OSError):
+        run_analysis(tmp_path, monkeypatch, client, descriptions, config)
+    # Ответы ещё не сохранены — задание не забыто
+    assert os.path.exists(str(tmp_path / 'analysed.csv.batch.json'))
+
+    monkeypatch.setattr(CheckpointJournal, 'append', append)
+    asyncio.run(analyse_module.analyse_data(str(tmp_path / 'cleaned.csv'), str(tmp_path / 'analysed.csv'),
+                                            str(tmp_path / 'client' / 'roles'), config))
+
+    assert list(pd.read_csv(tmp_path / 'analysed.csv')['analysis']) == ['single A', 'single B']
+    # Повторный запуск дождался того же задания, а не отправил новое
+    assert len(client.requests) == 2
+    assert not os.path.exists(str(tmp_path / 'analysed.csv.batch.json'))
+
+def test_batch_model_must_be_openai_compatible():
+    openai_backend = dict(DEFAULT_BATCH_API_CONFIG)
+
+    assert batch_model(openai_backend, 'openai', 'gpt-4o-mini') == 'gpt-4o-mini'
+    assert batch_model(dict(openai_backend, model='gpt-4o-mini'), 'groq', 'llama-3.1-8b-instant') == 'gpt-4o-mini'
+    assert batch_model(dict(openai_backend, backend='local'), 'groq', 'llama-3.1-8b-instant') == 'llama-3.1-8b-instant'
+    with pytest.raises(ValueError):
+        batch_model(openai_backend, 'groq', 'llama-3.1-8b-instant')
+
+def test_batch_job_with_other_provider_fails_before_submission(tmp_path, monkeypatch):
+    client = FakeBatchClient()
+    config = {'provider': 'groq', 'analysis_mode': 'batch', 'batch_api': {'backend': 'openai'}}
+
+    with pytest.raises(ValueError):
+        run_analysis(tmp_path, monkeypatch, client, ['A ' + LONG_TEXT], config)
+
+    assert client.requests == []
+    assert not os.path.exists(str(tmp_path / 'analysed.csv.batch.json'))
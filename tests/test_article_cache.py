@@ -0,0 +1,54 @@
+# tests/test_article_cache.py
+
+import time
+import pytest
+from modules.article_cache import ArticleCache
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ArticleCache({'enabled': True, 'path': str(tmp_path / 'articles.sqlite')})
+    yield cache
+    cache.close()
+
+def test_put_and_get_by_canonical_url(cache):
+    article = {'title': 'Test Title', 'authors': ['Author'], 'text': 'Test content'}
+    cache.put('https://Example.com/news?id=1&utm_source=x', '<html></html>', '"abc"', None, article)
+
+    entry = cache.get('https://example.com/news?id=1#comments')
+
+    assert entry is not None
+    assert entry['title'] == 'Test Title'
+    assert entry['authors'] == ['Author']
+    assert entry['text'] == 'Test content'
+    assert entry['etag'] == '"abc"'
+    assert cache.is_fresh(entry)
+
+def test_touch_refreshes_stale_entry(cache):
+    cache.cache_config['ttl_hours'] = 1
+    cache.put('https://example.com/a', '<html></html>', None, 'Mon, 01 Jan 2024 00:00:00 GMT', {'text': 'a'})
+    cache._connection.execute("UPDATE articles SET fetched_at = ?", (time.time() - 7200,))
+
+    assert not cache.is_fresh(cache.get('https://example.com/a'))
+    cache.touch('https://example.com/a')
+    assert cache.is_fresh(cache.get('https://example.com/a'))
+
+def test_evict_respects_age_and_size(cache):
+    for i in range(5):
+        cache.put(f'https://example.com/{i}', 'x' * 1000, None, None, {'text': ''})
+        cache._connection.execute("UPDATE articles SET fetched_at = ? WHERE url = ?", (time.time() - 100 + i, f'https://example.com/{i}'))
+    cache._connection.execute("UPDATE articles SET fetched_at = ? WHERE url = ?", (time.time() - 40 * 86400, 'https://example.com/4'))
+    cache.cache_config['max_size_mb'] = 2500 / (1024 * 1024)
+
+    cache.evict()
+
+    assert cache.get('https://example.com/4') is None
+    assert cache.get('https://example.com/0') is None
+    assert cache.get('https://example.com/1') is None
+    assert cache.get('https://example.com/2') is not None
+    assert cache.get('https://example.com/3') is not None
+
+def test_disabled_cache_is_noop(tmp_path):
+    cache = ArticleCache({'path': str(tmp_path / 'articles.sqlite')})
+    cache.put('https://example.com/a', '<html></html>', None, None, {'text': 'a'})
+    assert cache.get('https://example.com/a') is None
+    assert not (tmp_path / 'articles.sqlite').exists()
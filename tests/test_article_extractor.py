@@ -0,0 +1,56 @@
+# tests/test_article_extractor.py
+
+import asyncio
+from modules.article_extractor import ArticleExtractor
+
+HTML = """
+<html><head><title>Logistics news</title></head>
+<body><article>
+<h1>Logistics company opens a new hub</h1>
+<p>The logistics company announced on Monday that it has opened a new distribution hub near the port.
+The hub will handle up to ten thousand parcels per day and employ two hundred people.</p>
+<p>According to the company, the investment will shorten delivery times across the region
+and reduce the load on existing warehouses during the peak season.</p>
+</article></body></html>
+"""
+
+def extract_with(extractor):
+    async def scenario():
+        return await asyncio.gather(*[extractor.extract('https://example.com/news', HTML) for _ in range(3)])
+
+    try:
+        return asyncio.run(scenario())
+    finally:
+        extractor.shutdown()
+
+def test_extraction_in_process_pool():
+    extractor = ArticleExtractor(workers=2)
+
+    async def scenario():
+        results = await asyncio.gather(*[extractor.extract('https://example.com/news', HTML) for _ in range(3)])
+        return results, extractor._executor
+
+    try:
+        results, executor = asyncio.run(scenario())
+    finally:
+        extractor.shutdown()
+
+    assert executor is not None
+    assert all(result == results[0] for result in results)
+    assert 'distribution hub' in results[0]['text']
+    # shutdown() закрывает пул, следующий запуск создаст новый
+    assert extractor._executor is None
+
+def test_extraction_in_current_process_gives_same_result():
+    assert extract_with(ArticleExtractor(workers=0)) == extract_with(ArticleExtractor(workers=2))
+
+def test_shutdown_and_reconfigure():
+    extractor = ArticleExtractor(workers=1)
+    extract_with(extractor)
+    extractor.shutdown()
+
+    extractor.configure(workers=0)
+
+    assert extractor.workers == 0
+    assert extract_with(extractor)[0]['text']
+    assert extractor._executor is None
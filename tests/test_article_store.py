@@ -0,0 +1,62 @@
+# tests/test_article_store.py
+
+import sqlite3
+import zlib
+import pandas as pd
+import pytest
+from modules.article_store import CODEC, ArticleStore, article_id, decompress
+from modules import analyse_data
+from modules.clean_data import clean_data
+from modules.fetch_data import save_articles
+
+TEXT = "Acme will launch a logistics startup accelerator. " * 200
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArticleStore({'enabled': True, 'path': str(tmp_path / 'articles.sqlite')})
+    yield store
+    store.close()
+
+def test_text_is_stored_compressed_by_content(store, tmp_path):
+    key = store.put(TEXT)
+
+    assert key == article_id(TEXT) == store.put(TEXT)
+    assert store.get(key) == TEXT
+    assert store.get('missing') is None
+    connection = sqlite3.connect(tmp_path / 'articles.sqlite')
+    count, stored = connection.execute("SELECT COUNT(*), LENGTH(body) FROM articles").fetchone()
+    connection.close()
+    assert count == 1
+    assert stored < len(TEXT) / 10
+
+def test_disabled_store_keeps_nothing(tmp_path):
+    store = ArticleStore({'path': str(tmp_path / 'articles.sqlite')})
+
+    assert store.put(TEXT) is None
+    assert store.get(article_id(TEXT)) is None
+
+def test_analysis_reads_full_text_instead_of_preview(store, monkeypatch):
+    monkeypatch.setattr(analyse_data, 'article_store', store)
+    row = {'description': TEXT[:500], 'article_id': store.put(TEXT)}
+
+    assert analyse_data.article_text(row) == TEXT.strip()[:analyse_data.MAX_ARTICLE_LENGTH]
+    assert analyse_data.article_text({'description': 'preview', 'article_id': float('nan')}) == 'preview'
+
+def test_zlib_blobs_stay_readable():
+    assert decompress(zlib.compress(TEXT.encode('utf-8')), 'zlib') == TEXT
+    assert CODEC == 'zstd'
+
+def test_article_id_column_survives_incremental_runs(tmp_path):
+    input_filename = str(tmp_path / 'search_results.csv')
+    output_filename = str(tmp_path / 'search_results_cleaned.csv')
+    save_articles([{'title': 'A', 'description': 'Logistics company announced a pilot'}], input_filename)
+    clean_data(input_filename, output_filename, incremental=True)
+
+    # Хранилище статей включили между запусками: у новых строк появилась колонка article_id
+    save_articles([{'title': 'B', 'description': 'Freight operator invests in robotics', 'article_id': 'abc'}],
+                  input_filename)
+    clean_data(input_filename, output_filename, incremental=True)
+
+    cleaned = pd.read_csv(output_filename)
+    assert list(cleaned['title']) == ['A', 'B']
+    assert cleaned['article_id'].tolist()[1] == 'abc'
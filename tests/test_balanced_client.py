@@ -0,0 +1,96 @@
+# tests/test_balanced_client.py
+
+import asyncio
+import pandas as pd
+import llm_clients
+import modules.analyse_data as analyse_module
+from llm_clients.balanced_client import BalancedLLMClient
+from llm_clients.errors import RateLimitError
+
+class FakeProviderClient:
+    def __init__(self, name, fail_with=None, delay=0.001):
+        self.model = name
+        self.fail_with = fail_with
+        self.delay = delay
+        self.calls = 0
+
+    async def get_completion(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail_with:
+            raise self.fail_with
+        return self.model
+
+    async def get_completion_with_usage(self, messages, max_tokens=None):
+        return await self.get_completion(messages), None
+
+    async def close(self):
+        pass
+
+def make_balancer(monkeypatch, clients, providers):
+    monkeypatch.setattr(llm_clients, 'get_llm_client', lambda provider, config: clients[provider])
+    return BalancedLLMClient({'rate_limit': 100, 'rate_limit_period': 60, 'providers': providers,
+                              'balancer': {'members': list(clients)}})
+
+def test_failover_on_rate_limit(monkeypatch):
+    clients = {'limited': FakeProviderClient('limited', RateLimitError('slow down', retry_after=30)),
+               'healthy': FakeProviderClient('healthy')}
+    balancer = make_balancer(monkeypatch, clients, {})
+
+    async def scenario():
+        return [await balancer.get_completion([]) for _ in range(5)]
+
+    assert asyncio.run(scenario()) == ['healthy'] * 5
+    # После 429 провайдер на паузе и больше не получает запросов
+    assert clients['limited'].calls == 1
+
+def test_failover_on_provider_sdk_error(monkeypatch):
+    class ResourceExhausted(Exception):
+        pass
+
+    clients = {'gemini': FakeProviderClient('gemini', ResourceExhausted('429 quota')),
+               'healthy': FakeProviderClient('healthy')}
+    balancer = make_balancer(monkeypatch, clients, {})
+
+    async def scenario():
+        return [await balancer.get_completion([]) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == ['healthy'] * 3
+    assert clients['gemini'].calls == 1
+
+def test_load_is_spread_within_quotas(monkeypatch):
+    clients = {'small': FakeProviderClient('small'), 'large': FakeProviderClient('large')}
+    balancer = make_balancer(monkeypatch, clients, {'small': {'rate_limit': 5}, 'large': {'rate_limit': 50}})
+
+    async def scenario():
+        return await asyncio.gather(*[balancer.get_completion([]) for _ in range(40)])
+
+    answers = asyncio.run(scenario())
+
+    assert balancer.rate_limit == 55
+    assert answers.count('small') + answers.count('large') == 40
+    assert 1 <= clients['small'].calls <= 5
+
+def test_analysis_with_balanced_provider(tmp_path, monkeypatch):
+    clients = {'openai': FakeProviderClient('openai'), 'groq': FakeProviderClient('groq')}
+
+    def get_llm_client(provider, config):
+        return BalancedLLMClient(config) if provider == 'balanced' else clients[provider]
+
+    monkeypatch.setattr(llm_clients, 'get_llm_client', get_llm_client)
+    roles_dir = tmp_path / 'client' / 'roles'
+    roles_dir.mkdir(parents=True)
+    (roles_dir / 'prompt.txt').write_text('prompt', encoding='utf-8')
+    input_file = str(tmp_path / 'cleaned.csv')
+    output_file = str(tmp_path / 'analysed.csv')
+    text = "Logistics company announced a new partnership with a startup. " * 3
+    pd.DataFrame({'link': [f'https://{n}.com' for n in range(4)], 'description': [text] * 4}).to_csv(input_file, index=False)
+    # Квоты в пересчёте на минуту дают дробную сумму
+    config = {'provider': 'balanced', 'rate_limit': 7, 'rate_limit_period': 9,
+              'balancer': {'members': ['openai', 'groq']}}
+
+    asyncio.run(analyse_module.analyse_data(input_file, output_file, str(roles_dir), config))
+
+    result = pd.read_csv(output_file)
+    assert set(result['analysis']) <= {'openai', 'groq'}
+    assert result['analysis'].notna().all()
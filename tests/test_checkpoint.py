@@ -0,0 +1,95 @@
+# tests/test_checkpoint.py
+
+import asyncio
+import os
+import pandas as pd
+import llm_clients
+import modules.analyse_data as analyse_module
+from modules.checkpoint import CheckpointJournal, journal_path, row_id
+
+LONG_TEXT = "Logistics company announced a new partnership with a startup. " * 3
+
+class FakeLLMClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_completion(self, messages):
+        self.calls += 1
+        return f"analysis of {messages[1]['content'][:10]}"
+
+    async def close(self):
+        pass
+
+def test_journal_skips_torn_last_line(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / 'out.csv.journal.jsonl'), flush_rows=1)
+    journal.append({'row_id': 'a', 'analysis': '1'})
+    journal.append({'row_id': 'b', 'analysis': '2'})
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as file:
+        file.write('{"row_id": "c", "anal')
+
+    assert CheckpointJournal(journal.path).completed() == {'a': '1', 'b': '2'}
+
+def test_journal_survives_repeated_crashes(tmp_path):
+    path = str(tmp_path / 'out.csv.journal.jsonl')
+    for run, row in enumerate(['a', 'b', 'c']):
+        journal = CheckpointJournal(path, flush_rows=1)
+        journal.append({'row_id': row, 'analysis': str(run)})
+        journal.close()
+        # Падение во время записи следующей строки
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write('{"row_id": "torn-' + row)
+
+    assert CheckpointJournal(path).completed() == {'a': '0', 'b': '1', 'c': '2'}
+
+def test_analyse_data_resumes_from_journal(tmp_path, monkeypatch):
+    roles_dir = tmp_path / 'client' / 'roles'
+    roles_dir.mkdir(parents=True)
+    (roles_dir / 'prompt.txt').write_text('prompt', encoding='utf-8')
+    input_file = str(tmp_path / 'cleaned.csv')
+    output_file = str(tmp_path / 'analysed.csv')
+    pd.DataFrame({
+        'link': ['https://a.com', 'https://b.com', 'https://c.com'],
+        'description': ['A ' + LONG_TEXT, 'B ' + LONG_TEXT, 'short']
+    }).to_csv(input_file, index=False)
+
+    # Прерванный запуск успел проанализировать первую строку; оборванная запись не мешает продолжению
+    journal = CheckpointJournal(journal_path(output_file))
+    journal.append({'row_id': row_id('https://a.com', 'A ' + LONG_TEXT), 'analysis': 'restored'})
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as file:
+        file.write('{"row_id": "')
+
+    client = FakeLLMClient()
+    monkeypatch.setattr(llm_clients, 'get_llm_client', lambda provider, config: client)
+    asyncio.run(analyse_module.analyse_data(input_file, output_file, str(roles_dir), {}))
+
+    result = pd.read_csv(output_file)
+    assert result.loc[0, 'analysis'] == 'restored'
+    assert result.loc[1, 'analysis'].startswith('analysis of')
+    assert pd.isna(result.loc[2, 'analysis'])
+    assert client.calls == 1
+    assert not os.path.exists(journal_path(output_file))
+
+def test_run_workers_bounds_concurrency_and_read_ahead():
+    state = {'read': 0, 'active': 0, 'max_active': 0, 'max_ahead': 0, 'done': []}
+
+    def items():
+        for i in range(100):
+            state['read'] += 1
+            yield (i,)
+
+    async def handler(i):
+        state['active'] += 1
+        state['max_active'] = max(state['max_active'], state['active'])
+        state['max_ahead'] = max(state['max_ahead'], state['read'] - len(state['done']))
+        await asyncio.sleep(0.001)
+        state['active'] -= 1
+        state['done'].append(i)
+
+    asyncio.run(analyse_module.run_workers(items(), handler, workers=4))
+
+    assert sorted(state['done']) == list(range(100))
+    assert state['max_active'] <= 4
+    # Не больше очереди (2 * workers), обрабатываемых и одного ожидающего put
+    assert state['max_ahead'] <= 4 * 3 + 1
@@ -59,4 +59,41 @@ def test_clean_data(tmp_path):
     assert 'Another content 12' in df_cleaned['description'].values
     assert 'Another content 13' in df_cleaned['description'].values
     assert 'Another content 14' in df_cleaned['description'].values
-    assert 'Another content 15' in df_cleaned['description'].values
\ No newline at end of file
+    assert 'Another content 15' in df_cleaned['description'].values
+
+def test_clean_data_incremental(tmp_path):
+    input_filename = tmp_path / "search_results.csv"
+    output_filename = tmp_path / "search_results_cleaned.csv"
+    pd.DataFrame({
+        'title': ['Title A', 'Title B', 'Title C'],
+        'description': [
+            'Logistics company announced a pilot with a startup',
+            'Logistics company announced a pilot with a startup!',
+            'Completely different article about shipping'
+        ]
+    }).to_csv(input_filename, index=False)
+
+    rows_before, rows_after = clean_data(input_filename, output_filename, incremental=True)
+    assert (rows_before, rows_after) == (3, 2)
+    assert (tmp_path / "search_results_cleaned.index.json").exists()
+
+    # Append new rows: one strict duplicate, one near duplicate and one new article
+    pd.DataFrame({
+        'title': ['Title C', 'Title D', 'Title B2'],
+        'description': [
+            'Completely different article about shipping',
+            'completely different article about shipping.',
+            'Freight operator invests in warehouse robotics'
+        ]
+    }).to_csv(input_filename, mode='a', header=False, index=False)
+
+    # Totals, as for a full clean
+    rows_before, rows_after = clean_data(input_filename, output_filename, incremental=True)
+    assert (rows_before, rows_after) == (6, 3)
+
+    # The new row is placed by title, as after a full clean
+    df_cleaned = pd.read_csv(output_filename)
+    assert list(df_cleaned['title']) == ['Title A', 'Title B2', 'Title C']
+
+    # Nothing new: nothing to compare
+    assert clean_data(input_filename, output_filename, incremental=True) == (6, 3)
@@ -0,0 +1,63 @@
+# tests/test_completion_cache.py
+
+import asyncio
+import pytest
+from llm_clients.completion_cache import CompletionCache, CachedLLMClient
+
+class FakeLLMClient:
+    def __init__(self, model='model-a', temperature=0.7):
+        self.model = model
+        self.temperature = temperature
+        self.calls = 0
+
+    async def get_completion(self, messages):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CompletionCache({'enabled': True, 'path': str(tmp_path / 'completions.sqlite')})
+    yield cache
+    cache.close()
+
+def messages(prompt, text):
+    return [{"role": "system", "content": prompt}, {"role": "user", "content": text}]
+
+def test_repeated_request_is_served_from_cache(cache):
+    client = FakeLLMClient()
+    cached = CachedLLMClient(client, 'openai', cache, 'client')
+
+    first = asyncio.run(cached.get_completion(messages('prompt', 'text')))
+    second = asyncio.run(cached.get_completion(messages('prompt', 'text')))
+
+    assert first == second == 'answer 1'
+    assert client.calls == 1
+    assert cached.lookup(messages('prompt', 'other text')) is None
+
+def test_key_depends_on_model_and_sampling_params(cache):
+    asyncio.run(CachedLLMClient(FakeLLMClient(), 'openai', cache, 'client').get_completion(messages('p', 't')))
+
+    assert CachedLLMClient(FakeLLMClient(model='model-b'), 'openai', cache).lookup(messages('p', 't')) is None
+    assert CachedLLMClient(FakeLLMClient(temperature=0), 'openai', cache).lookup(messages('p', 't')) is None
+    assert CachedLLMClient(FakeLLMClient(), 'openai', cache).lookup(messages('p', 't')) == 'answer 1'
+
+def test_invalidate_on_prompt_change(cache):
+    cached = CachedLLMClient(FakeLLMClient(), 'openai', cache, 'client')
+    assert cache.invalidate('client', 'prompt v1') == 0
+    asyncio.run(cached.get_completion(messages('prompt v1', 'text')))
+
+    assert cache.invalidate('client', 'prompt v1') == 0
+    assert cache.invalidate('client', 'prompt v2') == 1
+    assert cached.lookup(messages('prompt v1', 'text')) is None
+
+def test_evict_least_recently_used(tmp_path):
+    cache = CompletionCache({'enabled': True, 'path': str(tmp_path / 'completions.sqlite'), 'max_size_mb': 15 / (1024 * 1024)})
+    cache.put('old', 'client', 'x' * 10)
+    cache.put('new', 'client', 'y' * 10)
+    cache._connect().execute("UPDATE completions SET used_at = 1 WHERE key = 'old'")
+
+    cache.evict()
+
+    assert cache.get('old') is None
+    assert cache.get('new') == 'y' * 10
+    cache.close()
@@ -1,8 +1,19 @@
 # tests/test_fetch_data.py
 
+import asyncio
+import aiohttp
 import pytest
 import requests
-from modules.fetch_data import fetch_xmlstock_search_results, fetch_and_parse, save_results_to_csv
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import modules.fetch_data as fetch_data
+import pandas as pd
+from modules.fetch_data import (fetch_xmlstock_search_results, fetch_and_parse, save_results_to_csv,
+                                fetch_xmlstock_page, parse_xmlstock_response, fetch_and_save_queries)
+from modules.article_cache import article_cache
+from modules.http_session import session_manager
+from modules.rate_limiter import RequestBudget
+from modules.serp_cache import serp_cache
 
 @pytest.fixture
 def mock_xml_response():
@@ -55,4 +66,143 @@ def test_save_results_to_csv(tmp_path):
     assert "http://example.com/article" in content
     assert "2024-06-13" in content
     assert "Test content" in content
-    assert "test query" in content
\ No newline at end of file
+    assert "test query" in content
+
+def serve_xmlstock(calls, content, status=200):
+    async def search(request):
+        calls.append(dict(request.query))
+        return web.Response(text=content, status=status)
+
+    app = web.Application()
+    app.router.add_get('/google/xml/', search)
+    return TestServer(app)
+
+def run_with_xmlstock(monkeypatch, content, scenario, status=200):
+    calls = []
+
+    async def main():
+        server = serve_xmlstock(calls, content, status)
+        await server.start_server()
+        monkeypatch.setattr(fetch_data, 'url', str(server.make_url('/google/xml/')))
+        try:
+            return await scenario()
+        finally:
+            await session_manager.close()
+            await server.close()
+
+    return asyncio.run(main()), calls
+
+def test_parse_xmlstock_response(mock_xml_response):
+    results, error = parse_xmlstock_response(mock_xml_response)
+
+    assert error is None
+    assert results == [{'title': 'Test Title', 'link': 'http://example.com/article', 'pubDate': '2024-06-13'}]
+    assert parse_xmlstock_response("<response><error>Bad key</error></response>") == ([], 'Bad key')
+
+def test_fetch_xmlstock_page(monkeypatch, mock_xml_response):
+    async def scenario():
+        async with aiohttp.ClientSession() as session:
+            return await fetch_xmlstock_page(session, {'query': 'test', 'page': 0}, budget=RequestBudget())
+
+    content, calls = run_with_xmlstock(monkeypatch, mock_xml_response, scenario)
+
+    assert content == mock_xml_response
+    assert calls == [{'query': 'test', 'page': '0'}]
+
+def test_fetch_xmlstock_page_error_status(monkeypatch):
+    async def scenario():
+        async with aiohttp.ClientSession() as session:
+            return await fetch_xmlstock_page(session, {'query': 'test', 'page': 0}, budget=RequestBudget())
+
+    content, _ = run_with_xmlstock(monkeypatch, 'error', scenario, status=500)
+
+    assert content is None
+
+def test_search_results_pages_are_cached(tmp_path, monkeypatch, mock_xml_response):
+    monkeypatch.setattr(serp_cache, 'cache_config',
+                        dict(serp_cache.cache_config, enabled=True, path=str(tmp_path / 'serp.sqlite')))
+    monkeypatch.setattr(serp_cache, '_connection', None)
+    config = {'search_engines': [{'name': 'xmlsearch'}], 'num_results': 1, 'num_pages': 1, 'days': 7}
+
+    async def scenario():
+        budget = RequestBudget()
+        return [await fetch_xmlstock_search_results('test query', None, None, config, budget=budget)
+                for _ in range(2)]
+
+    try:
+        (first, second), calls = run_with_xmlstock(monkeypatch, mock_xml_response, scenario)
+    finally:
+        serp_cache.close()
+
+    assert first == second
+    assert first[0]['title'] == 'Test Title'
+    assert len(calls) == 1
+    assert calls[0]['tbs'] == 'qdr:d7'
+
+def test_queries_are_saved_in_order(tmp_path, monkeypatch):
+    # Первый запрос завершается последним; общую статью сохраняет первый по порядку запрос
+    delays = {'first': 0.05, 'second': 0.01, 'third': 0}
+    links = {'first': ['https://a.com', 'https://shared.com'], 'second': ['https://shared.com', 'https://b.com'],
+             'third': ['https://c.com']}
+    active = []
+    peak = []
+
+    async def fake_fetch_articles(query, include, exclude, config, verbose, proxy, budget=None, url_registry=None):
+        active.append(query)
+        peak.append(len(active))
+        await asyncio.sleep(delays[query])
+        active.remove(query)
+        return [{'title': link, 'link': link, 'query': query} for link in links[query]]
+
+    monkeypatch.setattr(fetch_data, 'fetch_articles', fake_fetch_articles)
+    output_filename = str(tmp_path / 'search_results.csv')
+    config = {'search_engines': [{'name': 'xmlsearch'}], 'query_concurrency': 2}
+
+    saved = asyncio.run(fetch_and_save_queries(['first', 'second', 'third'], None, None, config, output_filename))
+
+    df = pd.read_csv(output_filename)
+    assert saved == 4
+    assert list(df['link']) == ['https://a.com', 'https://shared.com', 'https://b.com', 'https://c.com']
+    assert df.loc[1, 'query'].split(fetch_data.QUERY_SEPARATOR) == ['first', 'second']
+    assert max(peak) == 2
+
+def test_stale_article_is_served_when_revalidation_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(article_cache, 'cache_config',
+                        dict(article_cache.cache_config, enabled=True, ttl_hours=0, path=str(tmp_path / 'articles.sqlite')))
+    monkeypatch.setattr(article_cache, '_connection', None)
+    monkeypatch.setattr(fetch_data, 'REQUEST_DELAY', 0)
+    statuses = {'/down': 503, '/gone': 404}
+    calls = []
+
+    async def article(request):
+        calls.append((request.path, request.headers.get('If-None-Match')))
+        return web.Response(text='error', status=statuses[request.path])
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/down', article)
+        app.router.add_get('/gone', article)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            results = []
+            for path in statuses:
+                url = str(server.make_url(path))
+                article_cache.put(url, '<html></html>', '"v1"', None,
+                                  {'title': 'Cached title', 'authors': [], 'text': 'Cached text'})
+                results.append(await fetch_and_parse(url))
+            return results
+        finally:
+            await session_manager.close()
+            await server.close()
+
+    try:
+        down, gone = asyncio.run(main())
+    finally:
+        article_cache.close()
+
+    # 5xx при условном запросе: устаревшая копия вместо пустой статьи
+    assert (down['title'], down['text']) == ('Cached title', 'Cached text')
+    # 404: статьи больше нет, копия не используется
+    assert gone['title'] == 'N/A'
+    assert calls == [('/down', '"v1"'), ('/gone', '"v1"')]
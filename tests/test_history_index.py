@@ -0,0 +1,63 @@
+# tests/test_history_index.py
+
+import pandas as pd
+import pytest
+from modules.history_index import HistoryIndex, open_history_index
+
+DESCRIPTION = "Global logistics corporation DHL announced a partnership with a robotics startup to automate its warehouses."
+
+@pytest.fixture
+def history(tmp_path):
+    history = HistoryIndex(str(tmp_path / 'history.sqlite'), 'client')
+    history.record('https://example.com/news?utm_source=x', DESCRIPTION, 'DHL', 'prompt-1', 'results/client/2024-06-01')
+    yield history
+    history.close()
+
+def make_df():
+    return pd.DataFrame({
+        'link': ['https://example.com/news', 'https://mirror.example.org/copy', 'https://example.com/other'],
+        'description': [DESCRIPTION, DESCRIPTION.upper(), 'Short text'],
+        'analysis': ['', '', '']
+    })
+
+def test_reuse_with_same_prompt(history):
+    df, reused, skipped = history.apply(make_df(), 'prompt-1', 'results/client/2024-06-02', mode='reuse')
+
+    assert (reused, skipped) == (2, 0)
+    assert list(df['analysis']) == ['DHL', 'DHL', '']
+
+def test_no_reuse_with_changed_prompt(history):
+    df, reused, skipped = history.apply(make_df(), 'prompt-2', 'results/client/2024-06-02', mode='reuse')
+
+    assert (reused, skipped) == (0, 0)
+    assert list(df['analysis']) == ['', '', '']
+
+def test_skip_seen_in_other_runs_only(history):
+    df, reused, skipped = history.apply(make_df(), 'prompt-1', 'results/client/2024-06-02', mode='skip')
+    assert skipped == 2
+    assert list(df['link']) == ['https://example.com/other']
+
+    df, reused, skipped = history.apply(make_df(), 'prompt-1', 'results/client/2024-06-01', mode='skip')
+    assert skipped == 0
+
+def test_skip_ignores_other_clients_in_global_history(history):
+    other = HistoryIndex(history.path, 'other-client')
+    try:
+        df, reused, skipped = other.apply(make_df(), 'prompt-1', 'results/other-client/2024-06-02', mode='skip')
+    finally:
+        other.close()
+
+    assert skipped == 0
+    assert len(df) == 3
+
+def test_open_history_index_scope(tmp_path):
+    roles_dir = str(tmp_path / 'results' / 'client' / 'roles')
+
+    history, mode = open_history_index(roles_dir, {})
+    assert history is None
+
+    history, mode = open_history_index(roles_dir, {'history': {'enabled': True, 'mode': 'skip'}})
+    assert history.path == str(tmp_path / 'results' / 'client' / 'history.sqlite')
+    assert history.client_name == 'client'
+    assert mode == 'skip'
+    history.close()
@@ -0,0 +1,47 @@
+# tests/test_http_session.py
+
+import asyncio
+import json
+import os
+from modules.http_session import SessionManager, DEFAULT_HTTP_CONFIG
+
+def test_session_is_reused_until_closed():
+    manager = SessionManager()
+
+    async def scenario():
+        first = await manager.get_session()
+        second = await manager.get_session()
+        await manager.close()
+        third = await manager.get_session()
+        await manager.close()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+
+    assert first is second
+    assert first.closed
+    # После close() создаётся новая сессия
+    assert third is not first
+    assert third.closed
+
+def test_pool_is_configured_from_http_section():
+    with open(os.path.join(os.path.dirname(__file__), '..', 'config', 'search_config.json')) as f:
+        http_config = json.load(f)['http']
+    manager = SessionManager()
+    manager.configure(http_config)
+    manager.configure({'limit_per_host': 3})
+
+    async def scenario():
+        async with manager:
+            connector = (await manager.get_session()).connector
+            return connector.limit, connector.limit_per_host
+
+    assert asyncio.run(scenario()) == (http_config.get('limit', DEFAULT_HTTP_CONFIG['limit']), 3)
+    assert manager._session is None
+
+def test_close_without_session():
+    manager = SessionManager()
+
+    asyncio.run(manager.close())
+
+    assert manager._session is None
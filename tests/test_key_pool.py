@@ -0,0 +1,84 @@
+# tests/test_key_pool.py
+
+import asyncio
+import time
+import pytest
+from llm_clients.errors import QuotaExceededError
+from llm_clients.key_pool import KeyPool
+
+def test_keys_rotate_when_equally_ready():
+    pool = KeyPool(['a', 'b', 'c'])
+
+    async def scenario():
+        return [await pool.acquire() for _ in range(6)]
+
+    assert asyncio.run(scenario()) == ['a', 'b', 'c', 'a', 'b', 'c']
+
+def test_cooled_down_key_is_skipped_and_returns():
+    pool = KeyPool(['a', 'b'])
+    pool.cooldown('a', 0.05)
+
+    async def scenario():
+        first = [await pool.acquire() for _ in range(2)]
+        await asyncio.sleep(0.06)
+        return first, await pool.acquire()
+
+    first, after_cooldown = asyncio.run(scenario())
+
+    assert first == ['b', 'b']
+    assert after_cooldown == 'a'
+
+def test_picks_key_that_can_serve_soonest():
+    # На каждый ключ 600 запросов в минуту: следующий запрос через 0.1 с
+    pool = KeyPool(['a', 'b'], requests_per_minute=600)
+    for state in pool.states:
+        state.requests.tokens = 0
+    pool.states[1].requests.tokens = 0.5
+
+    async def scenario():
+        started_at = time.monotonic()
+        key = await pool.acquire()
+        return key, time.monotonic() - started_at
+
+    key, waited = asyncio.run(scenario())
+
+    assert key == 'b'
+    assert waited < 0.09
+
+def test_token_bucket_limits_large_requests():
+    pool = KeyPool(['a', 'b'], tokens_per_minute=1000)
+    pool.states[0].tokens.tokens = 100
+
+    assert asyncio.run(pool.acquire(tokens=500)) == 'b'
+
+def test_all_keys_out_of_quota_raise_instead_of_waiting():
+    pool = KeyPool(['a', 'b'])
+    pool.cooldown('a', 3600, quota=True)
+    pool.cooldown('b', 3600, quota=True)
+
+    async def scenario():
+        with pytest.raises(QuotaExceededError):
+            await asyncio.wait_for(pool.acquire(), timeout=1)
+
+    asyncio.run(scenario())
+
+def test_waiting_for_rate_limited_key_notices_quota_exhaustion():
+    pool = KeyPool(['a'])
+    pool.cooldown('a', 30)
+
+    async def scenario():
+        waiting = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.01)
+        pool.cooldown('a', 3600, quota=True)
+        with pytest.raises(QuotaExceededError):
+            await asyncio.wait_for(waiting, timeout=2)
+
+    asyncio.run(scenario())
+
+def test_settle_returns_unused_tokens_to_key():
+    pool = KeyPool(['a'], tokens_per_minute=1000)
+    assert asyncio.run(pool.acquire(tokens=900)) == 'a'
+
+    pool.settle('a', 900, 100)
+
+    assert pool.states[0].ready_in(800) == 0
@@ -0,0 +1,64 @@
+# tests/test_llm_clients.py
+
+import json
+import pytest
+from llm_clients import get_llm_client, provider_config
+from llm_clients.openai_client import OpenAIClient
+from modules.analyse_data import load_llm_config
+
+CONFIG = {
+    'provider': 'openai',
+    'model': 'gpt-4o-mini',
+    'temperature': 0.7,
+    'rate_limit': 20,
+    'providers': {'groq': {'model': 'llama-3.1-8b-instant', 'rate_limit': 30}}
+}
+
+def test_provider_section_overrides_common_params():
+    settings = provider_config('groq', CONFIG)
+
+    assert settings['model'] == 'llama-3.1-8b-instant'
+    assert settings['rate_limit'] == 30
+    assert settings['temperature'] == 0.7
+
+@pytest.mark.parametrize("provider, env, base_url", [
+    ('openai', 'OPENAI_API_KEYS', 'https://api.openai.com/v1'),
+    ('openrouter', 'OPENROUTER_API_KEYS', 'https://openrouter.ai/api/v1'),
+    ('aimlapi', 'AIMLAPI_API_KEYS', 'https://api.aimlapi.com/v1'),
+    ('groq', 'GROQ_API_KEYS', 'https://api.groq.com/openai/v1'),
+])
+def test_openai_compatible_providers(provider, env, base_url, monkeypatch):
+    monkeypatch.setenv(env, 'key-1,key-2')
+
+    client = get_llm_client(provider, CONFIG)
+
+    assert isinstance(client, OpenAIClient)
+    assert client.base_url == base_url
+    assert client.api_keys_list == ['key-1', 'key-2']
+
+def test_gemini_client_from_dict(monkeypatch):
+    pytest.importorskip('google.generativeai')
+    monkeypatch.setenv('GEMINI_API_KEYS', 'key-1')
+
+    client = get_llm_client('Gemini', dict(CONFIG, providers={'gemini': {'model': 'gemini-1.5-flash'}}))
+
+    assert client.model == 'gemini-1.5-flash'
+    assert client.temperature == 0.7
+
+def test_unknown_provider():
+    with pytest.raises(ValueError):
+        get_llm_client('unknown', CONFIG)
+
+def test_client_llm_config_overrides_search_config(tmp_path):
+    (tmp_path / 'llm_config.json').write_text(json.dumps({
+        'provider': 'groq',
+        'providers': {'groq': {'rate_limit': 10}}
+    }), encoding='utf-8')
+
+    merged = load_llm_config(str(tmp_path), CONFIG)
+
+    assert merged['provider'] == 'groq'
+    assert provider_config('groq', merged)['model'] == 'llama-3.1-8b-instant'
+    assert provider_config('groq', merged)['rate_limit'] == 10
+    assert CONFIG['providers']['groq']['rate_limit'] == 30
+    assert load_llm_config(str(tmp_path / 'missing'), CONFIG) is CONFIG
@@ -0,0 +1,105 @@
+# tests/test_near_duplicates.py
+
+import random
+import string
+import pytest
+from fuzzywuzzy import fuzz
+from modules.near_duplicates import (process_text, similarity, find_near_duplicates, find_near_duplicates_cdist,
+                                     NearDuplicateIndex)
+
+WORDS = (
+    "logistics startup partnership supply chain innovation freight fleet cargo "
+    "parcel delivery pilot program investment venture corporate technology "
+    "platform warehouse automation shipping carrier network announced company"
+).split()
+
+def make_texts(count=120, seed=42):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        if texts and rng.random() < 0.3:
+            # Near-duplicate of an earlier text: a few words replaced
+            words = rng.choice(texts).split()
+            for _ in range(rng.randint(1, 3)):
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            texts.append(" ".join(words))
+        else:
+            texts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 40))))
+    return texts
+
+def brute_force_duplicates(texts, similarity_threshold):
+    duplicates = set()
+    for i in range(len(texts) - 1):
+        for j in range(i + 1, len(texts)):
+            if fuzz.token_sort_ratio(texts[i], texts[j]) > similarity_threshold:
+                duplicates.add(j)
+    return duplicates
+
+def test_similarity_matches_token_sort_ratio():
+    pairs = [
+        ("Hello, World!", "world hello"),
+        ("Test content 1", "Test content 2"),
+        ("", ""),
+        ("", "text"),
+        (float('nan'), float('nan')),
+    ]
+    for a, b in pairs:
+        assert similarity(process_text(a), process_text(b)) == fuzz.token_sort_ratio(a, b)
+
+@pytest.mark.parametrize("similarity_threshold", [70, 80, 90])
+def test_find_near_duplicates_matches_brute_force(similarity_threshold):
+    texts = make_texts()
+
+    found = {j for _, j, _ in find_near_duplicates(texts, similarity_threshold)}
+
+    assert found == brute_force_duplicates(texts, similarity_threshold)
+
+@pytest.mark.parametrize("similarity_threshold", [70, 80, 90])
+def test_find_near_duplicates_cdist_matches_brute_force(similarity_threshold):
+    texts = make_texts()
+
+    duplicates = find_near_duplicates_cdist(texts, similarity_threshold, block_size=16)
+
+    assert {j for _, j, _ in duplicates} == brute_force_duplicates(texts, similarity_threshold)
+    for i, j, score in duplicates:
+        assert i < j
+        assert score == fuzz.token_sort_ratio(texts[i], texts[j])
+
+def make_typo_texts(count=150, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(2000)]
+
+    def typo(word):
+        position = rng.randrange(len(word))
+        return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+
+    texts = []
+    for _ in range(count):
+        if texts and rng.random() < 0.5:
+            # Near-duplicate of an earlier text: one-character typos in about half of the words
+            texts.append(" ".join(typo(word) if rng.random() < 0.5 else word for word in rng.choice(texts).split()))
+        else:
+            texts.append(" ".join(rng.choice(vocabulary) for _ in range(30)))
+    return texts
+
+@pytest.mark.parametrize("similarity_threshold", [70, 80])
+def test_cdist_finds_character_level_duplicates(similarity_threshold):
+    texts = make_typo_texts()
+    expected = brute_force_duplicates(texts, similarity_threshold)
+
+    assert {j for _, j, _ in find_near_duplicates_cdist(texts, similarity_threshold)} == expected
+
+def test_find_exact_compares_with_all_accepted_texts():
+    texts = make_typo_texts()
+    index = NearDuplicateIndex(80)
+    accepted = []
+    for text in texts:
+        processed = process_text(text)
+        match = index.find_exact(processed)
+        expected = max((fuzz.token_sort_ratio(text, other) for other in accepted), default=0)
+        if expected > 80:
+            assert match is not None and match[1] == expected
+        else:
+            assert match is None
+            index.add(processed)
+            accepted.append(text)
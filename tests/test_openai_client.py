@@ -0,0 +1,146 @@
+# tests/test_openai_client.py
+
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from llm_clients.openai_client import OpenAIClient
+from llm_clients.errors import InvalidRequestError, QuotaExceededError
+from modules.rate_limiter import TokenEstimator
+
+def make_app(calls):
+    async def chat_completions(request):
+        key = request.headers['Authorization'].split()[-1]
+        payload = await request.json()
+        calls.append((key, payload))
+        if key == 'limited':
+            return web.json_response({'error': {'message': 'slow down', 'code': 'rate_limit_exceeded'}},
+                                     status=429, headers={'Retry-After': '0'})
+        if key == 'empty':
+            return web.json_response({'error': {'message': 'no money', 'code': 'insufficient_quota'}}, status=429)
+        if payload['messages'][-1]['content'] == 'bad':
+            return web.json_response({'error': {'message': 'invalid', 'code': 'invalid_request'}}, status=400)
+        if payload.get('stream'):
+            response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+            await response.prepare(request)
+            for part in ['Hel', 'lo']:
+                await response.write(f"data: {json.dumps({'choices': [{'delta': {'content': part}}]})}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            return response
+        return web.json_response({'choices': [{'message': {'content': f'answer via {key}'}}],
+                                  'usage': {'total_tokens': 30}})
+
+    app = web.Application()
+    app.router.add_post('/v1/chat/completions', chat_completions)
+    return app
+
+def run_with_client(keys, scenario, monkeypatch, config=None):
+    monkeypatch.setenv('OPENAI_API_KEYS', ','.join(keys))
+    calls = []
+
+    async def main():
+        server = TestServer(make_app(calls))
+        await server.start_server()
+        client = OpenAIClient(dict({'base_url': str(server.make_url('/v1')), 'retry_delay': 0}, **(config or {})))
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            await server.close()
+
+    return asyncio.run(main()), calls
+
+def test_rate_limited_keys_are_paused_not_dropped(monkeypatch):
+    async def scenario(client):
+        answers = [await client.get_completion([{'role': 'user', 'content': 'hi'}]) for _ in range(3)]
+        return answers, {state.key: state.ready_in() for state in client.key_pool.states}
+
+    (answers, ready_in), calls = run_with_client(['limited', 'empty', 'good'], scenario, monkeypatch)
+
+    assert answers == ['answer via good'] * 3
+    # Ключ с исчерпанной квотой на долгой паузе, ключ с Retry-After: 0 снова доступен
+    assert ready_in['empty'] > 3000
+    assert ready_in['limited'] == 0
+    assert sum(1 for key, _ in calls if key == 'empty') == 1
+
+def test_single_key_out_of_quota_fails_fast(monkeypatch):
+    async def scenario(client):
+        with pytest.raises(QuotaExceededError):
+            await asyncio.wait_for(client.get_completion([{'role': 'user', 'content': 'hi'}]), timeout=2)
+
+    _, calls = run_with_client(['empty'], scenario, monkeypatch)
+
+    assert len(calls) == 1
+
+def test_concurrent_requests_use_their_own_keys(monkeypatch):
+    async def scenario(client):
+        return await asyncio.gather(*[client.get_completion([{'role': 'user', 'content': 'hi'}]) for _ in range(4)])
+
+    answers, calls = run_with_client(['a', 'b'], scenario, monkeypatch)
+
+    assert sorted(answers) == ['answer via a', 'answer via a', 'answer via b', 'answer via b']
+
+def test_invalid_request_is_not_retried(monkeypatch):
+    async def scenario(client):
+        with pytest.raises(InvalidRequestError):
+            await client.get_completion([{'role': 'user', 'content': 'bad'}])
+
+    _, calls = run_with_client(['a'], scenario, monkeypatch)
+
+    assert len(calls) == 1
+
+def test_stream(monkeypatch):
+    async def scenario(client):
+        return [part async for part in client.get_completion_stream([{'role': 'user', 'content': 'hi'}])]
+
+    parts, calls = run_with_client(['a'], scenario, monkeypatch)
+
+    assert parts == ['Hel', 'lo']
+    assert calls[0][1]['stream'] is True
+
+def test_max_tokens_override_is_per_request(monkeypatch):
+    async def scenario(client):
+        [part async for part in client.get_completion_stream([{'role': 'user', 'content': 'hi'}], max_tokens=20)]
+        await client.get_completion([{'role': 'user', 'content': 'hi'}])
+
+    _, calls = run_with_client(['a'], scenario, monkeypatch)
+
+    assert [payload['max_tokens'] for _, payload in calls] == [20, 1500]
+
+def test_key_token_bucket_is_settled_from_usage(monkeypatch):
+    async def scenario(client):
+        bucket = client.key_pool.states[0].tokens
+        await client.get_completion([{'role': 'user', 'content': 'hi'}])
+        after_completion = bucket.tokens
+        [part async for part in client.get_completion_stream([{'role': 'user', 'content': 'hi'}])]
+        return after_completion, bucket.tokens
+
+    (after_completion, after_stream), _ = run_with_client(['a'], scenario, monkeypatch, {'key_tpm': 100000})
+
+    # Списана не оценка с max_tokens (1500), а фактический расход
+    assert after_completion > 100000 - 40
+    assert after_stream > 100000 - 50
+
+def test_key_bucket_is_charged_with_token_estimator(monkeypatch):
+    messages = [{'role': 'user', 'content': 'x' * 400}]
+
+    async def scenario(client):
+        bucket = client.key_pool.states[0].tokens
+        before = bucket.tokens
+        reserved = []
+        original_acquire = client.key_pool.acquire
+
+        async def acquire(tokens=0):
+            reserved.append(tokens)
+            return await original_acquire(tokens)
+
+        client.key_pool.acquire = acquire
+        await client.get_completion(messages)
+        return reserved, before - bucket.tokens
+
+    (reserved, charged), _ = run_with_client(['a'], scenario, monkeypatch, {'key_tpm': 100000})
+
+    # Ключ резервирует оценку TokenEstimator — ту же, что и общий лимит analyse_data
+    assert reserved == [TokenEstimator(1500).estimate(messages)]
+    assert charged < 31
@@ -0,0 +1,80 @@
+# tests/test_prefilter.py
+
+import json
+import os
+import pandas as pd
+from modules.prefilter import KeywordRules, RelevanceClassifier, parse_exclude_terms, prefilter_data
+
+QUERIES = {
+    "queries": ["logistics tech startup collaboration", "supply chain innovation partnership"],
+    "exclude": "-vacancies -\"job postings\" -\"market analysis\" -filetype:pdf"
+}
+
+def test_exclude_terms_are_parsed_from_search_operators():
+    assert parse_exclude_terms(QUERIES['exclude']) == ['vacancies', 'job postings', 'market analysis']
+
+def test_keyword_rules():
+    rules = KeywordRules(QUERIES['queries'], exclude=QUERIES['exclude'])
+
+    assert rules.score("DHL starts a collaboration with logistics startups") == 0.75
+    assert rules.score("DHL logistics startup collaboration: open vacancies") == 0.0
+    assert rules.score("Weather forecast for the weekend") == 0.0
+
+def test_prefilter_writes_kept_and_rejected_rows(tmp_path):
+    roles_dir = tmp_path / 'client' / 'roles'
+    roles_dir.mkdir(parents=True)
+    (roles_dir / 'search_query.json').write_text(json.dumps(QUERIES))
+    input_file = tmp_path / 'cleaned.csv'
+    pd.DataFrame({
+        'title': ['DHL and startups', 'Job postings', 'Weather'],
+        'description': ['DHL launches a logistics startup collaboration program.',
+                        'Logistics startup collaboration: new job postings this week.',
+                        'Sunny weekend ahead.']
+    }).to_csv(input_file, index=False)
+
+    rows_before, rows_after = prefilter_data(str(input_file), str(tmp_path / 'filtered.csv'),
+                                             str(tmp_path / 'rejected.csv'), str(roles_dir),
+                                             {'prefilter': {'classifier': False}})
+
+    assert (rows_before, rows_after) == (3, 1)
+    assert pd.read_csv(tmp_path / 'filtered.csv')['title'].tolist() == ['DHL and startups']
+    rejected = pd.read_csv(tmp_path / 'rejected.csv')
+    assert rejected['title'].tolist() == ['Job postings', 'Weather']
+    assert rejected['relevance'].tolist() == [0.0, 0.0]
+
+def write_past_analysis(client_dir):
+    os.makedirs(client_dir / '2024-01-01')
+    signals = [f"Company {i} partners with logistics startups on warehouse automation pilot" for i in range(20)]
+    noise = [f"Quarterly freight market report number {i} with price statistics" for i in range(20)]
+    pd.DataFrame({'description': signals + noise, 'analysis': ['Company'] * 20 + ['3'] * 20}) \
+        .to_csv(client_dir / '2024-01-01' / 'search_results_analysed.csv', index=False)
+
+def test_classifier_learns_from_past_analysis(tmp_path):
+    client_dir = tmp_path / 'client'
+    write_past_analysis(client_dir)
+
+    classifier = RelevanceClassifier.from_history(str(client_dir), {'negative_labels': ['3'], 'min_samples': 10})
+    scores = classifier.score(["Retailer partners with startups on warehouse automation",
+                               "Freight market report with price statistics"])
+
+    assert scores[0] > 0.5 > scores[1]
+
+def test_classifier_rescues_rows_without_query_words_but_not_excluded(tmp_path):
+    client_dir = tmp_path / 'client'
+    write_past_analysis(client_dir)
+    roles_dir = client_dir / 'roles'
+    roles_dir.mkdir()
+    (roles_dir / 'search_query.json').write_text(json.dumps(QUERIES))
+    input_file = tmp_path / 'cleaned.csv'
+    pd.DataFrame({
+        'title': ['Retailer news', 'Retailer vacancies'],
+        'description': ['Retailer teams up on warehouse automation pilot.',
+                        'Retailer teams up on warehouse automation pilot, see vacancies.']
+    }).to_csv(input_file, index=False)
+
+    rows_before, rows_after = prefilter_data(str(input_file), str(tmp_path / 'filtered.csv'),
+                                             str(tmp_path / 'rejected.csv'), str(roles_dir),
+                                             {'prefilter': {'min_samples': 10}})
+
+    assert (rows_before, rows_after) == (2, 1)
+    assert pd.read_csv(tmp_path / 'filtered.csv')['title'].tolist() == ['Retailer news']
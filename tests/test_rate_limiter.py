@@ -0,0 +1,84 @@
+# tests/test_rate_limiter.py
+
+import asyncio
+import time
+from modules.rate_limiter import TokenRateLimiter, TokenEstimator, RequestBudget
+
+MESSAGES = [{'role': 'system', 'content': 'p' * 400}, {'role': 'user', 'content': 'x' * 3600}]
+
+def test_token_budget_delays_large_requests():
+    # 1000 токенов за 1 с: после запроса на 900 токенов следующий на 900 ждёт ~0.8 с
+    limiter = TokenRateLimiter(max_rate=100, period=1, max_tokens=1000)
+
+    async def scenario():
+        await limiter.acquire(900)
+        started_at = time.monotonic()
+        await limiter.acquire(900)
+        return time.monotonic() - started_at
+
+    assert 0.7 < asyncio.run(scenario()) < 1.0
+
+def test_settle_returns_unused_tokens():
+    limiter = TokenRateLimiter(max_rate=100, period=60, max_tokens=1000)
+    asyncio.run(limiter.acquire(900))
+
+    limiter.settle(900, 300)
+
+    assert limiter.wait_time(600) == 0
+
+def test_estimator_refines_from_usage():
+    estimator = TokenEstimator(max_tokens=1500)
+    # До наблюдений: 4000 символов / 4 + max_tokens
+    assert estimator.estimate(MESSAGES) == 1000 + 1500 + 1
+
+    for _ in range(30):
+        actual = estimator.observe(MESSAGES, {'prompt_tokens': 800, 'completion_tokens': 100, 'total_tokens': 900})
+
+    assert actual == 900
+    # Оценка сходится к 800 токенам промпта и 100 * 1.5 токенам ответа
+    assert abs(estimator.estimate(MESSAGES) - 950) < 20
+    assert estimator.observe(MESSAGES, None) is None
+
+def test_streamed_request_is_settled_from_text():
+    estimator = TokenEstimator(max_tokens=1500)
+    limiter = TokenRateLimiter(max_rate=100, period=60, max_tokens=3000)
+    estimated = estimator.estimate(MESSAGES)
+    asyncio.run(limiter.acquire(estimated))
+
+    limiter.settle(estimated, estimator.count(MESSAGES, 'DHL'))
+
+    # Списано ~1000 токенов промпта вместо 2500 по оценке
+    assert limiter.wait_time(1900) == 0
+
+def test_request_budget_bounds_concurrency():
+    budget = RequestBudget.from_config({'max_concurrent_requests': 2})
+    active = []
+    peak = []
+
+    async def request():
+        async with budget:
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def scenario():
+        await asyncio.gather(*[request() for _ in range(6)])
+
+    asyncio.run(scenario())
+
+    assert max(peak) == 2
+    assert budget.rate_limiter is None
+
+def test_request_budget_limits_rate():
+    # 5 запросов за 0.5 с: шестой ждёт пополнения корзины
+    budget = RequestBudget(max_concurrent=10, max_rate=5, period=0.5)
+
+    async def scenario():
+        started_at = time.monotonic()
+        for _ in range(6):
+            async with budget:
+                pass
+        return time.monotonic() - started_at
+
+    assert 0.05 < asyncio.run(scenario()) < 0.5
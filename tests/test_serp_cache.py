@@ -0,0 +1,53 @@
+# tests/test_serp_cache.py
+
+import time
+import pytest
+from modules.serp_cache import SerpCache
+
+PARAMS = {'user': 'u', 'key': 'k', 'query': 'logistics', 'tbs': 'qdr:d7', 'page': 0}
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SerpCache({'enabled': True, 'path': str(tmp_path / 'serp.sqlite')})
+    yield cache
+    cache.close()
+
+def test_page_is_served_within_ttl(cache):
+    cache.put(PARAMS, '<response/>')
+
+    assert cache.get(PARAMS, cache.ttl) == '<response/>'
+    assert cache.get(dict(PARAMS, page=1), cache.ttl) is None
+
+def test_credentials_are_not_part_of_key(cache):
+    cache.put(PARAMS, '<response/>')
+
+    assert cache.get(dict(PARAMS, user='other', key='other'), cache.ttl) == '<response/>'
+
+def test_ttl_does_not_depend_on_search_window(cache):
+    # Выдача за 7 дней хранится ttl_hours, а не 7 дней
+    assert cache.ttl == 24 * 3600
+    cache.put(PARAMS, '<response/>')
+    cache._connect().execute("UPDATE serp_pages SET fetched_at = ?", (time.time() - 2 * 86400,))
+
+    assert cache.get(PARAMS, cache.ttl) is None
+
+def test_modes(cache):
+    cache.put(PARAMS, 'old')
+    cache.configure(mode='refresh')
+    cache.put(PARAMS, 'new')
+
+    assert cache.get(PARAMS, cache.ttl) is None
+    cache.configure(mode='use')
+    assert cache.get(PARAMS, cache.ttl) == 'new'
+    cache.configure(mode='off')
+    assert not cache.enabled
+    with pytest.raises(ValueError):
+        cache.configure(mode='never')
+
+def test_evict_removes_old_pages(cache):
+    cache.put(PARAMS, '<response/>')
+    cache._connect().execute("UPDATE serp_pages SET fetched_at = ?", (time.time() - 7200,))
+
+    cache.evict(3600)
+
+    assert cache.get(PARAMS, 10 ** 6) is None
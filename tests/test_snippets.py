@@ -0,0 +1,46 @@
+# tests/test_snippets.py
+
+from modules.snippets import GAP, bm25_scores, select_snippet, split_paragraphs
+
+ARTICLE = "\n\n".join([
+    "Acme Corp published its annual update on Monday.",
+    "Subscribe to our newsletter for more stories. " * 5,
+    "The company also sponsored a local football team.",
+    "Acme will launch a logistics startup accelerator to pilot warehouse automation with startups.",
+    "Cookie policy and terms of use apply to this website. " * 5,
+])
+
+def test_long_paragraphs_are_split_by_sentences():
+    parts = split_paragraphs("First sentence here. " * 50, max_length=100)
+
+    assert len(parts) > 1
+    assert all(len(part) <= 100 for part in parts)
+
+def test_bm25_prefers_paragraph_with_query_terms():
+    paragraphs = split_paragraphs(ARTICLE)
+    scores = bm25_scores(paragraphs, ['startu', 'logist'])
+
+    assert max(range(len(scores)), key=scores.__getitem__) == 3
+
+def test_snippet_keeps_lead_and_relevant_paragraph():
+    snippet = select_snippet(ARTICLE, "logistics startup accelerator", 200)
+
+    assert len(snippet) <= 200
+    assert snippet.startswith("Acme Corp published")
+    assert "logistics startup accelerator" in snippet
+    assert GAP in snippet
+    assert "Cookie policy" not in snippet
+
+def test_short_text_is_returned_unchanged():
+    assert select_snippet("Short text.", "query", 500) == "Short text."
+
+def test_relevant_paragraph_longer_than_budget_is_kept():
+    paragraphs = ["Filler about weather and sports events in the region. " * 10,
+                  "More filler about cooking recipes and travel destinations. " * 9,
+                  "DHL announced a logistics startup accelerator program with partners. " * 8,
+                  "Cookie notice and privacy text for the website visitors. " * 10]
+
+    snippet = select_snippet("\n\n".join(paragraphs), "logistics startup accelerator", 500)
+
+    assert len(snippet) <= 500
+    assert "DHL announced" in snippet
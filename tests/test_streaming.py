@@ -0,0 +1,88 @@
+# tests/test_streaming.py
+
+import asyncio
+from llm_clients.completion_cache import CompletionCache, CachedLLMClient
+from llm_clients.streaming import read_until_answer
+
+ANSWER_PATTERN = r"^\s*[^\n]+"
+
+class FakeStreamClient:
+    def __init__(self, parts):
+        self.model = 'model-a'
+        self.parts = parts
+        self.sent = []
+        self.closed = False
+        self.limits = []
+
+    async def get_completion_stream(self, messages, max_tokens=None):
+        self.limits.append(max_tokens)
+        try:
+            for part in self.parts:
+                self.sent.append(part)
+                yield part
+        finally:
+            self.closed = True
+
+def test_stream_is_stopped_after_answer():
+    client = FakeStreamClient(['DH', 'L', '\n', 'Explanation: ', 'the article says...'])
+
+    answer, stopped = asyncio.run(read_until_answer(client.get_completion_stream([]), ANSWER_PATTERN))
+
+    assert (answer, stopped) == ('DHL', True)
+    assert client.sent == ['DH', 'L', '\n']
+    assert client.closed
+
+def test_answer_without_trailing_text_is_read_to_the_end():
+    client = FakeStreamClient(['3'])
+
+    assert asyncio.run(read_until_answer(client.get_completion_stream([]), ANSWER_PATTERN)) == ('3', False)
+
+def test_stopped_answer_is_cached(tmp_path):
+    cache = CompletionCache({'enabled': True, 'path': str(tmp_path / 'completions.sqlite')})
+    client = FakeStreamClient(['Maersk\n', 'more text'])
+    cached = CachedLLMClient(client, 'openai', cache, 'client')
+    messages = [{"role": "user", "content": "text"}]
+    try:
+        first = asyncio.run(cached.get_completion_until(messages, ANSWER_PATTERN))
+        second = asyncio.run(cached.get_completion_until(messages, ANSWER_PATTERN))
+    finally:
+        cache.close()
+
+    assert first == second == 'Maersk'
+    assert client.sent == ['Maersk\n']
+
+def test_answer_limit_applies_only_to_streamed_request(tmp_path):
+    cache = CompletionCache({'enabled': True, 'path': str(tmp_path / 'completions.sqlite')})
+    client = FakeStreamClient(['3\n'])
+    cached = CachedLLMClient(client, 'openai', cache, 'client')
+    messages = [{"role": "user", "content": "text"}]
+    try:
+        asyncio.run(cached.get_completion_until(messages, ANSWER_PATTERN, max_tokens=20))
+        # Ответ с другим лимитом длины — другой запрос
+        assert cached.lookup(messages, 20, ANSWER_PATTERN) == '3'
+        assert cached.lookup(messages, answer_pattern=ANSWER_PATTERN) is None
+    finally:
+        cache.close()
+
+    assert client.limits == [20]
+
+def test_stopped_answer_is_not_served_as_full_completion(tmp_path):
+    cache = CompletionCache({'enabled': True, 'path': str(tmp_path / 'completions.sqlite')})
+    client = FakeStreamClient(['Maersk\n', 'Explanation: the article says...'])
+    cached = CachedLLMClient(client, 'openai', cache, 'client')
+    messages = [{"role": "user", "content": "text"}]
+    try:
+        assert asyncio.run(cached.get_completion_until(messages, ANSWER_PATTERN, max_tokens=20)) == 'Maersk'
+        assert cached.lookup(messages, 20) is None
+
+        async def read_stream():
+            return "".join([part async for part in cached.get_completion_stream(messages, max_tokens=20)])
+
+        # Полный поток запрашивается заново с тем же лимитом и сохраняется отдельно
+        assert asyncio.run(read_stream()) == 'Maersk\nExplanation: the article says...'
+        assert cached.lookup(messages, 20) == 'Maersk\nExplanation: the article says...'
+        assert cached.lookup(messages, 20, ANSWER_PATTERN) == 'Maersk'
+    finally:
+        cache.close()
+
+    assert client.limits == [20, 20]
@@ -0,0 +1,43 @@
+# tests/test_url_registry.py
+
+import asyncio
+from modules.link_utils import canonicalize_url
+from modules.url_registry import UrlRegistry
+
+def test_canonicalize_url():
+    assert canonicalize_url("HTTPS://Example.COM:443/News?b=2&utm_source=x&a=1#top") == "https://example.com/News?a=1&b=2"
+    assert canonicalize_url("http://example.com?fbclid=abc") == "http://example.com/"
+    assert canonicalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+    assert canonicalize_url("not a url") == "not a url"
+
+def test_fetch_is_shared_between_queries():
+    calls = []
+
+    async def fetch_func(url):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return {'text': url}
+
+    async def run():
+        registry = UrlRegistry()
+        return await asyncio.gather(
+            registry.fetch("https://example.com/a?utm_medium=q1", fetch_func),
+            registry.fetch("https://EXAMPLE.com/a?utm_medium=q2", fetch_func),
+            registry.fetch("https://example.com/b", fetch_func)
+        )
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert results[0] is results[1]
+
+def test_claim_and_attribution():
+    registry = UrlRegistry()
+
+    assert registry.claim("https://example.com/a", "query 1")
+    assert not registry.claim("https://example.com/a?utm_source=x", "query 2")
+    assert registry.claim("https://example.com/b", "query 2")
+
+    assert registry.attributed_query("https://example.com/a") == "query 1 | query 2"
+    assert registry.attributed_query("https://example.com/c", "query 3") == "query 3"
+    assert registry.has_shared_urls()